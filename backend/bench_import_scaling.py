@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark di scalabilità dell'import parallelo (CSVImportService.import_persons_parallel).
+
+Importa lo stesso dataset sintetico con 1, 2, 4 e 8 worker e stampa righe/s
+e speedup rispetto a 1 worker. Va eseguito contro il DB MySQL locale:
+
+    python bench_import_scaling.py --rows 200000 --workers 1 2 4 8
+
+Le Person create hanno email @bench.invalid e vengono eliminate a fine run.
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+# Force UTF-8 output
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from persons.models import Person
+from persons.services.csv_import import CSVImportService
+
+BENCH_DOMAIN = 'bench.invalid'
+
+
+def make_records(rows):
+    return [
+        {
+            'email': f'user{i}@{BENCH_DOMAIN}',
+            'first_name': f'Nome{i}',
+            'last_name': f'Cognome{i}',
+            'country': 'IT',
+            'organisation': f'Org {i % 500}',
+            'tags': 'bench,import',
+        }
+        for i in range(rows)
+    ]
+
+
+def cleanup():
+    Person.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--on-conflict', default='update', choices=['skip', 'update'])
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    baseline = None
+
+    print(f"{'workers':>8} {'secondi':>10} {'righe/s':>12} {'speedup':>8} {'efficienza':>11}")
+    for workers in args.workers:
+        cleanup()
+        start = time.perf_counter()
+        stats = CSVImportService.import_persons_parallel(
+            records,
+            on_conflict=args.on_conflict,
+            workers=workers
+        )
+        elapsed = time.perf_counter() - start
+
+        if stats['created'] != args.rows:
+            print(f"  ⚠ attese {args.rows} righe create, ottenute {stats['created']} ({stats['error_count']} errori)")
+
+        rate = args.rows / elapsed
+        baseline = baseline or rate
+        speedup = rate / baseline
+        print(f"{workers:>8} {elapsed:>10.2f} {rate:>12.0f} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark del throughput di GET /api/persons/ con la diagnostica
+(persons/diagnostics.py) spenta e accesa.
+
+Chiama PersonViewSet direttamente (APIRequestFactory, passando per
+DiagnosticsMiddleware) e stampa richieste/s e righe/s per ogni modalità:
+
+  - off:       PERSONS_DIAGNOSTICS spento
+  - on:        acceso, livello DEBUG, tutte le richieste campionate
+  - on-sample: acceso, 10% delle richieste campionate
+  - on-info:   acceso ma logger a INFO (eventi DEBUG filtrati dal livello)
+
+Gli eventi vanno su os.devnull: si misura il costo di produrli, non del terminale.
+
+    python bench_person_list.py --rows 10000 --limit 100 --requests 200
+
+Le Person create hanno email @bench.invalid e vengono eliminate a fine run.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import django
+
+# Force UTF-8 output
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from persons.diagnostics import DiagnosticsMiddleware
+from persons.models import Person
+from persons.views import PersonViewSet
+
+BENCH_DOMAIN = 'bench.invalid'
+MODES = {
+    'off': {'PERSONS_DIAGNOSTICS': False},
+    'on': {'PERSONS_DIAGNOSTICS': True, 'PERSONS_DIAGNOSTICS_SAMPLE_RATE': 1.0},
+    'on-sample': {'PERSONS_DIAGNOSTICS': True, 'PERSONS_DIAGNOSTICS_SAMPLE_RATE': 0.1},
+    'on-info': {'PERSONS_DIAGNOSTICS': True, 'PERSONS_DIAGNOSTICS_SAMPLE_RATE': 1.0},
+}
+
+
+def seed(rows):
+    Person.objects.bulk_create(
+        [
+            Person(
+                email=f'user{i}@{BENCH_DOMAIN}',
+                first_name=f'Nome{i}',
+                last_name=f'Cognome{i}',
+                country='IT',
+                organisation=f'Org {i % 500}',
+                tags='bench,list',
+            )
+            for i in range(rows)
+        ],
+        batch_size=5000
+    )
+
+
+def cleanup():
+    Person.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+
+
+def run(mode, limit, requests):
+    view = DiagnosticsMiddleware(PersonViewSet.as_view({'get': 'list'}))
+    factory = APIRequestFactory()
+    diagnostics_logger = logging.getLogger('persons.diagnostics')
+    diagnostics_logger.setLevel(logging.INFO if mode == 'on-info' else logging.DEBUG)
+
+    with override_settings(**MODES[mode]):
+        # Riscaldamento: connessione e cache delle query
+        view(factory.get('/api/persons/', {'limit': limit}))
+        start = time.perf_counter()
+        for i in range(requests):
+            response = view(factory.get('/api/persons/', {'limit': limit, 'offset': i * limit % 5000}))
+            response.render()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--limit', type=int, default=100, help="Righe per pagina")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    diagnostics_logger = logging.getLogger('persons.diagnostics')
+    diagnostics_logger.handlers = [logging.StreamHandler(open(os.devnull, 'w'))]
+
+    cleanup()
+    seed(args.rows)
+
+    baseline = None
+    print(f"{'modalità':>10} {'secondi':>9} {'richieste/s':>12} {'righe/s':>10} {'vs off':>8}")
+    for mode in args.modes:
+        elapsed = run(mode, args.limit, args.requests)
+        rate = args.requests / elapsed
+        baseline = baseline or rate
+        print(
+            f"{mode:>10} {elapsed:>9.2f} {rate:>12.1f} {rate * args.limit:>10.0f} "
+            f"{rate / baseline - 1:>+7.1%}"
+        )
+
+    cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark della ricerca ?search= su /api/persons/ (PersonSearchFilter).
+
+Popola la tabella con N Person sintetiche (default 5M, riusate tra un run e
+l'altro) e misura, per ogni termine, la prima pagina ordinata per rilevanza
+e il count della paginazione. Stampa p50/p95/max in ms e segnala i termini
+oltre la soglia (--target-ms, default 50). Va eseguito contro il DB MySQL:
+
+    python bench_person_search.py --rows 5000000 --repeat 20 --explain
+    python bench_person_search.py --cleanup
+
+Le Person create hanno email @bench.invalid.
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+import django
+
+# Force UTF-8 output
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+
+from persons.filters import PersonSearchFilter
+from persons.models import Person
+
+BENCH_DOMAIN = 'bench.invalid'
+BATCH_SIZE = 10000
+FIRST_NAMES = ['Mario', 'Laura', 'Giuseppe', 'Anna', 'Marco', 'Giulia', 'Luca', 'Francesca', 'Paolo', 'Chiara']
+LAST_NAMES = ['Rossi', 'Bianchi', 'Romano', 'Colombo', 'Ricci', 'Marino', 'Greco', 'Bruno', 'Gallo', 'Conti']
+# Prefissi, sottostringhe, più parole, termini rari e assenti
+DEFAULT_TERMS = ['mar', 'ross', 'anna ricci', 'user12345', 'org 42', 'olomb', 'rossi@', 'zzzz']
+
+
+def seed(rows):
+    existing = Person.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').count()
+    if existing >= rows:
+        return existing
+
+    rnd = random.Random(42)
+    for start in range(existing, rows, BATCH_SIZE):
+        Person.objects.bulk_create([
+            Person(
+                email=f'user{i}@{BENCH_DOMAIN}',
+                first_name=rnd.choice(FIRST_NAMES),
+                last_name=rnd.choice(LAST_NAMES),
+                organisation=f'Org {i % 5000}',
+            )
+            for i in range(start, min(start + BATCH_SIZE, rows))
+        ])
+        print(f"\r  popolamento: {min(start + BATCH_SIZE, rows)}/{rows}", end='', flush=True)
+    print()
+    return rows
+
+
+def cleanup():
+    Person.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+
+
+def measure(term, repeat):
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        queryset = PersonSearchFilter.search(Person.objects.all(), term)
+        count = queryset.count()
+        list(queryset[:page_size])
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return count, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--terms', nargs='+', default=DEFAULT_TERMS)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--target-ms', type=float, default=50)
+    parser.add_argument('--explain', action='store_true', help="Stampa il piano di esecuzione di ogni ricerca")
+    parser.add_argument('--cleanup', action='store_true', help="Elimina le Person del benchmark ed esce")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    if connection.vendor != 'mysql':
+        print(f"⚠ DB {connection.vendor}: niente indice FULLTEXT, la ricerca usa icontains")
+
+    rows = seed(args.rows)
+    print(f"{rows} Person @{BENCH_DOMAIN}, {Person.objects.count()} in totale\n")
+
+    slow = []
+    print(f"{'termine':>14} {'risultati':>10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for term in args.terms:
+        count, timings = measure(term, args.repeat)
+        p50 = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        flag = '' if p95 <= args.target_ms else '  ✗'
+        print(f"{term:>14} {count:>10} {p50:>8.1f} {p95:>8.1f} {timings[-1]:>8.1f}{flag}")
+        if flag:
+            slow.append(term)
+        if args.explain:
+            print(PersonSearchFilter.search(Person.objects.all(), term)[:1].explain())
+
+    if slow:
+        print(f"\n✗ p95 oltre {args.target_ms:.0f} ms per: {', '.join(slow)}")
+        sys.exit(1)
+    print(f"\n✓ Tutte le ricerche sotto {args.target_ms:.0f} ms (p95)")
+
+
+if __name__ == '__main__':
+    main()
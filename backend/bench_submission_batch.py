@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark di POST /api/webform-submissions/batch/ (webforms/services/batch.py).
+
+Invia --requests richieste da --batch submission ciascuna attraverso la view
+(APIRequestFactory, JSON compreso) e stampa submission/s per tre casi:
+
+  - new:       ogni submission ha una Person nuova (creata dall'email)
+  - existing:  Person già presenti, cercate per email
+  - duplicate: stessi dedup_key del caso new (nessuna INSERT)
+
+    python bench_submission_batch.py --batch 500 --requests 20 --target 5000
+
+I dati creati hanno email @bench.invalid e vengono eliminati a fine run.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import django
+
+# Force UTF-8 output
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from rest_framework.test import APIRequestFactory
+
+from persons.models import Person
+from webforms.models import Webform, Website
+from webforms.views import WebformSubmissionViewSet
+
+BENCH_DOMAIN = 'bench.invalid'
+BENCH_URL = f'http://{BENCH_DOMAIN}'
+
+
+def cleanup():
+    Website.objects.filter(url=BENCH_URL).delete()
+    Person.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+
+
+def make_items(webform_id, start, count, prefix):
+    return [
+        {
+            'webform_id': webform_id,
+            'external_id': f'{prefix}-{i}',
+            'dedup_key': f'{BENCH_DOMAIN}:{prefix}:{i}',
+            'source_website': BENCH_URL,
+            'payload': {
+                'email': f'user{i}@{BENCH_DOMAIN}',
+                'first_name': f'Nome{i}',
+                'message': 'x' * 80,
+            },
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def run_case(view, factory, webform_id, args, prefix):
+    totals = {'created': 0, 'duplicates': 0, 'errors': 0}
+    elapsed = 0.0
+    for n in range(args.requests):
+        items = make_items(webform_id, n * args.batch, args.batch, prefix)
+        request = factory.post('/api/webform-submissions/batch/', {'submissions': items}, format='json')
+        start = time.perf_counter()
+        response = view(request)
+        elapsed += time.perf_counter() - start
+        for key in totals:
+            totals[key] += response.data[key]
+    return args.batch * args.requests / elapsed, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--target', type=int, default=5000, help='submission/s attese')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    cleanup()
+    website = Website.objects.create(name='Bench', url=BENCH_URL)
+    webform = Webform.objects.create(website=website, name='Bench', external_id='bench')
+
+    factory = APIRequestFactory()
+    view = WebformSubmissionViewSet.as_view({'post': 'batch'})
+    # (caso, prefisso dei dedup_key): le email sono le stesse in tutti i casi
+    cases = [
+        ('new', 'new'),
+        ('existing', 'existing'),
+        ('duplicate', 'new'),
+    ]
+
+    try:
+        print(f"{'caso':>10} {'submission/s':>13} {'created':>8} {'dup':>6} {'errors':>6}")
+        for name, prefix in cases:
+            rate, totals = run_case(view, factory, webform.id, args, prefix)
+            flag = '' if rate >= args.target else f'  < {args.target}'
+            print(f"{name:>10} {rate:>13.0f} {totals['created']:>8} {totals['duplicates']:>6} {totals['errors']:>6}{flag}")
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
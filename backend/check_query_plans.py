@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Controllo dei piani di esecuzione delle liste dell'API.
+
+Per ogni ViewSet registrato sotto /api/ costruisce la query della list (prima
+pagina, PAGE_SIZE righe) per ogni combinazione di:
+
+  - filterset_fields: nessun filtro, ognuno da solo, a coppie
+  - ordinamento: quello di default e ogni ordering_fields (asc e desc);
+    senza ordering_fields dichiarati solo quello di default
+
+ed esegue EXPLAIN. Segnala:
+
+  - full scan: MySQL access_type ALL, SQLite "SCAN <tabella>" senza indice,
+    PostgreSQL "Seq Scan"
+  - filesort: MySQL using_filesort, SQLite "USE TEMP B-TREE FOR ORDER BY",
+    PostgreSQL nodo Sort
+
+solo sulle tabelle con almeno --min-rows righe (sulle tabelle piccole una
+scansione è la scelta corretta). I valori dei filtri sono presi dai dati presenti.
+
+    python check_query_plans.py --seed 50000       # popola, controlla, elimina
+    python check_query_plans.py --verbose          # sui dati esistenti, con i piani
+
+Exit code 1 se almeno una query viene segnalata. I dati creati con --seed hanno
+email @bench.invalid e vengono eliminati a fine run (salvo --keep).
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+
+import django
+
+# Force UTF-8 output
+os.environ['PYTHONIOENCODING'] = 'utf-8'
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.filters import OrderingFilter
+from rest_framework.test import APIRequestFactory
+
+from persons.models import Person
+from webforms.models import Webform, WebformSubmission, Website
+
+BENCH_DOMAIN = 'bench.invalid'
+BENCH_URL = f'http://{BENCH_DOMAIN}'
+SOURCES = 20
+WEBFORMS = 50
+
+# Segnalazioni note e accettate: (ViewSet, filtri) -> motivo
+ACCEPTED = {
+    ('WebformSubmissionViewSet', ('person', 'external_id')): 'external_id quasi univoco, ordina poche righe',
+    # L'indice (person, webform, created_at) serve filtri e ordinamento, ma con le
+    # statistiche di ANALYZE (sqlite_stat1: una riga per coppia) SQLite ordina in
+    # memoria la riga trovata; senza statistiche legge l'indice già in ordine
+    ('WebformSubmissionViewSet', ('webform', 'person')): 'una riga per persona e webform, ordinata in memoria',
+}
+
+
+def seed(rows):
+    Person.objects.bulk_create(
+        [
+            Person(
+                email=f'user{i}@{BENCH_DOMAIN}',
+                first_name=f'Nome{i}',
+                last_name=f'Cognome{i}',
+                source_website=f'{BENCH_URL}/{i % SOURCES}',
+            )
+            for i in range(rows)
+        ],
+        batch_size=5000
+    )
+    website = Website.objects.create(name='Bench', url=BENCH_URL, external_id='bench')
+    webforms = Webform.objects.bulk_create([
+        Webform(website=website, name=f'Bench {i}', external_id=f'bench-{i}') for i in range(WEBFORMS)
+    ])
+    persons = Person.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').values_list('id', flat=True)
+    submissions = (
+        WebformSubmission(
+            webform=webforms[(i + copy) % WEBFORMS],
+            person_id=person_id,
+            external_id=f'bench-{i}-{copy}',
+            payload={},
+            source_website=BENCH_URL,
+        )
+        for i, person_id in enumerate(persons)
+        for copy in range(2)
+    )
+    while True:
+        batch = list(itertools.islice(submissions, 5000))
+        if not batch:
+            break
+        WebformSubmission.objects.bulk_create(batch)
+
+    # Statistiche aggiornate per l'ottimizzatore
+    tables = [model._meta.db_table for model in (Person, Website, Webform, WebformSubmission)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+            cursor.fetchall()
+        else:
+            cursor.execute('ANALYZE')
+
+
+def cleanup():
+    Website.objects.filter(url=BENCH_URL).delete()
+    Person.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+
+
+def list_viewsets(patterns=None, seen=None):
+    """
+    ViewSet con azione list raggiungibili dagli URL, una volta sola ciascuno.
+    Un URL già registrato da un include precedente non viene mai risolto: si salta.
+    """
+    if patterns is None:
+        patterns, seen = get_resolver().url_patterns, {}
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            list_viewsets(pattern.url_patterns, seen)
+        elif isinstance(pattern, URLPattern):
+            cls = getattr(pattern.callback, 'cls', None)
+            actions = getattr(pattern.callback, 'actions', None) or {}
+            route = str(pattern.pattern)
+            if '(?P<format>' in route or route in seen.values():
+                continue
+            if cls is not None and actions.get('get') == 'list':
+                seen.setdefault(cls, route)
+    return seen
+
+
+def orderings(view):
+    if not any(issubclass(backend, OrderingFilter) for backend in view.filter_backends):
+        return [None]
+    fields = getattr(view, 'ordering_fields', None)
+    if not fields or fields == '__all__':
+        return [None]
+    return [None] + [prefix + field for field in fields for prefix in ('', '-')]
+
+
+def filter_combinations(view):
+    fields = list(getattr(view, 'filterset_fields', None) or [])
+    combinations = [()]
+    for size in (1, 2):
+        combinations.extend(itertools.combinations(fields, size))
+    return combinations
+
+
+def sample_params(model, fields):
+    """
+    Valori reali per i filtri, presi da una stessa riga: la query restituisce dati.
+    """
+    if not fields:
+        return {}
+    columns = [model._meta.get_field(field).attname for field in fields]
+    queryset = model.objects.filter(**{f'{column}__isnull': False for column in columns})
+    row = queryset.order_by().values_list(*columns).first()
+    if row is None:
+        return None
+    return dict(zip(fields, row))
+
+
+def build_queryset(viewset, params):
+    factory = APIRequestFactory()
+    view = viewset(action_map={'get': 'list'}, args=(), kwargs={}, format_kwarg=None)
+    view.request = view.initialize_request(factory.get('/', params))
+    queryset = view.filter_queryset(view.get_queryset())
+    return queryset[:settings.REST_FRAMEWORK.get('PAGE_SIZE') or 20]
+
+
+def analyze_mysql(queryset):
+    plan = json.loads(queryset.explain(format='json'))
+    flags = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get('access_type') == 'ALL':
+                flags.append(('full scan', node.get('table_name')))
+            if node.get('using_filesort'):
+                flags.append(('filesort', None))
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+    walk(plan)
+    return flags, json.dumps(plan, indent=2)
+
+
+def analyze_sqlite(queryset):
+    plan = queryset.explain()
+    flags = []
+    for line in plan.splitlines():
+        match = re.search(r'\bSCAN (\w+)(.*)$', line)
+        if match and 'USING' not in match.group(2):
+            flags.append(('full scan', match.group(1)))
+        if 'USE TEMP B-TREE FOR ORDER BY' in line:
+            flags.append(('filesort', None))
+    return flags, plan
+
+
+def analyze_postgresql(queryset):
+    plan = queryset.explain()
+    flags = []
+    for line in plan.splitlines():
+        match = re.search(r'Seq Scan on (\w+)', line)
+        if match:
+            flags.append(('full scan', match.group(1)))
+        if re.match(r'\s*(->\s*)?(Incremental )?Sort\b', line):
+            flags.append(('filesort', None))
+    return flags, plan
+
+
+ANALYZERS = {
+    'mysql': analyze_mysql,
+    'sqlite': analyze_sqlite,
+    'postgresql': analyze_postgresql,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0, help='Person da creare prima del controllo')
+    parser.add_argument('--keep', action='store_true', help='Non eliminare i dati creati con --seed')
+    parser.add_argument('--min-rows', type=int, default=1000)
+    parser.add_argument('--verbose', action='store_true', help='Stampa i piani completi')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    analyze = ANALYZERS.get(connection.vendor)
+    if analyze is None:
+        parser.error(f'Database {connection.vendor} non supportato')
+
+    if args.seed:
+        cleanup()
+        seed(args.seed)
+
+    row_counts = {}
+    flagged = 0
+    try:
+        for viewset, route in list_viewsets().items():
+            model = viewset.queryset.model
+            table = model._meta.db_table
+            related = [field.related_model for field in model._meta.concrete_fields if field.is_relation]
+            for table_model in (model, *related):
+                if table_model._meta.db_table not in row_counts:
+                    row_counts[table_model._meta.db_table] = table_model.objects.count()
+            print(f'\n{viewset.__name__} ({route}) - {table}: {row_counts[table]} righe')
+
+            for fields in filter_combinations(viewset):
+                params = sample_params(model, fields)
+                if params is None:
+                    print(f"  {'SKIP':<6} {'&'.join(fields)}: nessuna riga con valori")
+                    continue
+                for ordering in orderings(viewset):
+                    query = dict(params, **({'ordering': ordering} if ordering else {}))
+                    flags, plan = analyze(build_queryset(viewset, query))
+                    flags = [
+                        (kind, name) for kind, name in flags
+                        if row_counts.get(name or table, args.min_rows) >= args.min_rows
+                    ]
+                    label = '&'.join(f'{key}=' for key in fields) or '(nessun filtro)'
+                    label += f" ordering={ordering or 'default'}"
+                    accepted = ACCEPTED.get((viewset.__name__, fields))
+                    if flags and accepted:
+                        print(f"  {'OK*':<6} {label}: {accepted}")
+                    elif flags:
+                        flagged += 1
+                        details = ', '.join(kind + (f' {name}' if name else '') for kind, name in dict.fromkeys(flags))
+                        print(f"  {'FLAG':<6} {label}: {details}")
+                    else:
+                        print(f"  {'OK':<6} {label}")
+                    if args.verbose:
+                        print('\n'.join(f'         {line}' for line in plan.splitlines()))
+    finally:
+        if args.seed and not args.keep:
+            cleanup()
+
+    print(f'\nQuery segnalate: {flagged}')
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == '__main__':
+    main()
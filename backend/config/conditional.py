@@ -0,0 +1,78 @@
+# backend/config/conditional.py
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class ConditionalMixin:
+    """
+    Mixin per ModelViewSet: ETag e Last-Modified su retrieve e list, con
+    risposta 304 Not Modified senza serializzare nulla.
+
+      - retrieve: updated_at della riga (una query su un solo campo)
+      - list: MAX(updated_at) e COUNT(*) del queryset filtrato (una query);
+        il conteggio cambia con le cancellazioni, MAX(updated_at) con il resto.
+        Solo ETag: MAX(updated_at) non cambia con una cancellazione, quindi
+        un Last-Modified (e If-Modified-Since) darebbe 304 su una lista ridotta
+
+    conditional_related elenca le FK annidate nel serializer (es. 'website'):
+    il loro updated_at entra nell'ETag, così una modifica al sito invalida
+    anche la lista dei webform.
+    L'ETag dipende anche dall'URL completo (paginazione, filtri, ?fields=).
+    """
+
+    conditional_actions = ('retrieve', 'list')
+    conditional_related = ()
+
+    def get_conditional_state(self):
+        """
+        (ultimo updated_at o None per le liste, chiave dell'ETag) oppure None
+        se non c'è nulla da confrontare.
+        """
+        fields = ['updated_at'] + [f'{relation}__updated_at' for relation in self.conditional_related]
+
+        if self.action == 'retrieve':
+            lookup = self.lookup_url_kwarg or self.lookup_field
+            queryset = self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup]})
+            state = queryset.values_list(*fields).first()
+            if state is None:
+                return None
+            last_modified = max((date for date in state if date is not None), default=None)
+        else:
+            aggregates = {f'modified_{i}': Max(field) for i, field in enumerate(fields)}
+            result = self.filter_queryset(self.get_queryset()).order_by().aggregate(count=Count('pk'), **aggregates)
+            state = (result['count'], *(result[alias] for alias in aggregates))
+            last_modified = None
+
+        key = repr((self.request.get_full_path(), state))
+        return last_modified, hashlib.sha1(key.encode()).hexdigest()
+
+    def conditional(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions or request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+
+        state = self.get_conditional_state()
+        if state is None:
+            return handler(request, *args, **kwargs)
+
+        last_modified, digest = state
+        etag = f'W/"{digest}"'
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
@@ -0,0 +1,117 @@
+# backend/config/counts.py
+import hashlib
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+
+class CountCache:
+    """
+    COUNT(*) delle liste paginate in cache, con chiave = SQL dei filtri attivi.
+    Ogni modello ha un numero di versione in cache che entra nella chiave:
+    save/delete (segnali) o le scritture bulk (invalidate) lo incrementano,
+    così tutti i conteggi del modello scadono insieme.
+    La cache è condivisa tra processi (CACHES in settings), quindi anche
+    le scritture del worker di import invalidano i conteggi dell'API.
+    Un errore della cache non fa mai fallire una scrittura o una lista:
+    viene registrato e il conteggio si legge dal DB.
+    """
+
+    @staticmethod
+    def version_key(model):
+        return f'count-version:{model._meta.label_lower}'
+
+    @staticmethod
+    def get_version(model):
+        key = CountCache.version_key(model)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, 1, None)
+            version = cache.get(key, 1)
+        return version
+
+    @staticmethod
+    def invalidate(model):
+        """
+        Incrementa la versione al commit della transazione corrente (subito se non
+        ce n'è una): prima del commit un'altra richiesta rimetterebbe in cache il
+        conteggio vecchio sotto la versione nuova.
+        """
+        transaction.on_commit(partial(CountCache._bump, model))
+
+    @staticmethod
+    def _bump(model):
+        key = CountCache.version_key(model)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Versione mai letta (o cache svuotata): nessun conteggio da invalidare
+                cache.add(key, 1, None)
+        except Exception:
+            # I conteggi in cache scadono comunque dopo LIST_COUNT_CACHE_TIMEOUT
+            logger.warning(f"Invalidazione dei conteggi di {model._meta.label} fallita", exc_info=True)
+
+    @staticmethod
+    def watch(model):
+        """
+        Invalida i conteggi del modello a ogni save e delete.
+        Da chiamare in AppConfig.ready().
+        """
+        def receiver(sender, **kwargs):
+            CountCache.invalidate(sender)
+
+        uid = f'count-cache:{model._meta.label_lower}'
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+
+    @staticmethod
+    def count(queryset):
+        """
+        COUNT(*) esatto del queryset, letto dalla cache se possibile.
+        """
+        # values('pk'): la chiave non dipende dalle colonne lette (es. ?fields=)
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        digest = hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+
+        try:
+            key = f'count:{queryset.model._meta.label_lower}:{CountCache.get_version(queryset.model)}:{digest}'
+            count = cache.get(key)
+        except Exception:
+            logger.warning("Cache dei conteggi non disponibile", exc_info=True)
+            return queryset.count()
+
+        if count is None:
+            count = queryset.count()
+            try:
+                cache.set(key, count, settings.LIST_COUNT_CACHE_TIMEOUT)
+            except Exception:
+                logger.warning("Cache dei conteggi non disponibile", exc_info=True)
+        return count
+
+    @staticmethod
+    def estimate(model, using='default'):
+        """
+        Numero di righe stimato dalle statistiche della tabella, senza leggerla.
+        None se il DB non le espone (es. sqlite).
+        """
+        connection = connections[using]
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                # EXPLAIN usa le statistiche InnoDB correnti; information_schema.TABLES
+                # può restare in cache fino a information_schema_stats_expiry
+                cursor.execute(f'EXPLAIN SELECT 1 FROM {table}')
+                columns = [column[0] for column in cursor.description]
+                return int(cursor.fetchone()[columns.index('rows')] or 0)
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+                return max(row[0], 0) if row else None
+        return None
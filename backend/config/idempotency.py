@@ -0,0 +1,94 @@
+# backend/config/idempotency.py
+from collections.abc import Mapping
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+
+
+class IdempotentCreateMixin:
+    """
+    Mixin per ModelViewSet: create idempotente su un campo univoco (dedup_key).
+
+    Prima l'INSERT, poi eventualmente la lettura: un doppione è riconosciuto dal
+    vincolo UNIQUE del DB (IntegrityError) e riceve 409 con l'id della riga
+    esistente. Nessuna SELECT preventiva: nella create i UniqueValidator del
+    serializer (es. url) vengono tolti, e due POST concorrenti con la stessa
+    chiave non possono creare due righe né finire in un 500.
+
+    Un IntegrityError su un altro vincolo (es. url già usato, chiave diversa o
+    assente) riceve 400 con l'errore del campo, come dalla validazione; se la
+    riga in conflitto non è ancora visibile, 409 con un errore generico.
+
+    L'header Idempotency-Key vale come dedup_key quando il body non lo indica
+    (se li indica entrambi devono coincidere).
+    """
+
+    idempotency_field = 'dedup_key'
+    idempotency_header = 'Idempotency-Key'
+
+    def get_conflict_data(self, instance):
+        """Body della risposta 409"""
+        return {'id': instance.id}
+
+    def get_existing(self, serializer, key):
+        """Riga con la chiave di idempotenza indicata, se esiste"""
+        if not key:
+            return None
+        model = serializer.Meta.model
+        return model._default_manager.filter(**{self.idempotency_field: key}).first()
+
+    def get_unique_errors(self, serializer):
+        """Errori per campo dei vincoli univoci violati dai dati validati (solo dopo l'IntegrityError)"""
+        try:
+            serializer.Meta.model(**serializer.validated_data).validate_unique(exclude=[self.idempotency_field])
+        except DjangoValidationError as e:
+            return e.message_dict
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    def get_idempotent_data(self, request):
+        data = request.data
+        if not isinstance(data, Mapping):
+            raise ValueError("Body non valido: atteso un oggetto")
+        key = request.headers.get(self.idempotency_header, '').strip()
+        if not key:
+            return data
+
+        current = data.get(self.idempotency_field)
+        if current and current != key:
+            raise ValueError(f"{self.idempotency_header} e {self.idempotency_field} non coincidono")
+        data = data.copy()
+        data[self.idempotency_field] = key
+        return data
+
+    def create(self, request, *args, **kwargs):
+        try:
+            data = self.get_idempotent_data(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=data)
+        # I vincoli univoci li verifica l'INSERT
+        for field in serializer.fields.values():
+            field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+        serializer.is_valid(raise_exception=True)
+        try:
+            # Savepoint: dopo l'IntegrityError la transazione resta utilizzabile
+            with transaction.atomic():
+                self.perform_create(serializer)
+        except IntegrityError:
+            existing = self.get_existing(serializer, serializer.validated_data.get(self.idempotency_field))
+            if existing is not None:
+                return Response(self.get_conflict_data(existing), status=status.HTTP_409_CONFLICT)
+            # Altro vincolo violato (es. url già usato): non è un doppione
+            errors = self.get_unique_errors(serializer)
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"error": "Violato un vincolo di unicità"}, status=status.HTTP_409_CONFLICT)
+
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -0,0 +1,204 @@
+# backend/config/pagination.py
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from config.counts import CountCache
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginazione a cursore sulla coppia (created_at, id), letta dall'indice composto:
+    ogni pagina è un WHERE (created_at, id) < (ultimo valore) ... LIMIT n,
+    quindi il costo non cresce con la profondità e non serve COUNT(*).
+    Ordine -created_at (default) oppure created_at con ?ordering=created_at.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+    invalid_cursor_message = 'Cursore non valido'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return api_settings.PAGE_SIZE
+
+    @staticmethod
+    def encode_cursor(created_at, pk, previous=False):
+        data = json.dumps([created_at.isoformat(), pk, previous])
+        return urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request):
+        value = request.query_params.get(self.cursor_query_param)
+        if not value:
+            return None
+        try:
+            created_at, pk, previous = json.loads(urlsafe_b64decode(value.encode()))
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError
+            return created_at, int(pk), bool(previous)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.descending = request.query_params.get('ordering') != 'created_at'
+        cursor = self.decode_cursor(request)
+        previous = bool(cursor and cursor[2])
+
+        # Le pagine precedenti si leggono al contrario e si rigirano
+        descending = self.descending != previous
+        if descending:
+            queryset = queryset.order_by('-created_at', '-id')
+        else:
+            queryset = queryset.order_by('created_at', 'id')
+
+        if cursor:
+            created_at, pk, _ = cursor
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'created_at__{lookup}': created_at})
+                | Q(created_at=created_at, **{f'id__{lookup}': pk})
+            )
+
+        # Una riga in più per sapere se esiste la pagina successiva
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if previous:
+            page.reverse()
+
+        self.next_item = page[-1] if page and (has_more or previous) else None
+        self.previous_item = page[0] if page and cursor and (has_more or not previous) else None
+        return page
+
+    def get_link(self, item, previous):
+        if item is None:
+            return None
+        url = self.request.build_absolute_uri()
+        # Le righe possono essere modelli o dict di values() (config/sparse.py)
+        if isinstance(item, dict):
+            cursor = self.encode_cursor(item['created_at'], item['id'], previous)
+        else:
+            cursor = self.encode_cursor(item.created_at, item.pk, previous)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.get_link(self.next_item, previous=False)
+
+    def get_previous_link(self):
+        return self.get_link(self.previous_item, previous=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CachedCountPagination(LimitOffsetPagination):
+    """
+    limit/offset con il count della paginazione in cache (CountCache).
+    Senza filtri, su tabelle oltre LIST_COUNT_ESTIMATE_THRESHOLD righe, usa la
+    stima delle statistiche della tabella invece di COUNT(*).
+    count_exact nella risposta dice se count è esatto o stimato.
+    """
+
+    def get_count(self, queryset):
+        self.count_exact = True
+        if not queryset.query.has_filters():
+            estimate = CountCache.estimate(queryset.model, using=queryset.db)
+            if estimate is not None and estimate >= settings.LIST_COUNT_ESTIMATE_THRESHOLD:
+                self.count_exact = False
+                return estimate
+        return CountCache.count(queryset)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_exact': self.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {
+            'type': 'boolean',
+            'description': 'false se count è stimato dalle statistiche della tabella',
+        }
+        return response_schema
+
+
+class OptionalKeysetPagination(CachedCountPagination):
+    """
+    limit/offset come nel resto dell'API; il client passa alla paginazione
+    a cursore (KeysetPagination) con ?pagination=cursor o ?cursor=...
+    I link next/previous restituiti contengono già il cursore.
+    """
+
+    keyset_class = KeysetPagination
+    mode_query_param = 'pagination'
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class() if self.use_keyset(request) else None
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': "'cursor' per la paginazione a cursore su (created_at, id)",
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': self.keyset_class.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursore restituito in next/previous',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -192,9 +192,53 @@ LOGGING = {
             'level': 'WARNING',
             'propagate': False,
         },
+        'persons.diagnostics': {
+            'handlers': ['console'],
+            'level': os.getenv("PERSONS_DIAGNOSTICS_LEVEL", "DEBUG"),
+            'propagate': False,
+        },
     },
 }
 
+# Cache condivisa tra API e worker (python manage.py createcachetable)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "crm_cache",
+    }
+}
+# Durata (secondi) dei COUNT(*) delle liste in cache; save/delete li invalidano prima
+LIST_COUNT_CACHE_TIMEOUT = int(os.getenv("LIST_COUNT_CACHE_TIMEOUT", "300"))
+# Oltre queste righe le liste senza filtri usano il conteggio stimato dalle statistiche
+LIST_COUNT_ESTIMATE_THRESHOLD = int(os.getenv("LIST_COUNT_ESTIMATE_THRESHOLD", "100000"))
+# Righe lette per query dagli export in streaming (persons/export, webform-submissions/export)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Diagnostica dell'app persons (persons/diagnostics.py)
+# Interruttore unico: spento non costa nulla, acceso emette eventi strutturati
+PERSONS_DIAGNOSTICS = os.getenv("PERSONS_DIAGNOSTICS") == "1"
+# Quota di richieste campionate (0-1)
+PERSONS_DIAGNOSTICS_SAMPLE_RATE = float(os.getenv("PERSONS_DIAGNOSTICS_SAMPLE_RATE", "1.0"))
+# Campi mascherati negli eventi
+PERSONS_DIAGNOSTICS_REDACT = [
+    'email', 'first_name', 'last_name', 'external_id', 'dedup_key', 'password', 'token',
+]
+if PERSONS_DIAGNOSTICS:
+    MIDDLEWARE.append("persons.diagnostics.DiagnosticsMiddleware")
+
+# CSV import
+# Durata (secondi) delle sessioni di import create da import_preview
+CSV_IMPORT_SESSION_TTL = int(os.getenv("CSV_IMPORT_SESSION_TTL", "3600"))
+# Sessioni scadute di job non completati: restano per la ripresa fino a questi
+# secondi dall'ultimo aggiornamento del job, poi vengono eliminate
+CSV_IMPORT_RESUME_TTL = int(os.getenv("CSV_IMPORT_RESUME_TTL", "86400"))
+# Processi usati dai job di import (1 = import sequenziale)
+CSV_IMPORT_WORKERS = int(os.getenv("CSV_IMPORT_WORKERS", "1"))
+# Esempi di errore restituiti inline: l'elenco completo è su import_jobs/{id}/errors/
+CSV_IMPORT_ERROR_EXAMPLES = int(os.getenv("CSV_IMPORT_ERROR_EXAMPLES", "20"))
+# Un job 'running' senza avanzamenti da questi secondi è considerato interrotto e può essere ripreso
+CSV_IMPORT_JOB_STALE_AFTER = int(os.getenv("CSV_IMPORT_JOB_STALE_AFTER", "300"))
+
 # Static files
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
@@ -0,0 +1,184 @@
+# backend/config/sparse.py
+from rest_framework import ISO_8601, fields, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Campi del serializer il cui valore da values() è già quello della risposta
+IDENTITY_FIELDS = (
+    fields.BooleanField,
+    fields.CharField,
+    fields.IntegerField,
+    fields.JSONField,
+)
+
+
+def datetime_converter(field):
+    """
+    DateTimeField.to_representation con fuso e formato risolti una volta sola:
+    è la parte più costosa della serializzazione di una riga.
+    Stesso output di DRF (ISO 8601, 'Z' per UTC); altri formati usano DRF.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+class ValuesPlan:
+    """
+    Serializzazione di una lista direttamente da queryset.values(), senza istanziare
+    i modelli né passare dal ModelSerializer per ogni riga.
+    Si ricava dal serializer: campi del modello, anche in ModelSerializer annidati
+    (seguendo le FK con select_related implicito di values()).
+    compile() restituisce None se il serializer ha campi non ricavabili
+    (es. SerializerMethodField): in quel caso si usa il serializer normale.
+    """
+
+    def __init__(self, model, entries, prefix=''):
+        self.model = model
+        self.entries = entries  # (nome, colonna, converter o ValuesPlan annidato)
+        self.prefix = prefix
+        self.pk_column = f'{prefix}{model._meta.pk.attname}'
+        self.nested = {name: plan for name, _, plan in entries if isinstance(plan, ValuesPlan)}
+
+    @classmethod
+    def compile(cls, serializer, names=None, prefix=''):
+        model = serializer.Meta.model
+        entries = []
+        for name, field in serializer.fields.items():
+            if field.write_only or (names is not None and name not in names):
+                continue
+
+            if isinstance(field, serializers.ModelSerializer):
+                nested = cls.compile(field, prefix=f'{prefix}{field.source}__')
+                if nested is None:
+                    return None
+                entries.append((name, nested.pk_column, nested))
+                continue
+
+            if isinstance(field, (serializers.BaseSerializer, serializers.RelatedField, fields.SerializerMethodField)):
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except Exception:
+                return None
+            if not model_field.concrete or model_field.is_relation:
+                return None
+
+            if isinstance(field, IDENTITY_FIELDS):
+                converter = None
+            elif isinstance(field, fields.DateTimeField):
+                converter = datetime_converter(field)
+            else:
+                converter = field.to_representation
+            entries.append((name, f'{prefix}{field.source}', converter))
+        return cls(model, entries, prefix)
+
+    @property
+    def columns(self):
+        columns = []
+        for _, column, converter in self.entries:
+            if isinstance(converter, ValuesPlan):
+                columns.extend(converter.columns)
+            else:
+                columns.append(column)
+        return columns
+
+    @property
+    def relations(self):
+        relations = []
+        for _, _, converter in self.entries:
+            if isinstance(converter, ValuesPlan):
+                relations.append(converter.prefix[:-2])
+                relations.extend(converter.relations)
+        return relations
+
+    def represent(self, row):
+        data = {}
+        for name, column, converter in self.entries:
+            if isinstance(converter, ValuesPlan):
+                # FK nulla: l'oggetto annidato è None, come nel serializer
+                data[name] = converter.represent(row) if row[column] is not None else None
+                continue
+            value = row[column]
+            data[name] = value if converter is None or value is None else converter(value)
+        return data
+
+    def serialize(self, rows):
+        represent = self.represent
+        return [represent(row) for row in rows]
+
+
+class SparseFieldsMixin:
+    """
+    Mixin per ModelViewSet:
+      - ?fields=id,email,created_at limita colonne SQL (only()/values()) e output
+      - la list usa ValuesPlan quando il serializer è ricavabile dai campi del modello
+    I campi di paginazione (id, created_at) vengono sempre letti, non restituiti.
+    """
+
+    fields_query_param = 'fields'
+    # Colonne lette comunque, per la paginazione a cursore
+    always_columns = ['id', 'created_at']
+
+    def get_requested_fields(self):
+        if not hasattr(self, '_requested_fields'):
+            value = self.request.query_params.get(self.fields_query_param, '') if self.request else ''
+            names = [name.strip() for name in value.split(',') if name.strip()]
+            if names:
+                readable = {
+                    name for name, field in self.get_serializer_class()().fields.items() if not field.write_only
+                }
+                unknown = [name for name in names if name not in readable]
+                if unknown:
+                    raise ValidationError({self.fields_query_param: f"Campi sconosciuti: {', '.join(unknown)}"})
+            self._requested_fields = names or None
+        return self._requested_fields
+
+    def get_values_plan(self):
+        if not hasattr(self, '_values_plan'):
+            self._values_plan = ValuesPlan.compile(self.get_serializer_class()(), self.get_requested_fields())
+        return self._values_plan
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request and self.request.method == 'GET' and self.action == 'retrieve' and self.get_requested_fields():
+            plan = self.get_values_plan()
+            if plan is not None:
+                # Solo le relazioni richieste: only() non ammette select_related su campi esclusi
+                queryset = queryset.select_related(None)
+                if plan.relations:
+                    queryset = queryset.select_related(*plan.relations)
+                queryset = queryset.only(*plan.columns)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_requested_fields() if self.request and self.request.method == 'GET' else None
+        if names:
+            target = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+            for name in list(target.fields):
+                if name not in names:
+                    target.fields.pop(name)
+        return serializer
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        columns = list(dict.fromkeys(plan.columns + self.always_columns))
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.serialize(page))
+        return Response(plan.serialize(queryset))
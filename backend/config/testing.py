@@ -0,0 +1,37 @@
+# backend/config/testing.py
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Cache in memoria per i test sul numero di query: con DatabaseCache anche le
+# letture del conteggio in cache (config/counts.py) sarebbero query
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'query-budget',
+    },
+}
+
+
+class QueryBudgetMixin:
+    """
+    Mixin per APITestCase: numero massimo di query SQL per una GET.
+    Le risposte in streaming (export) sono consumate dentro la misura.
+    Con più righe della pagina e relazioni tutte diverse, un N+1 supera il budget.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Ogni test parte con i conteggi della lista non in cache
+        cache.clear()
+
+    def assertQueryBudget(self, budget, url, params=None, status_code=200):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status_code)
+        if len(context) > budget:
+            queries = '\n'.join(query['sql'] for query in context.captured_queries)
+            self.fail(f"GET {url} {params or ''}: {len(context)} query, budget {budget}\n{queries}")
+        return response
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class PersonsConfig(AppConfig):
     name = 'persons'
+
+    def ready(self):
+        from config.counts import CountCache
+        from . import diagnostics, signals  # noqa: F401
+        from .models import Person
+        diagnostics.configure()
+        CountCache.watch(Person)
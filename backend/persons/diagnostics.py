@@ -0,0 +1,144 @@
+"""
+Diagnostica dell'app persons: eventi strutturati sul logger 'persons.diagnostics'.
+
+Un solo interruttore, PERSONS_DIAGNOSTICS: se è spento i punti di chiamata
+controllano solo la variabile ENABLED e nessun receiver di segnale è collegato,
+quindi il costo su liste, admin e import è nullo.
+Se è acceso:
+  - il livello del logger decide quali eventi escono (PERSONS_DIAGNOSTICS_LEVEL)
+  - DiagnosticsMiddleware campiona le richieste (PERSONS_DIAGNOSTICS_SAMPLE_RATE):
+    le richieste non campionate non emettono eventi
+  - i campi in PERSONS_DIAGNOSTICS_REDACT vengono mascherati, anche dentro i payload
+
+Uso nei punti caldi:
+
+    if diagnostics.ENABLED:
+        diagnostics.event('person.created', id=person.id)
+"""
+import json
+import logging
+import random
+import uuid
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_init, post_save, pre_save
+
+logger = logging.getLogger(__name__)
+
+ENABLED = False
+SAMPLE_RATE = 1.0
+REDACT = frozenset()
+
+# Id della richiesta campionata; None se la richiesta corrente non è campionata.
+# Fuori dalle richieste (comandi, worker) vale '' e gli eventi sono emessi.
+_request_id = ContextVar('persons_diagnostics_request', default='')
+
+
+class _Fields:
+    """
+    Serializza i campi in JSON solo se il record di log viene davvero formattato
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps(self.fields, default=str, ensure_ascii=False)
+
+
+def redact(value, key=None):
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v, key) for v in value]
+    if key in REDACT and value not in (None, ''):
+        # Dell'email resta il dominio, utile per capire da dove arrivano i dati
+        if isinstance(value, str) and '@' in value:
+            return '***@' + value.rsplit('@', 1)[1]
+        return '***'
+    return value
+
+
+def event(name, level=logging.DEBUG, **fields):
+    """
+    Emette l'evento se la richiesta corrente è campionata e il livello è attivo.
+    """
+    request_id = _request_id.get()
+    if not ENABLED or request_id is None or not logger.isEnabledFor(level):
+        return
+    if request_id:
+        fields['request_id'] = request_id
+    logger.log(level, '%s %s', name, _Fields(redact(fields)), extra={'event': name})
+
+
+class DiagnosticsMiddleware:
+    """
+    Decide una volta per richiesta se campionarla.
+    Aggiunto a MIDDLEWARE solo con PERSONS_DIAGNOSTICS attivo (config/settings.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = ENABLED and random.random() < SAMPLE_RATE
+        token = _request_id.set(uuid.uuid4().hex[:12] if sampled else None)
+        try:
+            return self.get_response(request)
+        finally:
+            _request_id.reset(token)
+
+
+def _person_init(sender, instance, **kwargs):
+    event(
+        'person.init',
+        id=instance.pk,
+        country=instance.country,
+        website=instance.website,
+        webform=instance.webform,
+    )
+
+
+def _person_pre_save(sender, instance, **kwargs):
+    event(
+        'person.save.before',
+        id=instance.pk,
+        country=instance.country,
+        website=instance.website,
+        webform=instance.webform,
+        type=instance.type,
+    )
+
+
+def _person_post_save(sender, instance, created, **kwargs):
+    event('person.save.after', id=instance.pk, created=created, country=instance.country, website=instance.website)
+
+
+def configure():
+    """
+    Legge le impostazioni e collega i receiver dei segnali di Person solo se attivo.
+    Chiamata da PersonsConfig.ready() e quando le impostazioni cambiano nei test.
+    """
+    global ENABLED, SAMPLE_RATE, REDACT
+    from .models import Person
+
+    ENABLED = settings.PERSONS_DIAGNOSTICS
+    SAMPLE_RATE = settings.PERSONS_DIAGNOSTICS_SAMPLE_RATE
+    REDACT = frozenset(settings.PERSONS_DIAGNOSTICS_REDACT)
+
+    receivers = [(post_init, _person_init), (pre_save, _person_pre_save), (post_save, _person_post_save)]
+    for signal, receiver in receivers:
+        if ENABLED:
+            signal.connect(receiver, sender=Person, dispatch_uid=f'persons.diagnostics.{receiver.__name__}')
+        else:
+            signal.disconnect(receiver, sender=Person, dispatch_uid=f'persons.diagnostics.{receiver.__name__}')
+
+
+def _setting_changed(setting, **kwargs):
+    if setting.startswith('PERSONS_DIAGNOSTICS'):
+        configure()
+
+
+setting_changed.connect(_setting_changed)
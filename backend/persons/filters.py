@@ -0,0 +1,111 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Person
+from .services.labels import PersonLabelService
+
+# Campi coperti dall'indice FULLTEXT person_search (migrazione 0010)
+SEARCH_FIELDS = ('email', 'first_name', 'last_name', 'organisation')
+# Lunghezza degli n-grammi indicizzati (ngram_token_size di MySQL, default 2)
+NGRAM_SIZE = 2
+MAX_TERMS = 5
+
+
+class PersonSearchFilter(BaseFilterBackend):
+    """
+    ?search=... su Person: ricerca per prefisso e sottostringa su email, nome,
+    cognome e organizzazione.
+    Su MySQL usa l'indice FULLTEXT con parser ngram e ordina per rilevanza;
+    sugli altri DB (sviluppo, test) ripiega su icontains.
+    Più parole vanno tutte trovate, anche in campi diversi.
+    """
+
+    search_param = 'search'
+
+    @staticmethod
+    def get_terms(value):
+        return value.split()[:MAX_TERMS]
+
+    @staticmethod
+    def match_against(terms):
+        """
+        Query in BOOLEAN MODE: ogni parola è obbligatoria. Col parser ngram una parola
+        lunga almeno NGRAM_SIZE diventa la frase dei suoi n-grammi (= sottostringa),
+        una più corta si cerca come prefisso di n-gramma.
+        Gli operatori booleani e la punteggiatura separano le parole.
+        """
+        words = []
+        for term in terms:
+            for word in re.findall(r'\w+', term):
+                words.append(f'+"{word}"' if len(word) >= NGRAM_SIZE else f'+{word}*')
+        return ' '.join(words)
+
+    @staticmethod
+    def contains(terms):
+        q = Q()
+        for term in terms:
+            term_q = Q()
+            for field in SEARCH_FIELDS:
+                term_q |= Q(**{f'{field}__icontains': term})
+            q &= term_q
+        return q
+
+    @staticmethod
+    def search(queryset, value):
+        terms = PersonSearchFilter.get_terms(value)
+        if not terms:
+            return queryset
+
+        # icontains verifica la sottostringa esatta (punteggiatura compresa)
+        # sulle sole righe trovate dall'indice
+        queryset = queryset.filter(PersonSearchFilter.contains(terms))
+
+        connection = connections[queryset.db]
+        query = PersonSearchFilter.match_against(terms)
+        if connection.vendor != 'mysql' or not query:
+            return queryset
+
+        columns = ', '.join(
+            connection.ops.quote_name(Person._meta.get_field(field).column) for field in SEARCH_FIELDS
+        )
+        match = f'MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)'
+        # In BOOLEAN MODE la rilevanza è > 0 solo per le righe trovate: MySQL usa
+        # l'indice FULLTEXT anche per il confronto MATCH(...) > 0 nel WHERE
+        return (
+            queryset
+            .annotate(search_rank=RawSQL(match, [query], output_field=FloatField()))
+            .filter(search_rank__gt=0)
+            .order_by('-search_rank', '-created_at')
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.search_param, '').strip()
+        if not value:
+            return queryset
+        return self.search(queryset, value)
+
+
+class PersonLabelFilter(BaseFilterBackend):
+    """
+    ?tags=a,b e ?roles=a,b su Person, letti dalla tabella indicizzata PersonLabel.
+    ?tags_match=any (o roles_match) accetta le Person con almeno una label;
+    il default è all: servono tutte. Altri valori: 400.
+    """
+
+    MATCHES = ('all', 'any')
+
+    def filter_queryset(self, request, queryset, view):
+        for param, kind in PersonLabelService.FIELDS.items():
+            match = request.query_params.get(f'{param}_match', 'all')
+            if match not in self.MATCHES:
+                raise ValidationError({f'{param}_match': f"Valori ammessi: {', '.join(self.MATCHES)}"})
+            value = request.query_params.get(param, '').strip()
+            if not value:
+                continue
+            queryset = PersonLabelService.filter(queryset, kind, value.split(','), match=match)
+        return queryset
@@ -0,0 +1,46 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from persons.services.import_jobs import ImportJobService
+
+
+def _work(poll_interval, once):
+    ImportJobService.work(poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = "Esegue gli import CSV in coda (tabella ImportJob) con un pool di processi worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Numero di processi worker")
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=ImportJobService.POLL_INTERVAL,
+            help="Secondi di attesa quando la coda è vuota"
+        )
+        parser.add_argument('--once', action='store_true', help="Esce quando la coda è vuota")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        self.stdout.write(f"Import worker avviato ({workers} processi)")
+
+        if workers == 1:
+            _work(poll_interval, once)
+            return
+
+        # Ogni processo apre la propria connessione al DB
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_work, args=(poll_interval, once))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
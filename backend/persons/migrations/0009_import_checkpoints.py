@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persons', '0008_import_row_errors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='workers',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partition', models.PositiveIntegerField(default=0)),
+                ('row_number', models.PositiveIntegerField(default=0)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='persons.importjob')),
+            ],
+            options={
+                'unique_together': {('job', 'partition')},
+            },
+        ),
+    ]
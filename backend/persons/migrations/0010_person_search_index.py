@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# Indice FULLTEXT con parser ngram per ?search= (persons/filters.py).
+# Solo MySQL: sugli altri DB la ricerca ripiega su icontains.
+# Le stopword vanno disattivate alla creazione dell'indice, altrimenti
+# gli n-grammi che le contengono ("de", "la", "it", ...) non vengono indicizzati.
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute("SET SESSION innodb_ft_enable_stopword = OFF")
+    schema_editor.execute(
+        "ALTER TABLE persons_person ADD FULLTEXT INDEX person_search "
+        "(email, first_name, last_name, organisation) WITH PARSER ngram"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute("ALTER TABLE persons_person DROP INDEX person_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persons', '0009_import_checkpoints'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def split(value):
+    # Come PersonLabelService.split: nomi in casefold, senza vuoti né doppioni
+    names = []
+    for name in (value or '').split(','):
+        name = name.strip().casefold()[:255]
+        if name:
+            names.append(name)
+    return list(dict.fromkeys(names))
+
+
+def backfill_labels(apps, schema_editor):
+    """
+    Popola PersonLabel dai campi CSV tags e roles delle Person esistenti.
+    """
+    Person = apps.get_model('persons', 'Person')
+    PersonLabel = apps.get_model('persons', 'PersonLabel')
+
+    last_id = 0
+    while True:
+        batch = list(
+            Person.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'tags', 'roles')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        PersonLabel.objects.bulk_create(
+            [
+                PersonLabel(person_id=person_id, kind=kind, name=name)
+                for person_id, tags, roles in batch
+                for kind, value in (('tag', tags), ('role', roles))
+                for name in split(value)
+            ],
+            # Nomi uguali per la collation del DB (es. 'café' e 'cafe' con *_ai_ci)
+            ignore_conflicts=True
+        )
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persons', '0011_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tag', 'Tag'), ('role', 'Ruolo')], max_length=10)),
+                ('name', models.CharField(max_length=255)),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='labels', to='persons.person')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'name', 'person'], name='persons_per_kind_09fbc9_idx')],
+                'unique_together': {('person', 'kind', 'name')},
+            },
+        ),
+        migrations.RunPython(backfill_labels, migrations.RunPython.noop),
+    ]
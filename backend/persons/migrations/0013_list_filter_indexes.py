@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persons', '0012_person_labels'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['updated_at'], name='persons_per_updated_b7eb1a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['source_website', 'created_at'], name='persons_per_source__42640f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['source_website', 'updated_at'], name='persons_per_source__356d72_idx'),
+        ),
+    ]
@@ -1,7 +1,6 @@
-from django.db import models
-import logging
+import uuid
 
-logger = logging.getLogger(__name__)
+from django.db import models
 
 
 class Person(models.Model):
@@ -30,21 +29,155 @@ class Person(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        logger.warning(f"[PERSON.__INIT__] country={self.country}, website={self.website}, webform={self.webform}")
-
-    def save(self, *args, **kwargs):
-        logger.warning(f"[PERSON.SAVE] Before save: country={self.country}, website={self.website}, webform={self.webform}, type={self.type}")
-        super().save(*args, **kwargs)
-        logger.warning(f"[PERSON.SAVE] After save: ID={self.id}, country={self.country}, website={self.website}")
-
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['email']),
             models.Index(fields=['external_id']),
+            # Paginazione a cursore (config/pagination.py)
+            models.Index(fields=['created_at', 'id']),
+            # Filtri e ordinamenti della lista (check_query_plans.py)
+            models.Index(fields=['updated_at']),
+            models.Index(fields=['source_website', 'created_at']),
+            models.Index(fields=['source_website', 'updated_at']),
         ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
+
+
+class PersonLabel(models.Model):
+    """
+    Tag o ruolo di una Person: forma indicizzata dei campi CSV tags e roles.
+    name è in casefold (PersonLabelService.split), anche nei filtri.
+    """
+    KIND_TAG = 'tag'
+    KIND_ROLE = 'role'
+    KIND_CHOICES = [
+        (KIND_TAG, 'Tag'),
+        (KIND_ROLE, 'Ruolo'),
+    ]
+
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="labels")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = [('person', 'kind', 'name')]
+        indexes = [
+            # "tutti con il tag X" e conteggi per tag senza leggere Person
+            models.Index(fields=['kind', 'name', 'person']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.name} ({self.person_id})"
+
+
+class ImportSession(models.Model):
+    """Import CSV in attesa di esecuzione: le righe restano sul server fino alla scadenza"""
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    header = models.JSONField(blank=True, null=True)
+    mapping = models.JSONField(blank=True, null=True)
+    row_count = models.PositiveIntegerField(default=0)
+    # True se le righe sono già records (dict) e non liste di valori del CSV
+    mapped = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"ImportSession {self.token} ({self.row_count} righe)"
+
+
+class ImportStagedRow(models.Model):
+    """Riga del CSV (lista di valori, o record già mappato) salvata in anteprima"""
+    session = models.ForeignKey(ImportSession, on_delete=models.CASCADE, related_name="rows")
+    row_number = models.PositiveIntegerField()
+    data = models.JSONField()
+
+    class Meta:
+        ordering = ['row_number']
+        unique_together = ['session', 'row_number']
+
+
+class ImportJob(models.Model):
+    """Import eseguito in background da un worker (manage.py run_import_worker)"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    session = models.ForeignKey(
+        ImportSession,
+        on_delete=models.SET_NULL,
+        related_name="jobs",
+        null=True,
+        blank=True
+    )
+    mapping = models.JSONField(blank=True, null=True)
+    on_conflict = models.CharField(max_length=20, default='skip')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    # Avanzamento e statistiche parziali
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # Conteggio per tipo e primi esempi; l'elenco completo è in ImportRowError
+    error_types = models.JSONField(default=dict, blank=True)
+    errors = models.JSONField(default=list, blank=True)
+    failure = models.TextField(blank=True)
+
+    # Processi usati per l'import: una ripresa deve usare lo stesso partizionamento
+    workers = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=255, blank=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"ImportJob {self.id} ({self.status})"
+
+
+class ImportRowError(models.Model):
+    """Errore di una riga di un ImportJob, consultabile a pagine"""
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name="row_errors")
+    row_number = models.PositiveIntegerField()
+    error_type = models.CharField(max_length=100)
+    message = models.TextField()
+    data = models.JSONField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['row_number']
+        indexes = [
+            models.Index(fields=['job', 'row_number']),
+            models.Index(fields=['job', 'error_type', 'row_number']),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Ultima riga importata (blocco committato) da una partizione di un ImportJob"""
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name="checkpoints")
+    partition = models.PositiveIntegerField(default=0)
+    row_number = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['job', 'partition']
@@ -1,8 +1,6 @@
 from rest_framework import serializers
-from .models import Person
-import logging
-
-logger = logging.getLogger(__name__)
+from . import diagnostics
+from .models import ImportRowError, Person
 
 
 class PersonSerializer(serializers.ModelSerializer):
@@ -32,8 +30,16 @@ class PersonSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
     def create(self, validated_data):
-        logger.warning(f"[SERIALIZER.CREATE] validated_data keys: {list(validated_data.keys())}")
-        logger.warning(f"[SERIALIZER.CREATE] country={validated_data.get('country')}, website={validated_data.get('website')}, tags={validated_data.get('tags')}")
+        if diagnostics.ENABLED:
+            diagnostics.event('serializer.create', fields=list(validated_data), data=validated_data)
         instance = super().create(validated_data)
-        logger.warning(f"[SERIALIZER.CREATE] After save: country={instance.country}, website={instance.website}")
+        if diagnostics.ENABLED:
+            diagnostics.event('serializer.created', id=instance.id, country=instance.country, website=instance.website)
         return instance
+
+
+class ImportRowErrorSerializer(serializers.ModelSerializer):
+    """Errore di una riga di un import in background"""
+    class Meta:
+        model = ImportRowError
+        fields = ['row_number', 'error_type', 'message', 'data']
@@ -0,0 +1,121 @@
+from django.db import transaction
+from django.utils import timezone
+from config.counts import CountCache
+from persons.models import Person, PersonLabel
+from persons.services.labels import PersonLabelService
+
+
+class PersonBulkService:
+    """
+    Aggiornamento e cancellazione di molte Person con poche query set-based
+    (UPDATE/DELETE ... WHERE id IN (...)), in un'unica transazione.
+    """
+
+    # Campi modificabili in blocco: email, external_id e dedup_key sono univoci
+    UPDATABLE_FIELDS = [
+        'first_name', 'last_name', 'source_website', 'country', 'organisation',
+        'domain', 'website', 'webform', 'tags', 'roles', 'ppg', 'type',
+    ]
+    # Id per singola query (dimensione della clausola IN)
+    BATCH_SIZE = 1000
+    MAX_ITEMS = 50000
+
+    @staticmethod
+    def _batches(values):
+        size = PersonBulkService.BATCH_SIZE
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
+
+    @staticmethod
+    def resolve(ids=None, emails=None):
+        """
+        Id delle Person indicate per id o per email, e quelli/quelle non trovati.
+        """
+        if bool(ids) == bool(emails):
+            raise ValueError("Indicare ids oppure emails")
+
+        values = ids or emails
+        if not isinstance(values, list):
+            raise ValueError("ids/emails deve essere una lista")
+        if len(values) > PersonBulkService.MAX_ITEMS:
+            raise ValueError(f"Massimo {PersonBulkService.MAX_ITEMS} elementi per richiesta")
+
+        found = {}
+        if ids:
+            try:
+                values = [int(value) for value in values]
+            except (TypeError, ValueError):
+                raise ValueError("ids deve contenere solo interi")
+            for batch in PersonBulkService._batches(values):
+                for person_id in Person.objects.filter(pk__in=batch).values_list('id', flat=True):
+                    found[person_id] = person_id
+        else:
+            values = [str(value).strip().lower() for value in values]
+            for batch in PersonBulkService._batches(values):
+                for person_id, email in Person.objects.filter(email__in=batch).values_list('id', 'email'):
+                    # La collation di Person.email è case-insensitive
+                    found[email.strip().lower()] = person_id
+
+        not_found = [value for value in dict.fromkeys(values) if value not in found]
+        return sorted(set(found.values())), not_found
+
+    @staticmethod
+    def validate_changes(changes):
+        if not isinstance(changes, dict) or not changes:
+            raise ValueError("changes deve essere un oggetto con almeno un campo")
+        invalid = [field for field in changes if field not in PersonBulkService.UPDATABLE_FIELDS]
+        if invalid:
+            raise ValueError(f"Campi non modificabili in blocco: {', '.join(invalid)}")
+
+    @staticmethod
+    def update(person_ids, changes):
+        """
+        Applica changes (già validati) a tutte le Person in person_ids.
+        Le label di tags/roles vengono riscritte con una delete e una bulk_create.
+        """
+        updated = 0
+        with transaction.atomic():
+            now = timezone.now()
+            for batch in PersonBulkService._batches(person_ids):
+                updated += Person.objects.filter(pk__in=batch).update(**changes, updated_at=now)
+
+            for field, kind in PersonLabelService.FIELDS.items():
+                if field not in changes:
+                    continue
+                names = PersonLabelService.split(changes[field])
+                for batch in PersonBulkService._batches(person_ids):
+                    PersonLabel.objects.filter(person_id__in=batch, kind=kind).delete()
+                    PersonLabel.objects.bulk_create(
+                        [
+                            PersonLabel(person_id=person_id, kind=kind, name=name)
+                            for person_id in batch
+                            for name in names
+                        ],
+                        # Nomi diversi ma uguali per la collation del DB (es. 'café' e
+                        # 'cafe' con *_ai_ci): una sola label, come in PersonLabelService.sync
+                        ignore_conflicts=True
+                    )
+
+            # update() non invia post_save
+            CountCache.invalidate(Person)
+        return updated
+
+    @staticmethod
+    def delete(person_ids):
+        """
+        Elimina le Person in person_ids (con submissions e label, in cascata).
+        """
+        deleted = 0
+        related = {}
+        # Le post_delete delle submission in cascata aggiornano i conteggi
+        # giornalieri (webforms/signals.py) una volta sola, al commit
+        with transaction.atomic():
+            for batch in PersonBulkService._batches(person_ids):
+                _, per_model = Person.objects.filter(pk__in=batch).delete()
+                for label, count in per_model.items():
+                    if label == Person._meta.label:
+                        deleted += count
+                    else:
+                        related[label] = related.get(label, 0) + count
+            CountCache.invalidate(Person)
+        return deleted, related
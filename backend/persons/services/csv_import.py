@@ -1,15 +1,66 @@
+import codecs
 import csv
+import gzip
 import io
+import itertools
+import json
 import logging
-from django.db import IntegrityError
-from persons.models import Person
+import multiprocessing
+import os
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from operator import itemgetter
+from django.conf import settings
+from django.db import DataError, IntegrityError, InterfaceError, OperationalError, connection, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from config.counts import CountCache
+from persons.models import ImportJob, ImportSession, ImportStagedRow, Person
+from persons.services.labels import PersonLabelService
 
 logger = logging.getLogger(__name__)
 
+# Virgolette rimosse all'inizio e alla fine dei valori
+QUOTE_CHARS = '"\''
+
+# Firme dei formati compressi riconosciuti negli upload
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+
+
+class _ChunkStream(io.RawIOBase):
+    """
+    Stream binario in sola lettura sopra un iterabile di blocchi di bytes
+    (es. UploadedFile.chunks()), per decodificare il file senza caricarlo tutto.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
 class CSVImportService:
     """
     Servizio per importare Person da CSV con mapping dei campi.
     Supporta configurazione flessibile dei mapping.
+    Accetta anche JSON lines e file compressi gzip o zip.
     """
 
     REQUIRED_FIELDS = ['email']
@@ -18,6 +69,19 @@ class CSVImportService:
         'country', 'organisation', 'domain', 'tags', 'roles', 'ppg', 'type', 'website', 'webform'
     ]
 
+    # Numero di records scritti per ogni blocco set-based
+    CHUNK_SIZE = 1000
+    # Dimensione dei blocchi letti dal file caricato
+    READ_CHUNK_SIZE = 64 * 1024
+    # Righe restituite nell'anteprima
+    PREVIEW_ROWS = 5
+    # Bytes letti all'inizio del file per riconoscere JSON lines
+    SNIFF_SIZE = 1024
+
+    # Tipi di errore dell'import (oltre al nome dell'eccezione per gli errori generici)
+    ERROR_MISSING_EMAIL = 'missing_email'
+    ERROR_INTEGRITY = 'integrity'
+
     @staticmethod
     def validate_mapping(mapping):
         if 'email' not in mapping:
@@ -51,134 +115,720 @@ class CSVImportService:
         return value if value else None
 
     @staticmethod
-    def parse_csv(file_content, mapping=None, skip_header=True):
+    def _open_binary(file_content):
         """
-        Parsa un file CSV e ritorna lista di records mappati.
-        Gestisce correttamente BOM, virgolette e spazi.
+        Ritorna uno stream binario letto in modo incrementale, già decompresso.
+        Accetta bytes, un UploadedFile di Django (letto con chunks())
+        o un qualsiasi file binario. Riconosce gzip e zip dai primi bytes.
         """
         if isinstance(file_content, bytes):
-            # L'encoding 'utf-8-sig' rimuove automaticamente il BOM
-            content_str = file_content.decode('utf-8-sig')
-            file_content = io.StringIO(content_str)
-        elif isinstance(file_content, str):
+            chunks = [file_content]
+        elif hasattr(file_content, 'chunks'):
+            chunks = file_content.chunks(chunk_size=CSVImportService.READ_CHUNK_SIZE)
+        else:
+            chunks = iter(lambda: file_content.read(CSVImportService.READ_CHUNK_SIZE), b'')
+
+        stream = io.BufferedReader(_ChunkStream(chunks), CSVImportService.READ_CHUNK_SIZE)
+        magic = stream.peek(len(ZIP_MAGIC))[:len(ZIP_MAGIC)]
+
+        if magic.startswith(GZIP_MAGIC):
+            return io.BufferedReader(gzip.GzipFile(fileobj=stream), CSVImportService.READ_CHUNK_SIZE)
+
+        if magic.startswith(ZIP_MAGIC):
+            # Lo zip ha l'indice in fondo: serve il file seekable, non lo stream
+            if isinstance(file_content, bytes):
+                file_content = io.BytesIO(file_content)
+            elif not file_content.seekable():
+                raise ValueError("Archivio zip non leggibile: il file non è seekable")
+            file_content.seek(0)
+
+            archive = zipfile.ZipFile(file_content)
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+            ]
+            if not members:
+                raise ValueError("L'archivio zip è vuoto")
+            # Il membro viene decompresso a blocchi durante la lettura
+            return archive.open(members[0])
+
+        return stream
+
+    @staticmethod
+    def _open_text(file_content):
+        """
+        Ritorna (text, jsonl): uno stream di testo letto in modo incrementale
+        e se il contenuto è JSON lines (primo carattere significativo '{').
+        Accetta str o tutto ciò che accetta _open_binary. Il BOM iniziale viene rimosso.
+        """
+        if isinstance(file_content, str):
             # Se è già stringa, rimuoviamo manualmente il BOM se presente
-            file_content = io.StringIO(content_str.lstrip('\ufeff'))
+            content = file_content.lstrip('\ufeff')
+            return io.StringIO(content, newline=''), content.lstrip().startswith('{')
+
+        binary = CSVImportService._open_binary(file_content)
+        head = binary.peek(CSVImportService.SNIFF_SIZE)
+        if head.startswith(codecs.BOM_UTF8):
+            head = head[len(codecs.BOM_UTF8):]
+
+        # L'encoding 'utf-8-sig' rimuove automaticamente il BOM
+        text = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+        return text, head.lstrip().startswith(b'{')
+
+    @staticmethod
+    def _json_cell(value):
+        """
+        Converte un valore JSON nella stringa che avrebbe nel CSV.
+        """
+        if value is None:
+            return ''
+        if isinstance(value, list):
+            # es. "tags": ["a", "b"] -> "a,b", come nel formato CSV di Person
+            return ','.join(CSVImportService._json_cell(item) for item in value)
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        return str(value)
+
+    @staticmethod
+    def _read_jsonl(text):
+        """
+        Righe di un file JSON lines: la prima è l'header sintetizzato dalle chiavi
+        del primo oggetto, le successive i valori nello stesso ordine.
+        """
+        header = None
+        for line_number, line in enumerate(text, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Riga {line_number}: JSON non valido ({e})")
+            if not isinstance(item, dict):
+                raise ValueError(f"Riga {line_number}: atteso un oggetto JSON")
+
+            if header is None:
+                header = list(item.keys())
+                yield header
+
+            row = [CSVImportService._json_cell(item.get(key)) for key in header]
+            if not any(row):  # Salta righe vuote
+                continue
+            yield row
+
+    @staticmethod
+    def _open_rows(file_content):
+        """
+        Apre il file (CSV o JSON lines, anche gzip o zip) e ritorna (rows, has_header):
+        rows è un generatore di righe grezze (liste di stringhe), righe vuote escluse.
+        Per JSON lines la prima riga è sempre l'header ricavato dalle chiavi.
+        """
+        text, jsonl = CSVImportService._open_text(file_content)
+
+        if jsonl:
+            return CSVImportService._read_jsonl(text), True
+
+        def rows():
+            for row in csv.reader(text, skipinitialspace=True):
+                if not any(row):  # Salta righe vuote
+                    continue
+                yield row
+
+        return rows(), False
+
+    @staticmethod
+    def _read_rows(file_content):
+        """
+        Generatore delle righe grezze (liste di stringhe) del file, righe vuote escluse.
+        """
+        rows, _ = CSVImportService._open_rows(file_content)
+        yield from rows
 
-        # Usa csv.DictReader per gestire meglio i CSV
+    @staticmethod
+    def resolve_mapping(header, mapping=None):
+        """
+        Ritorna il mapping campo -> indice di colonna, validato.
+        Senza mapping si usano i nomi delle colonne dell'header (ripuliti).
+        """
         if mapping is None:
-            if not skip_header:
+            if header is None:
                 raise ValueError("Se skip_header è False, mapping deve essere fornito")
-            
-            # Usa DictReader che gestisce automaticamente l'header
-            reader = csv.DictReader(file_content, skipinitialspace=True)
-            
-            # Verifica che ci siano colonne
-            if reader.fieldnames is None:
-                raise ValueError("Il file CSV è vuoto")
-            
+
             # Pulisci i nomi delle colonne
-            cleaned_fieldnames = [CSVImportService.clean_value(name) for name in reader.fieldnames]
-            reader.fieldnames = cleaned_fieldnames
-            
+            cleaned_fieldnames = [CSVImportService.clean_value(name) for name in header]
+
             # Valida i campi
-            mapping = {field: field for field in cleaned_fieldnames}
-            CSVImportService.validate_mapping(mapping)
-            
-            records = []
-            for row in reader:
-                if not any(row.values()):  # Salta righe vuote
-                    continue
-                
-                # Pulisci tutti i valori della riga
-                record = {
-                    key: CSVImportService.clean_value(value)
-                    for key, value in row.items()
-                }
-                records.append(record)
-        else:
-            # Modalità con mapping personalizzato
-            reader = csv.reader(file_content, skipinitialspace=True)
-            
-            if skip_header:
-                try:
-                    next(reader)  # Salta l'header
-                except StopIteration:
-                    raise ValueError("Il file CSV è vuoto")
-            
-            CSVImportService.validate_mapping(mapping)
-            
-            records = []
-            for row in reader:
-                if not any(row):  # Salta righe vuote
-                    continue
-                
-                record = {}
-                for field, col_idx in mapping.items():
-                    if col_idx < len(row):
-                        record[field] = CSVImportService.clean_value(row[col_idx])
-                    else:
-                        record[field] = None
-                records.append(record)
+            CSVImportService.validate_mapping({field: field for field in cleaned_fieldnames})
+            return {field: idx for idx, field in enumerate(cleaned_fieldnames)}
+
+        CSVImportService.validate_mapping(mapping)
+        return mapping
+
+    @staticmethod
+    def compile_mapping(mapping):
+        """
+        Compila il mapping campo -> indice in una funzione riga -> record.
+        Indici e nomi dei campi sono calcolati una volta sola per import,
+        e la pulizia usa i metodi str (in C) invece dei cicli di clean_value.
+        Il risultato è identico a clean_value applicato a ogni cella.
+        """
+        fields = tuple(mapping.keys())
+        indexes = tuple(mapping.values())
+        width = max(indexes) + 1 if indexes else 0
+        getter = itemgetter(*indexes) if len(indexes) > 1 else None
+        quotes = QUOTE_CHARS
+
+        def clean(value):
+            # Equivalente a clean_value: spazi, virgolette iniziali/finali, di nuovo spazi
+            return (value.strip().lstrip(quotes).rstrip(quotes).strip() or None) if value else None
+
+        def transform(row):
+            if len(row) >= width:
+                values = getter(row) if getter is not None else [row[idx] for idx in indexes]
+            else:
+                values = [row[idx] if idx < len(row) else None for idx in indexes]
+            return dict(zip(fields, map(clean, values)))
+
+        return transform
+
+    @staticmethod
+    def _open_csv(file_content, mapping=None, skip_header=True):
+        """
+        Prepara la lettura del CSV.
+        Ritorna (header, transform, rows) dove rows è un generatore di righe grezze
+        e transform la funzione compilata riga -> record per il mapping.
+        """
+        rows, has_header = CSVImportService._open_rows(file_content)
+
+        if mapping is None and not (skip_header or has_header):
+            raise ValueError("Se skip_header è False, mapping deve essere fornito")
+
+        header = None
+        if skip_header or has_header:
+            try:
+                header = next(rows)  # Salta l'header
+            except StopIteration:
+                raise ValueError("Il file CSV è vuoto")
+
+        resolved = CSVImportService.resolve_mapping(header, mapping)
+        return header, CSVImportService.compile_mapping(resolved), rows
+
+    @staticmethod
+    def iter_csv(file_content, mapping=None, skip_header=True):
+        """
+        Generatore di records mappati: legge il file un blocco alla volta,
+        la memoria resta costante qualunque sia la dimensione del file.
+        """
+        _, transform, rows = CSVImportService._open_csv(file_content, mapping, skip_header)
+        yield from map(transform, rows)
+
+    @staticmethod
+    def parse_csv(file_content, mapping=None, skip_header=True):
+        """
+        Parsa un file CSV e ritorna lista di records mappati.
+        Gestisce correttamente BOM, virgolette e spazi.
+        """
+        return list(CSVImportService.iter_csv(file_content, mapping, skip_header))
+
+    @staticmethod
+    def preview_csv(file_content, mapping=None, skip_header=True, limit=None):
+        """
+        Anteprima del CSV: header, prime `limit` righe e numero totale di righe.
+        Le righe oltre l'anteprima vengono solo contate, senza tenerle in memoria.
+        """
+        limit = CSVImportService.PREVIEW_ROWS if limit is None else limit
+        header, transform, rows = CSVImportService._open_csv(file_content, mapping, skip_header)
+
+        sample = []
+        count = 0
+        for row in rows:
+            if count < limit:
+                sample.append(transform(row))
+            count += 1
+
+        return {'header': header, 'count': count, 'sample': sample}
+
+    @staticmethod
+    def stage_csv(file_content, mapping=None, skip_header=True, limit=None):
+        """
+        Come preview_csv, ma salva anche le righe grezze in una ImportSession
+        sul server. Ritorna l'anteprima con il token da passare all'import,
+        così i records non devono fare il giro dal client.
+        """
+        limit = CSVImportService.PREVIEW_ROWS if limit is None else limit
+        CSVImportService.purge_expired_sessions()
+
+        header, transform, rows = CSVImportService._open_csv(file_content, mapping, skip_header)
+
+        sample = []
+
+        def staged_rows():
+            for count, row in enumerate(rows, start=1):
+                if count <= limit:
+                    sample.append(transform(row))
+                yield row
 
-        return records
+        session = CSVImportService._create_session(staged_rows(), header=header, mapping=mapping)
+
+        return {
+            'token': str(session.token),
+            'expires_at': session.expires_at,
+            'header': header,
+            'count': session.row_count,
+            'sample': sample,
+        }
+
+    @staticmethod
+    def stage_records(records):
+        """
+        Salva in una ImportSession dei records già mappati (dict),
+        es. quelli inviati dal frontend a bulk_import.
+        """
+        return CSVImportService._create_session(records, mapped=True)
+
+    @staticmethod
+    def _create_session(rows, header=None, mapping=None, mapped=False):
+        """
+        Crea una ImportSession e vi salva le righe a blocchi di CHUNK_SIZE.
+        """
+        session = ImportSession.objects.create(
+            header=header,
+            mapping=mapping,
+            mapped=mapped,
+            expires_at=timezone.now() + timedelta(seconds=settings.CSV_IMPORT_SESSION_TTL),
+        )
+
+        count = 0
+        batch = []
+        try:
+            for row in rows:
+                count += 1
+                batch.append(ImportStagedRow(session=session, row_number=count, data=row))
+                if len(batch) >= CSVImportService.CHUNK_SIZE:
+                    ImportStagedRow.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                ImportStagedRow.objects.bulk_create(batch)
+        except Exception:
+            session.delete()
+            raise
+
+        session.row_count = count
+        session.save(update_fields=['row_count'])
+        return session
+
+    @staticmethod
+    def get_session(token):
+        """
+        Ritorna la ImportSession non scaduta con il token dato.
+        """
+        session = ImportSession.objects.filter(
+            token=token,
+            expires_at__gt=timezone.now()
+        ).first()
+        if session is None:
+            raise ValueError("Sessione di import inesistente o scaduta")
+        return session
+
+    @staticmethod
+    def iter_staged(session, mapping=None, after=0):
+        """
+        Generatore dei records mappati di una ImportSession, letti dal DB a blocchi.
+        Se mapping non è fornito si usa quello dell'anteprima.
+        after permette di ripartire dopo una riga già importata (checkpoint).
+        """
+        rows = session.rows.filter(row_number__gt=after).order_by('row_number').values_list('data', flat=True)
+
+        if session.mapped:
+            yield from rows.iterator(chunk_size=CSVImportService.CHUNK_SIZE)
+            return
+
+        if mapping is None:
+            mapping = session.mapping
+        transform = CSVImportService.compile_mapping(
+            CSVImportService.resolve_mapping(session.header, mapping)
+        )
+        yield from map(transform, rows.iterator(chunk_size=CSVImportService.CHUNK_SIZE))
+
+    @staticmethod
+    def purge_expired_sessions():
+        """
+        Elimina le sessioni di import scadute e le relative righe.
+        Le sessioni di job non completati servono per riprendere l'import: restano
+        fino a CSV_IMPORT_RESUME_TTL secondi dall'ultimo aggiornamento del job.
+        """
+        now = timezone.now()
+        resumable = ImportJob.objects.filter(
+            status__in=[ImportJob.STATUS_PENDING, ImportJob.STATUS_RUNNING, ImportJob.STATUS_FAILED],
+            updated_at__gt=now - timedelta(seconds=settings.CSV_IMPORT_RESUME_TTL),
+        ).values('session_id')
+        deleted, _ = ImportSession.objects.filter(expires_at__lte=now).exclude(pk__in=resumable).delete()
+        if deleted:
+            logger.info(f"Eliminate {deleted} righe di sessioni di import scadute")
 
     @staticmethod
-    def import_persons(records, on_conflict='update'):
+    def _person_defaults(record):
+        """
+        Valori dei campi opzionali di un record, come li salva l'import.
+        """
+        return {
+            field: record.get(field, '') if field in ['first_name', 'last_name'] else record.get(field)
+            for field in CSVImportService.OPTIONAL_FIELDS
+        }
+
+    @staticmethod
+    def _email_key(email):
+        """
+        Chiave di confronto per l'email: la collation MySQL di Person.email
+        è case-insensitive, quindi confrontiamo in minuscolo.
+        """
+        return email.strip().lower()
+
+    @staticmethod
+    def _chunked(numbered_records, size):
+        """
+        Raggruppa le coppie (numero_riga, record) in liste di dimensione massima size.
+        Accetta sia liste che generatori.
+        """
+        chunk = []
+        for item in numbered_records:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def import_persons(records, on_conflict='update', chunk_size=None, progress=None, offset=0):
         """
         Importa una lista di person records nel database.
         Default on_conflict impostato su 'update' per maggiore utilità.
+
+        I records vengono elaborati a blocchi di chunk_size: per ogni blocco
+        una sola SELECT per email ed external_id e una sola bulk_create (delle
+        sole email nuove per 'skip', con update_conflicts altrimenti). Le righe con
+        un external_id già usato da un'altra Person passano dall'import riga per riga.
+        Se il blocco fallisce a livello DB si ripiega sull'import riga per riga,
+        così gli errori restano attribuiti alla riga corretta.
+
+        Ogni blocco è scritto in una transazione: un errore a metà import lascia
+        nel DB solo blocchi completi.
+
+        Gli errori sono aggregati per tipo (error_count, error_types) e in
+        'errors' restano solo i primi CSV_IMPORT_ERROR_EXAMPLES esempi.
+        progress, se fornito, viene chiamato dopo ogni blocco, nella stessa
+        transazione, con (righe_del_blocco, stats_del_blocco, ultima_riga, partizione):
+        stats_del_blocco contiene tutti gli errori del blocco, così chi vuole
+        l'elenco completo può salvarlo, e ultima_riga può servire da checkpoint.
+        offset è il numero di righe già importate (ripresa da un checkpoint).
         """
-        stats = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+        return CSVImportService._import_numbered(
+            enumerate(records, start=offset + 1), on_conflict, chunk_size, progress
+        )
 
-        for idx, record in enumerate(records, start=1):
-            try:
+    @staticmethod
+    def _new_stats():
+        return {
+            'created': 0,
+            'updated': 0,
+            'skipped': 0,
+            'errors': [],
+            'error_count': 0,
+            'error_types': {},
+        }
+
+    @staticmethod
+    def _error(idx, error_type, message, record):
+        return {'row': idx, 'type': error_type, 'error': message, 'data': record}
+
+    @staticmethod
+    def _import_numbered(numbered_records, on_conflict, chunk_size=None, progress=None, partition=0):
+        stats = CSVImportService._new_stats()
+        chunk_size = chunk_size or CSVImportService.CHUNK_SIZE
+
+        for chunk in CSVImportService._chunked(numbered_records, chunk_size):
+            with transaction.atomic():
+                chunk_stats = CSVImportService._import_chunk(chunk, on_conflict)
+                if progress is not None:
+                    progress(len(chunk), chunk_stats, chunk[-1][0], partition)
+            CSVImportService._merge_stats(stats, chunk_stats)
+
+        return stats
+
+    @staticmethod
+    def partition_of(email, partitions):
+        """
+        Partizione di un record, calcolata sull'email normalizzata.
+        Usa crc32 e non hash(), che cambia da un processo all'altro.
+        """
+        return zlib.crc32(CSVImportService._email_key(email).encode('utf-8')) % partitions
+
+    @staticmethod
+    def import_persons_parallel(records, on_conflict='update', workers=None, chunk_size=None, progress=None,
+                                checkpoints=None):
+        """
+        Come import_persons, ma distribuisce i records su più processi.
+        I records sono partizionati per hash dell'email normalizzata: due worker
+        non toccano mai la stessa riga, quindi le partizioni non si bloccano a vicenda.
+        Le partizioni sono scritte in file temporanei (JSON lines) che i worker
+        leggono in streaming: la memoria resta costante come nell'import sequenziale.
+        Ogni worker usa la propria connessione al DB; le statistiche delle
+        partizioni vengono unite nello stesso formato di import_persons.
+        progress viene chiamato dai worker, quindi deve essere serializzabile (pickle).
+        checkpoints ({partizione: ultima_riga_importata}) permette di riprendere
+        un import interrotto con lo stesso numero di worker.
+        """
+        workers = workers or settings.CSV_IMPORT_WORKERS
+        checkpoints = checkpoints or {}
+        if workers <= 1:
+            offset = checkpoints.get(0, 0)
+            records = itertools.islice(records, offset, None)
+            return CSVImportService.import_persons(records, on_conflict, chunk_size, progress, offset)
+
+        stats = CSVImportService._new_stats()
+        with tempfile.TemporaryDirectory(prefix='csv-import-') as directory:
+            paths = CSVImportService._spool_partitions(records, workers, checkpoints, directory)
+
+            # Le connessioni aperte non devono essere ereditate dai processi figli
+            connections.close_all()
+
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                futures = [
+                    pool.submit(_import_partition, path, on_conflict, chunk_size, progress, partition)
+                    for partition, path in paths.items()
+                ]
+                for future in futures:
+                    CSVImportService._merge_stats(stats, future.result())
+
+        return stats
+
+    @staticmethod
+    def _spool_partitions(records, partitions, checkpoints, directory):
+        """
+        Scrive le coppie [numero_riga, record] di ogni partizione in un file JSON lines
+        in directory, saltando le righe già importate (checkpoints).
+        Ritorna {partizione: percorso} delle sole partizioni con righe da importare.
+        """
+        paths = {}
+        files = {}
+        try:
+            for idx, record in enumerate(records, start=1):
                 email = record.get('email')
-                if not email:
-                    stats['errors'].append({
-                        'row': idx,
-                        'error': 'Email mancante',
-                        'data': record
-                    })
-                    stats['skipped'] += 1
+                # Le righe senza email finiscono comunque in errore: basta distribuirle
+                partition = CSVImportService.partition_of(email, partitions) if email else idx % partitions
+                if idx <= checkpoints.get(partition, 0):
+                    continue  # Già importata prima dell'interruzione
+                if partition not in files:
+                    paths[partition] = os.path.join(directory, f'partition-{partition}.jsonl')
+                    files[partition] = open(paths[partition], 'w', encoding='utf-8')
+                files[partition].write(json.dumps([idx, record]) + '\n')
+        finally:
+            for spool in files.values():
+                spool.close()
+        return paths
+
+    @staticmethod
+    def _read_partition(path):
+        """
+        Generatore delle coppie (numero_riga, record) di un file di _spool_partitions.
+        """
+        with open(path, encoding='utf-8') as spool:
+            for line in spool:
+                idx, record = json.loads(line)
+                yield idx, record
+
+    @staticmethod
+    def _import_chunk(chunk, on_conflict):
+        """
+        Importa un blocco di (numero_riga, record) con query set-based.
+        Ritorna le statistiche del blocco, con tutti i suoi errori.
+        """
+        chunk_stats = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+        rows = {}  # email_key -> (idx, record)
+
+        for idx, record in chunk:
+            email = record.get('email')
+            if not email:
+                chunk_stats['errors'].append(
+                    CSVImportService._error(idx, CSVImportService.ERROR_MISSING_EMAIL, 'Email mancante', record)
+                )
+                chunk_stats['skipped'] += 1
+                continue
+
+            key = CSVImportService._email_key(email)
+            if key in rows:
+                # Email ripetuta nello stesso blocco: come nell'import riga per riga
+                # la prima occorrenza crea, le successive aggiornano o vengono saltate
+                if on_conflict == 'skip':
+                    chunk_stats['skipped'] += 1
                     continue
+                chunk_stats['updated'] += 1
+                rows[key] = (rows[key][0], record, rows[key][2])
+                continue
+            rows[key] = (idx, record, email)
+
+        if not rows:
+            return chunk_stats
 
-                # Prepariamo i defaults
-                defaults = {
-                    field: record.get(field, '') if field in ['first_name', 'last_name'] else record.get(field)
-                    for field in CSVImportService.OPTIONAL_FIELDS
-                }
-                
-                # Se on_conflict è 'skip', dobbiamo prima controllare se esiste
+        # Una sola SELECT per email ed external_id: su MySQL sia ON DUPLICATE KEY
+        # UPDATE che un INSERT scattano su qualunque chiave univoca, quindi un
+        # external_id già di un'altra Person va intercettato prima della bulk_create
+        external_ids = [record.get('external_id') for _, record, _ in rows.values() if record.get('external_id')]
+        lookup = Q(email__in=[email for _, _, email in rows.values()])
+        if external_ids:
+            lookup |= Q(external_id__in=external_ids)
+        existing = set()
+        owners = {}  # external_id -> email_key della Person che lo usa
+        for email, external_id in Person.objects.filter(lookup).values_list('email', 'external_id'):
+            existing.add(CSVImportService._email_key(email))
+            if external_id:
+                owners[external_id] = CSVImportService._email_key(email)
+
+        persons = []
+        conflicts = []
+        for key, (idx, record, email) in rows.items():
+            external_id = record.get('external_id')
+            if key in existing and on_conflict == 'skip':
+                chunk_stats['skipped'] += 1
+                continue
+            if external_id and owners.setdefault(external_id, key) != key:
+                # external_id di un'altra Person (nel DB o prima nel blocco):
+                # riga per riga, con l'errore di integrità attribuito alla riga
+                conflicts.append((idx, record))
+                continue
+            if key in existing:
+                chunk_stats['updated'] += 1
+            else:
+                chunk_stats['created'] += 1
+            persons.append(Person(email=email, **CSVImportService._person_defaults(record)))
+
+        try:
+            with transaction.atomic():
                 if on_conflict == 'skip':
-                    person, created = Person.objects.get_or_create(
-                        email=email,
-                        defaults=defaults
-                    )
+                    # Le email esistenti sono già escluse: INSERT semplice, senza
+                    # INSERT IGNORE che su MySQL tronca i valori invece di fallire
+                    Person.objects.bulk_create(persons)
                 else:
                     # 'update' (default) o 'error'
-                    person, created = Person.objects.update_or_create(
-                        email=email,
-                        defaults=defaults
+                    unique_fields = None
+                    if connection.features.supports_update_conflicts_with_target:
+                        unique_fields = ['email']
+                    Person.objects.bulk_create(
+                        persons,
+                        update_conflicts=True,
+                        unique_fields=unique_fields,
+                        update_fields=CSVImportService.OPTIONAL_FIELDS + ['updated_at'],
                     )
+                # bulk_create non invia post_save: label e conteggi si aggiornano qui
+                PersonLabelService.sync_emails([person.email for person in persons])
+                CountCache.invalidate(Person)
+        except (IntegrityError, DataError) as e:
+            # Solo errori dei dati: deadlock, lock wait timeout o connessione persa
+            # fanno fallire il job, che riprende dall'ultimo blocco committato
+            logger.warning(f"Bulk import del blocco fallito ({e}), ripiego su import riga per riga")
+            chunk_stats = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+            for idx, record in chunk:
+                CSVImportService._import_record(idx, record, on_conflict, chunk_stats)
+            return chunk_stats
+
+        for idx, record in conflicts:
+            CSVImportService._import_record(idx, record, on_conflict, chunk_stats)
 
-                if created:
-                    stats['created'] += 1
-                    logger.info(f"Created person: {email}")
+        logger.info(
+            f"Chunk importato: {chunk_stats['created']} creati, "
+            f"{chunk_stats['updated']} aggiornati, {chunk_stats['skipped']} saltati"
+        )
+        return chunk_stats
+
+    @staticmethod
+    def _merge_stats(stats, other):
+        """
+        Somma a stats le statistiche di un blocco o di una partizione.
+        Gli errori vengono contati per tipo; solo i primi esempi restano in stats['errors'].
+        """
+        stats['created'] += other['created']
+        stats['updated'] += other['updated']
+        stats['skipped'] += other['skipped']
+
+        if 'error_types' in other:
+            # Statistiche già aggregate (partizione di import_persons_parallel)
+            stats['error_count'] += other['error_count']
+            for error_type, count in other['error_types'].items():
+                stats['error_types'][error_type] = stats['error_types'].get(error_type, 0) + count
+        else:
+            stats['error_count'] += len(other['errors'])
+            for error in other['errors']:
+                stats['error_types'][error['type']] = stats['error_types'].get(error['type'], 0) + 1
+
+        if other['errors']:
+            examples = settings.CSV_IMPORT_ERROR_EXAMPLES
+            errors = stats['errors'] + other['errors'][:examples]
+            stats['errors'] = sorted(errors, key=lambda error: error['row'])[:examples]
+
+    @staticmethod
+    def _import_record(idx, record, on_conflict, stats):
+        """
+        Importa un singolo record (percorso lento, usato come fallback).
+        """
+        try:
+            email = record.get('email')
+            if not email:
+                stats['errors'].append(
+                    CSVImportService._error(idx, CSVImportService.ERROR_MISSING_EMAIL, 'Email mancante', record)
+                )
+                stats['skipped'] += 1
+                return
+
+            # Prepariamo i defaults
+            defaults = CSVImportService._person_defaults(record)
+
+            # Se on_conflict è 'skip', dobbiamo prima controllare se esiste
+            if on_conflict == 'skip':
+                person, created = Person.objects.get_or_create(
+                    email=email,
+                    defaults=defaults
+                )
+            else:
+                # 'update' (default) o 'error'
+                person, created = Person.objects.update_or_create(
+                    email=email,
+                    defaults=defaults
+                )
+
+            if created:
+                stats['created'] += 1
+                logger.info(f"Created person: {email}")
+            else:
+                if on_conflict == 'skip':
+                    stats['skipped'] += 1
+                    logger.info(f"Skipped existing person: {email}")
                 else:
-                    if on_conflict == 'skip':
-                        stats['skipped'] += 1
-                        logger.info(f"Skipped existing person: {email}")
-                    else:
-                        stats['updated'] += 1
-                        logger.info(f"Updated person: {email}")
-
-            except IntegrityError as e:
-                error_msg = f'Errore integrità: {str(e)}'
-                stats['errors'].append({'row': idx, 'error': error_msg, 'data': record})
-                logger.error(f"Row {idx}: {error_msg}")
-            except Exception as e:
-                error_msg = f'Errore: {str(e)}'
-                stats['errors'].append({'row': idx, 'error': error_msg, 'data': record})
-                logger.error(f"Row {idx}: {error_msg}")
-
-        return stats
\ No newline at end of file
+                    stats['updated'] += 1
+                    logger.info(f"Updated person: {email}")
+
+        except IntegrityError as e:
+            error_msg = f'Errore integrità: {str(e)}'
+            stats['errors'].append(
+                CSVImportService._error(idx, CSVImportService.ERROR_INTEGRITY, error_msg, record)
+            )
+            logger.error(f"Row {idx}: {error_msg}")
+        except (OperationalError, InterfaceError):
+            # Errore transitorio, non della riga: non va registrato come errore
+            raise
+        except Exception as e:
+            error_msg = f'Errore: {str(e)}'
+            stats['errors'].append(CSVImportService._error(idx, type(e).__name__, error_msg, record))
+            logger.error(f"Row {idx}: {error_msg}")
+
+
+def _import_partition(path, on_conflict, chunk_size, progress, partition):
+    """
+    Eseguita in un processo del pool di import_persons_parallel:
+    importa in streaming il file della partizione.
+    """
+    try:
+        numbered_records = CSVImportService._read_partition(path)
+        return CSVImportService._import_numbered(numbered_records, on_conflict, chunk_size, progress, partition)
+    finally:
+        connections.close_all()
@@ -0,0 +1,243 @@
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from persons.models import ImportCheckpoint, ImportJob, ImportRowError
+from persons.services.csv_import import CSVImportService
+
+logger = logging.getLogger(__name__)
+
+
+class ImportJobService:
+    """
+    Gestione degli import in background.
+    La coda è la tabella ImportJob: nessun broker esterno, i worker
+    (manage.py run_import_worker) prendono i job pending dal DB.
+    """
+
+    # Attesa (secondi) tra due controlli della coda quando è vuota
+    POLL_INTERVAL = 2
+    ON_CONFLICT = ('skip', 'update', 'error')
+
+    @staticmethod
+    def validate_on_conflict(on_conflict):
+        if on_conflict not in ImportJobService.ON_CONFLICT:
+            raise ValueError(f"on_conflict '{on_conflict}' non valido")
+
+    @staticmethod
+    def enqueue(session, on_conflict='skip', mapping=None):
+        """
+        Crea un job pending per la ImportSession data.
+        """
+        ImportJobService.validate_on_conflict(on_conflict)
+
+        return ImportJob.objects.create(
+            session=session,
+            mapping=mapping,
+            on_conflict=on_conflict,
+            total_rows=session.row_count,
+        )
+
+    @staticmethod
+    def claim_next():
+        """
+        Prende in carico il job pending più vecchio.
+        SELECT ... FOR UPDATE SKIP LOCKED evita che due worker prendano lo stesso job.
+        """
+        with transaction.atomic():
+            job = (
+                ImportJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=ImportJob.STATUS_PENDING)
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+
+            job.status = ImportJob.STATUS_RUNNING
+            job.started_at = timezone.now()
+            job.worker = f"{socket.gethostname()}:{os.getpid()}"
+            job.save(update_fields=['status', 'started_at', 'worker', 'updated_at'])
+            return job
+
+    @staticmethod
+    def run(job):
+        """
+        Esegue il job a blocchi, salvando avanzamento e statistiche parziali dopo ogni blocco.
+        Con CSV_IMPORT_WORKERS > 1 l'import è distribuito su più processi.
+        Ogni blocco e il relativo checkpoint sono scritti nella stessa transazione:
+        se il job viene ripreso, riparte dalla riga successiva all'ultimo blocco committato.
+        """
+        try:
+            if job.session is None:
+                raise ValueError("Sessione di import non più disponibile")
+
+            if not job.workers:
+                job.workers = settings.CSV_IMPORT_WORKERS
+                job.save(update_fields=['workers', 'updated_at'])
+
+            checkpoints = dict(job.checkpoints.values_list('partition', 'row_number'))
+            progress = partial(ImportJobService.add_progress, job.id)
+
+            if job.workers <= 1:
+                offset = checkpoints.get(0, 0)
+                records = CSVImportService.iter_staged(job.session, mapping=job.mapping, after=offset)
+                CSVImportService.import_persons(
+                    records,
+                    on_conflict=job.on_conflict,
+                    progress=progress,
+                    offset=offset
+                )
+            else:
+                records = CSVImportService.iter_staged(job.session, mapping=job.mapping)
+                CSVImportService.import_persons_parallel(
+                    records,
+                    on_conflict=job.on_conflict,
+                    workers=job.workers,
+                    progress=progress,
+                    checkpoints=checkpoints
+                )
+        except Exception as e:
+            logger.exception(f"Import job {job.id} fallito")
+            job.refresh_from_db()
+            job.status = ImportJob.STATUS_FAILED
+            job.failure = str(e)
+            job.finished_at = timezone.now()
+            job.save()
+            return job
+
+        # I contatori sono già stati sommati blocco per blocco (anche tra più esecuzioni):
+        # qui si ricavano solo conteggio per tipo ed esempi dalla tabella degli errori
+        job.refresh_from_db()
+        row_errors = ImportRowError.objects.filter(job=job)
+        job.error_types = dict(
+            row_errors.values_list('error_type').annotate(count=Count('id')).order_by()
+        )
+        job.errors = [
+            {'row': error.row_number, 'type': error.error_type, 'error': error.message, 'data': error.data}
+            for error in row_errors.order_by('row_number')[:settings.CSV_IMPORT_ERROR_EXAMPLES]
+        ]
+        job.status = ImportJob.STATUS_DONE
+        job.failure = ''
+        job.finished_at = timezone.now()
+        job.save()
+
+        # Le righe in staging non servono più
+        job.session.delete()
+        logger.info(f"Import job {job.id} completato: {job.processed_rows} righe")
+        return job
+
+    @staticmethod
+    def resume(job):
+        """
+        Rimette in coda un job fallito o interrotto (worker fermo da più di
+        CSV_IMPORT_JOB_STALE_AFTER secondi): riprenderà dall'ultimo checkpoint.
+        """
+        stale_before = timezone.now() - timedelta(seconds=settings.CSV_IMPORT_JOB_STALE_AFTER)
+        resumable = job.status == ImportJob.STATUS_FAILED or (
+            job.status == ImportJob.STATUS_RUNNING and job.updated_at < stale_before
+        )
+        if not resumable:
+            raise ValueError(f"Il job {job.id} è '{job.status}' e non può essere ripreso")
+        if job.session is None:
+            raise ValueError("Sessione di import non più disponibile")
+
+        job.status = ImportJob.STATUS_PENDING
+        job.failure = ''
+        job.finished_at = None
+        job.save(update_fields=['status', 'failure', 'finished_at', 'updated_at'])
+        return job
+
+    @staticmethod
+    def add_progress(job_id, rows, stats, last_row, partition=0):
+        """
+        Somma al job le righe e le statistiche di un blocco appena importato,
+        salva tutti gli errori del blocco in ImportRowError e aggiorna il checkpoint
+        della partizione. Viene chiamata nella transazione del blocco.
+        Usa F() così i worker paralleli possono aggiornare lo stesso job.
+        """
+        if stats['errors']:
+            ImportRowError.objects.bulk_create([
+                ImportRowError(
+                    job_id=job_id,
+                    row_number=error['row'],
+                    error_type=error['type'],
+                    message=error['error'],
+                    data=error['data'],
+                )
+                for error in stats['errors']
+            ])
+
+        ImportCheckpoint.objects.update_or_create(
+            job_id=job_id,
+            partition=partition,
+            defaults={'row_number': last_row}
+        )
+
+        ImportJob.objects.filter(pk=job_id).update(
+            processed_rows=F('processed_rows') + rows,
+            created=F('created') + stats['created'],
+            updated=F('updated') + stats['updated'],
+            skipped=F('skipped') + stats['skipped'],
+            error_count=F('error_count') + len(stats['errors']),
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def work(poll_interval=None, once=False):
+        """
+        Ciclo del worker: prende ed esegue i job finché ce ne sono,
+        altrimenti attende poll_interval secondi.
+        """
+        poll_interval = poll_interval or ImportJobService.POLL_INTERVAL
+        while True:
+            job = ImportJobService.claim_next()
+            if job is not None:
+                logger.info(f"Import job {job.id} preso in carico")
+                ImportJobService.run(job)
+                continue
+            if once:
+                return
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def progress(job):
+        """
+        Stato del job con righe elaborate, righe al secondo, ETA e statistiche parziali.
+        """
+        rows_per_second = None
+        eta_seconds = None
+        if job.started_at and job.processed_rows:
+            end = job.finished_at or timezone.now()
+            elapsed = (end - job.started_at).total_seconds()
+            if elapsed > 0:
+                rows_per_second = round(job.processed_rows / elapsed, 1)
+                if job.status == ImportJob.STATUS_RUNNING:
+                    eta_seconds = round((job.total_rows - job.processed_rows) / rows_per_second, 1)
+
+        return {
+            'id': job.id,
+            'status': job.status,
+            'total_rows': job.total_rows,
+            'processed_rows': job.processed_rows,
+            'rows_per_second': rows_per_second,
+            'eta_seconds': eta_seconds,
+            'created': job.created,
+            'updated': job.updated,
+            'skipped': job.skipped,
+            'error_count': job.error_count,
+            'error_types': job.error_types,
+            'errors': job.errors,
+            'failure': job.failure or None,
+            'checkpoints': dict(job.checkpoints.values_list('partition', 'row_number')),
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+        }
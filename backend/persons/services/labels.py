@@ -0,0 +1,106 @@
+from django.db.models import Count
+from persons.models import Person, PersonLabel
+
+
+class PersonLabelService:
+    """
+    Mantiene PersonLabel allineata ai campi CSV Person.tags e Person.roles,
+    che restano la rappresentazione esposta dall'API.
+    Le save() passano dal receiver in persons/signals.py; i percorsi bulk
+    (import CSV) chiamano sync direttamente.
+    """
+
+    # Campo CSV di Person -> tipo di label
+    FIELDS = {
+        'tags': PersonLabel.KIND_TAG,
+        'roles': PersonLabel.KIND_ROLE,
+    }
+    NAME_MAX_LENGTH = 255
+
+    @staticmethod
+    def split(value):
+        """
+        "a, B,,A" -> ['a', 'b']: valori puliti in casefold, senza vuoti né doppioni.
+        Le label sono salvate e cercate in questa forma: ?tags=VIP trova 'vip'
+        con qualunque collation.
+        """
+        names = []
+        for name in (value or '').split(','):
+            name = name.strip().casefold()[:PersonLabelService.NAME_MAX_LENGTH]
+            if name:
+                names.append(name)
+        return list(dict.fromkeys(names))
+
+    @staticmethod
+    def sync(persons):
+        """
+        Allinea le label delle Person date (con id, tags e roles caricati)
+        con una lettura, una delete e una bulk_create.
+        """
+        persons = [person for person in persons if person.pk]
+        if not persons:
+            return
+
+        wanted = set()
+        for person in persons:
+            for field, kind in PersonLabelService.FIELDS.items():
+                for name in PersonLabelService.split(getattr(person, field)):
+                    wanted.add((person.pk, kind, name))
+
+        stale = []
+        existing = PersonLabel.objects.filter(person_id__in=[person.pk for person in persons])
+        for label_id, person_id, kind, name in existing.values_list('id', 'person_id', 'kind', 'name'):
+            if (person_id, kind, name) in wanted:
+                wanted.discard((person_id, kind, name))
+            else:
+                stale.append(label_id)
+
+        if stale:
+            PersonLabel.objects.filter(id__in=stale).delete()
+        if wanted:
+            PersonLabel.objects.bulk_create(
+                [PersonLabel(person_id=person_id, kind=kind, name=name) for person_id, kind, name in wanted],
+                ignore_conflicts=True
+            )
+
+    @staticmethod
+    def sync_emails(emails):
+        """
+        Come sync, per Person scritte con bulk_create (di cui non si conosce l'id).
+        """
+        PersonLabelService.sync(Person.objects.filter(email__in=emails).only('id', 'tags', 'roles'))
+
+    @staticmethod
+    def filter(queryset, kind, names, match='all'):
+        """
+        Person con tutte (match='all') o almeno una (match='any') delle label date.
+        Legge solo l'indice (kind, name, person).
+        """
+        names = PersonLabelService.split(','.join(names))
+        if not names:
+            return queryset
+
+        person_ids = PersonLabel.objects.filter(kind=kind, name__in=names).values('person_id')
+        if match == 'all' and len(names) > 1:
+            person_ids = (
+                person_ids
+                .annotate(matched=Count('id'))
+                .filter(matched=len(names))
+                .values('person_id')
+                .order_by()
+            )
+        return queryset.filter(pk__in=person_ids)
+
+    @staticmethod
+    def counts(kind, persons=None, limit=None):
+        """
+        Numero di Person per label (in casefold), dalla più usata.
+        persons limita il conteggio a un queryset di Person (es. filtri della lista).
+        """
+        labels = PersonLabel.objects.filter(kind=kind)
+        if persons is not None:
+            labels = labels.filter(person__in=persons.order_by().values('pk'))
+        counts = labels.values('name').annotate(count=Count('id')).order_by('-count', 'name')
+        if limit:
+            counts = counts[:limit]
+        return list(counts)
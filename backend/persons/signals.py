@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Person
+from .services.labels import PersonLabelService
+
+
+@receiver(post_save, sender=Person)
+def sync_person_labels(sender, instance, update_fields=None, **kwargs):
+    """
+    Ogni save() di Person (serializer, admin, sync Drupal, import riga per riga)
+    riallinea le PersonLabel. Con update_fields senza tags/roles non serve.
+    """
+    if update_fields is not None and not set(update_fields) & set(PersonLabelService.FIELDS):
+        return
+    PersonLabelService.sync([instance])
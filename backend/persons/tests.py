@@ -1,3 +1,765 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import itertools
+import json
+import tempfile
+import zipfile
+from datetime import timedelta
+from functools import partial
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DataError, DatabaseError, OperationalError, connection
+from django.db.models.signals import post_init, post_save, pre_save
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from config.testing import LOCMEM_CACHES, QueryBudgetMixin
+
+from . import diagnostics
+from .filters import PersonSearchFilter
+from .models import ImportJob, ImportSession, ImportStagedRow, Person, PersonLabel
+from .serializers import PersonSerializer
+from .services.csv_import import CSVImportService
+from .services.import_jobs import ImportJobService
+from .services.labels import PersonLabelService
+
+
+class PersonConditionalTests(APITestCase):
+    """ETag/Last-Modified su GET /api/persons/{id}/"""
+
+    def setUp(self):
+        self.person = Person.objects.create(email='etag@example.com', first_name='Mario')
+        self.url = f'/api/persons/{self.person.id}/'
+
+    def test_etag_and_last_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_not_modified_with_one_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_update_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(self.url, {'first_name': 'Luigi'}, format='json')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_fields_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'fields': 'id,email'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_person(self):
+        response = self.client.get('/api/persons/999999/', HTTP_IF_NONE_MATCH='W/"x"')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PersonQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Query per endpoint di /api/persons/, indipendenti dal numero di righe"""
+
+    @classmethod
+    def setUpTestData(cls):
+        persons = Person.objects.bulk_create([
+            Person(email=f'budget{i}@example.com', first_name=f'Nome{i}', tags='a,b', roles='r')
+            for i in range(30)
+        ])
+        PersonLabelService.sync(persons)
+        cls.person = persons[0]
+
+    def test_list(self):
+        self.assertQueryBudget(2, '/api/persons/')
+
+    def test_list_cursor(self):
+        response = self.assertQueryBudget(1, '/api/persons/', {'pagination': 'cursor'})
+        self.assertQueryBudget(1, response.json()['next'])
+
+    def test_list_fields(self):
+        self.assertQueryBudget(2, '/api/persons/', {'fields': 'id,email'})
+
+    def test_list_filters(self):
+        self.assertQueryBudget(2, '/api/persons/', {'tags': 'a,b', 'ordering': 'updated_at'})
+
+    def test_contacts_alias(self):
+        self.assertQueryBudget(2, '/api/contacts/')
+
+    def test_retrieve(self):
+        self.assertQueryBudget(2, f'/api/persons/{self.person.id}/')
+
+    def test_retrieve_fields(self):
+        self.assertQueryBudget(2, f'/api/persons/{self.person.id}/', {'fields': 'id,email'})
+
+    def test_export(self):
+        self.assertQueryBudget(2, '/api/persons/export/', {'output': 'ndjson'})
+
+    def test_unknown_match(self):
+        response = self.client.get('/api/persons/', {'tags': 'vip', 'tags_match': 'some'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags_match', response.json())
+
+    def test_tag_counts(self):
+        self.assertQueryBudget(1, '/api/persons/tag_counts/', {'kind': 'tag'})
+
+
+class PersonImportTests(TestCase):
+    """Upsert a blocchi di CSVImportService.import_persons"""
+
+    def setUp(self):
+        self.existing = Person.objects.create(email='old@example.com', first_name='Vecchio', external_id='drupal-1')
+
+    def test_counts(self):
+        stats = CSVImportService.import_persons([
+            {'email': 'new@example.com', 'first_name': 'Nuovo'},
+            {'email': 'old@example.com', 'first_name': 'Aggiornato'},
+            {'email': 'new@example.com', 'first_name': 'Ripetuto'},
+            {'first_name': 'Senza email'},
+        ], on_conflict='update', chunk_size=10)
+        self.assertEqual((stats['created'], stats['updated'], stats['skipped']), (1, 2, 1))
+        self.assertEqual(stats['error_types'], {CSVImportService.ERROR_MISSING_EMAIL: 1})
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.first_name, 'Aggiornato')
+        self.assertEqual(Person.objects.get(email='new@example.com').first_name, 'Ripetuto')
+
+    def test_skip(self):
+        stats = CSVImportService.import_persons([
+            {'email': 'old@example.com', 'first_name': 'Ignorato'},
+            {'email': 'new@example.com'},
+        ], on_conflict='skip')
+        self.assertEqual((stats['created'], stats['updated'], stats['skipped']), (1, 0, 1))
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.first_name, 'Vecchio')
+
+    def test_external_id_conflict(self):
+        for on_conflict in ('update', 'skip'):
+            with self.subTest(on_conflict=on_conflict):
+                stats = CSVImportService.import_persons([
+                    {'email': f'thief-{on_conflict}@example.com', 'first_name': 'Altro', 'external_id': 'drupal-1'},
+                    {'email': f'ok-{on_conflict}@example.com'},
+                ], on_conflict=on_conflict)
+                self.assertEqual(stats['created'], 1)
+                self.assertEqual(stats['error_types'], {CSVImportService.ERROR_INTEGRITY: 1})
+                self.assertEqual(stats['errors'][0]['row'], 1)
+                self.assertFalse(Person.objects.filter(email=f'thief-{on_conflict}@example.com').exists())
+                self.existing.refresh_from_db()
+                self.assertEqual((self.existing.email, self.existing.first_name), ('old@example.com', 'Vecchio'))
+
+    def test_external_id_repeated_in_chunk(self):
+        stats = CSVImportService.import_persons([
+            {'email': 'a@example.com', 'external_id': 'drupal-2'},
+            {'email': 'b@example.com', 'external_id': 'drupal-2'},
+        ])
+        self.assertEqual((stats['created'], stats['error_count']), (1, 1))
+        self.assertEqual(Person.objects.get(external_id='drupal-2').email, 'a@example.com')
+
+
+class CSVPreviewTests(TestCase):
+    """Lettura in streaming e anteprima limitata"""
+
+    CSV = '\ufeffemail,first_name\n a@example.com ,"Anna"\n\nb@example.com,\'Bruno\'\nc@example.com,Carla\n'
+
+    def test_preview_is_bounded(self):
+        preview = CSVImportService.preview_csv(self.CSV.encode('utf-8'), limit=2)
+        self.assertEqual(preview['header'], ['email', 'first_name'])
+        self.assertEqual(preview['count'], 3)
+        self.assertEqual(preview['sample'], [
+            {'email': 'a@example.com', 'first_name': 'Anna'},
+            {'email': 'b@example.com', 'first_name': 'Bruno'},
+        ])
+
+    def test_iter_csv_from_chunks(self):
+        upload = SimpleUploadedFile('persons.csv', self.CSV.encode('utf-8'))
+        records = CSVImportService.iter_csv(upload)
+        self.assertEqual(next(records)['email'], 'a@example.com')
+        self.assertEqual([record['first_name'] for record in records], ['Bruno', 'Carla'])
+
+    def test_empty_file(self):
+        with self.assertRaises(ValueError):
+            CSVImportService.preview_csv(b'')
+
+
+class ImportSessionTests(APITestCase):
+    """Righe in staging dietro il token di import_preview"""
+
+    def preview(self, content=b'email,first_name\na@example.com,Anna\nb@example.com,Bruno\n', **data):
+        upload = SimpleUploadedFile('persons.csv', content)
+        return self.client.post('/api/persons/import_preview/', dict(data, file=upload), format='multipart')
+
+    def test_preview_stages_rows(self):
+        response = self.preview(preview_rows=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['sample']), 1)
+
+        session = CSVImportService.get_session(response.data['token'])
+        self.assertEqual(session.rows.count(), 2)
+        records = list(CSVImportService.iter_staged(session, mapping={'email': 0}))
+        self.assertEqual(records, [{'email': 'a@example.com'}, {'email': 'b@example.com'}])
+        self.assertEqual(list(CSVImportService.iter_staged(session, after=1))[0]['first_name'], 'Bruno')
+
+    def test_expired_token(self):
+        token = self.preview().data['token']
+        ImportSession.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.client.post('/api/persons/import_execute/', {'token': token}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_purge_expired_sessions(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        orphan = CSVImportService.stage_records([{'email': 'a@example.com'}])
+        resumable = CSVImportService.stage_records([{'email': 'b@example.com'}])
+        abandoned = CSVImportService.stage_records([{'email': 'c@example.com'}])
+        ImportSession.objects.update(expires_at=expired)
+        ImportJob.objects.create(session=resumable, status=ImportJob.STATUS_FAILED)
+        old_job = ImportJob.objects.create(session=abandoned, status=ImportJob.STATUS_FAILED)
+        ImportJob.objects.filter(pk=old_job.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=settings.CSV_IMPORT_RESUME_TTL + 1)
+        )
+
+        CSVImportService.purge_expired_sessions()
+        self.assertEqual(list(ImportSession.objects.values_list('pk', flat=True)), [resumable.pk])
+        self.assertFalse(ImportStagedRow.objects.exclude(session=resumable).exists())
+
+
+class ImportJobTests(APITestCase):
+    """Coda degli import in background (ImportJob)"""
+
+    def enqueue(self, records):
+        response = self.client.post(
+            '/api/persons/import_execute/', {'records': records, 'on_conflict': 'update'}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], ImportJob.STATUS_PENDING)
+        return response.data['id']
+
+    def test_claim_and_run(self):
+        first = self.enqueue([{'email': 'a@example.com'}, {'email': 'b@example.com'}])
+        second = self.enqueue([{'email': 'c@example.com'}])
+
+        job = ImportJobService.claim_next()
+        self.assertEqual((job.id, job.status), (first, ImportJob.STATUS_RUNNING))
+        self.assertEqual(ImportJobService.claim_next().id, second)
+        self.assertIsNone(ImportJobService.claim_next())
+
+        ImportJobService.run(job)
+        progress = self.client.get(f'/api/persons/import_jobs/{first}/').data
+        self.assertEqual(progress['status'], ImportJob.STATUS_DONE)
+        self.assertEqual((progress['processed_rows'], progress['created']), (2, 2))
+        self.assertEqual(Person.objects.count(), 2)
+        # Le righe in staging non servono più
+        self.assertFalse(ImportSession.objects.filter(jobs=first).exists())
+
+    def test_work_once(self):
+        self.enqueue([{'email': 'a@example.com'}])
+        ImportJobService.work(once=True)
+        self.assertEqual(ImportJob.objects.get().status, ImportJob.STATUS_DONE)
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get('/api/persons/import_jobs/999999/').status_code, 404)
+
+    def test_invalid_on_conflict_stages_nothing(self):
+        response = self.client.post(
+            '/api/persons/import_execute/', {'records': [{'email': 'a@example.com'}], 'on_conflict': 'merge'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImportSession.objects.exists())
+        self.assertFalse(ImportJob.objects.exists())
+
+
+class ParallelImportTests(TestCase):
+    """Partizioni di import_persons_parallel, scritte su file e rilette in streaming"""
+
+    def test_spool_partitions(self):
+        records = [{'email': f'user{i}@example.com'} for i in range(1, 21)] + [{'first_name': 'Senza email'}]
+        partition_of_first = CSVImportService.partition_of('user1@example.com', 3)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = CSVImportService._spool_partitions(
+                iter(records), 3, {partition_of_first: 1}, directory
+            )
+            numbered = {
+                partition: list(CSVImportService._read_partition(path)) for partition, path in paths.items()
+            }
+
+        rows = sorted(idx for items in numbered.values() for idx, _ in items)
+        # La riga 1 è prima del checkpoint della sua partizione
+        self.assertEqual(rows, list(range(2, 22)))
+        for partition, items in numbered.items():
+            for idx, record in items:
+                if record.get('email'):
+                    self.assertEqual(CSVImportService.partition_of(record['email'], 3), partition)
+                self.assertEqual(record, records[idx - 1])
+
+
+class MappingCompilerTests(TestCase):
+    """compile_mapping deve dare lo stesso risultato di clean_value cella per cella"""
+
+    def test_same_as_clean_value(self):
+        mapping = {'email': 2, 'first_name': 0, 'last_name': 1}
+        transform = CSVImportService.compile_mapping(mapping)
+        rows = [
+            [' "Anna" ', "'Rossi'", 'a@example.com'],
+            ['""', '  ', 'b@example.com'],
+            ['\'"Carla"\'', '', ''],
+            ['Solo nome'],
+        ]
+        for row in rows:
+            expected = {
+                field: CSVImportService.clean_value(row[idx]) if idx < len(row) else None
+                for field, idx in mapping.items()
+            }
+            self.assertEqual(transform(row), expected)
+
+    def test_single_field(self):
+        self.assertEqual(CSVImportService.compile_mapping({'email': 1})(['x', ' a@example.com ']), {'email': 'a@example.com'})
+
+
+class ImportErrorsTests(APITestCase):
+    """Errori aggregati per tipo ed elenco completo su import_jobs/{id}/errors/"""
+
+    @override_settings(CSV_IMPORT_ERROR_EXAMPLES=2)
+    def test_errors_endpoint(self):
+        Person.objects.create(email='old@example.com', external_id='drupal-1')
+        records = [{'first_name': f'Senza email {i}'} for i in range(4)] + [
+            {'email': 'new@example.com', 'external_id': 'drupal-1'},
+        ]
+        session = CSVImportService.stage_records(records)
+        job = ImportJobService.run(ImportJobService.enqueue(session, on_conflict='update'))
+
+        self.assertEqual(job.error_count, 5)
+        self.assertEqual(job.error_types, {
+            CSVImportService.ERROR_MISSING_EMAIL: 4,
+            CSVImportService.ERROR_INTEGRITY: 1,
+        })
+        self.assertEqual([error['row'] for error in job.errors], [1, 2])
+
+        url = f'/api/persons/import_jobs/{job.id}/errors/'
+        response = self.client.get(url, {'limit': 3})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([error['row_number'] for error in response.data['results']], [1, 2, 3])
+        response = self.client.get(url, {'error_type': CSVImportService.ERROR_INTEGRITY})
+        self.assertEqual([error['row_number'] for error in response.data['results']], [5])
+        self.assertEqual(self.client.get('/api/persons/import_jobs/999999/errors/').status_code, 404)
+
+
+class UploadFormatTests(TestCase):
+    """CSV e JSON lines, anche compressi gzip o zip"""
+
+    CSV = b'email,first_name\na@example.com,Anna\n'
+    JSONL = b'{"email": "a@example.com", "first_name": "Anna", "tags": ["x", "y"]}\n\n{"email": "b@example.com"}\n'
+
+    def test_gzip(self):
+        records = CSVImportService.parse_csv(gzip.compress(self.CSV))
+        self.assertEqual(records, [{'email': 'a@example.com', 'first_name': 'Anna'}])
+
+    def test_zip(self):
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, 'w') as archive:
+            archive.writestr('persons.csv', self.CSV)
+        records = CSVImportService.parse_csv(SimpleUploadedFile('persons.zip', content.getvalue()))
+        self.assertEqual(records, [{'email': 'a@example.com', 'first_name': 'Anna'}])
+
+    def test_jsonl(self):
+        records = CSVImportService.parse_csv(gzip.compress(self.JSONL))
+        self.assertEqual(records, [
+            {'email': 'a@example.com', 'first_name': 'Anna', 'tags': 'x,y'},
+            {'email': 'b@example.com', 'first_name': None, 'tags': None},
+        ])
+
+    def test_invalid_jsonl(self):
+        with self.assertRaises(ValueError):
+            CSVImportService.parse_csv(b'{"email": "a@example.com"}\n{oops\n')
+
+
+class ImportResumeTests(TestCase):
+    """Ripresa di un job dall'ultimo blocco committato (ImportCheckpoint)"""
+
+    def test_resume_from_checkpoint(self):
+        session = CSVImportService.stage_records([{'email': f'user{i}@example.com'} for i in range(1, 6)])
+        job = ImportJobService.enqueue(session, on_conflict='update')
+        with self.assertRaises(ValueError):
+            ImportJobService.resume(job)
+
+        # Primo blocco (righe 1-2) committato, poi il worker si è fermato
+        ImportJobService.claim_next()
+        records = itertools.islice(CSVImportService.iter_staged(session), 2)
+        CSVImportService.import_persons(records, progress=partial(ImportJobService.add_progress, job.id))
+        ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.STATUS_FAILED)
+        job.refresh_from_db()
+        self.assertEqual(dict(job.checkpoints.values_list('partition', 'row_number')), {0: 2})
+
+        ImportJobService.resume(job)
+        job = ImportJobService.run(ImportJobService.claim_next())
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        # Le righe 1-2 non vengono rielaborate
+        self.assertEqual((job.processed_rows, job.created, job.updated), (5, 5, 0))
+        self.assertEqual(Person.objects.count(), 5)
+
+    def test_transient_error_fails_job(self):
+        session = CSVImportService.stage_records([{'email': f'user{i}@example.com'} for i in range(1, 4)])
+        job = ImportJobService.enqueue(session, on_conflict='update')
+        job = ImportJobService.claim_next()
+        # Lock wait timeout sul blocco: nessun ripiego riga per riga, nessun checkpoint
+        with mock.patch.object(Person.objects, 'bulk_create', side_effect=OperationalError('lock wait timeout')):
+            job = ImportJobService.run(job)
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertFalse(job.checkpoints.exists())
+        self.assertFalse(job.row_errors.exists())
+        self.assertEqual(Person.objects.count(), 0)
+
+        ImportJobService.resume(job)
+        job = ImportJobService.run(ImportJobService.claim_next())
+        self.assertEqual((job.status, job.created), (ImportJob.STATUS_DONE, 3))
+
+    def test_data_error_falls_back_per_row(self):
+        records = [{'email': f'user{i}@example.com'} for i in range(1, 4)]
+        with mock.patch.object(Person.objects, 'bulk_create', side_effect=DataError('troppo lungo')):
+            stats = CSVImportService.import_persons(records, on_conflict='update')
+        self.assertEqual(stats['created'], 3)
+
+    def test_transient_error_in_row_path(self):
+        with mock.patch.object(Person.objects, 'update_or_create', side_effect=OperationalError('gone away')):
+            with self.assertRaises(OperationalError):
+                CSVImportService._import_record(1, {'email': 'a@example.com'}, 'update', {'errors': []})
+
+
+class PersonSearchTests(APITestCase):
+    """?search= (FULLTEXT su MySQL, icontains sugli altri DB)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Person.objects.create(email='anna.rossi@example.com', first_name='Anna', last_name='Rossi')
+        Person.objects.create(email='bruno@acme.org', first_name='Bruno', organisation='ACME Spa')
+        Person.objects.create(email='carla@example.com', first_name='Carla', last_name='Bianchi')
+
+    def search(self, value):
+        response = self.client.get('/api/persons/', {'search': value})
+        self.assertEqual(response.status_code, 200)
+        return sorted(person['email'] for person in response.data['results'])
+
+    def test_substring_and_all_terms(self):
+        self.assertEqual(self.search('ross'), ['anna.rossi@example.com'])
+        self.assertEqual(self.search('example'), ['anna.rossi@example.com', 'carla@example.com'])
+        self.assertEqual(self.search('carla example'), ['carla@example.com'])
+        self.assertEqual(self.search('acme bruno'), ['bruno@acme.org'])
+        self.assertEqual(self.search('anna bianchi'), [])
+
+    def test_blank(self):
+        self.assertEqual(len(self.search('  ')), 3)
+
+    def test_fulltext_filter(self):
+        # Query di MySQL (senza eseguirla): MATCH nel WHERE e nell'ordinamento, senza extra()
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            queryset = PersonSearchFilter.search(Person.objects.all(), 'anna')
+        self.assertIsNone(queryset.query.extra or None)
+        where = str(queryset.query).split(' WHERE ')[1].split(' ORDER BY ')[0]
+        self.assertIn('MATCH (', where)
+        self.assertIn('> 0', where)
+        self.assertEqual(queryset.query.order_by, ('-search_rank', '-created_at'))
+
+    def test_match_against(self):
+        self.assertEqual(
+            PersonSearchFilter.match_against(['anna.rossi', 'b', '+x-']),
+            '+"anna" +"rossi" +b* +x*'
+        )
+
+
+class CursorPaginationTests(APITestCase):
+    """?pagination=cursor su (created_at, id), anche con created_at uguali"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Person.objects.bulk_create([Person(email=f'cursor{i}@example.com') for i in range(7)])
+        # Stesso created_at per metà delle righe: l'ordine lo decide id
+        Person.objects.filter(email__in=[f'cursor{i}@example.com' for i in range(4)]).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        cls.expected = list(Person.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, params, link='next'):
+        response = self.client.get('/api/persons/', params)
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append([person['id'] for person in response.data['results']])
+            if not response.data[link]:
+                return pages, response
+            response = self.client.get(response.data[link])
+
+    def test_forward_and_back(self):
+        pages, last = self.walk({'pagination': 'cursor', 'limit': 3})
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        previous = self.client.get(last.data['previous'])
+        self.assertEqual([person['id'] for person in previous.data['results']], pages[1])
+
+    def test_ascending(self):
+        pages, _ = self.walk({'pagination': 'cursor', 'limit': 4, 'ordering': 'created_at'})
+        self.assertEqual(sum(pages, []), self.expected[::-1])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/persons/', {'cursor': 'xyz'}).status_code, 404)
+
+
+class DiagnosticsTests(TestCase):
+    """Interruttore, campionamento e mascheramento di persons/diagnostics.py"""
+
+    @staticmethod
+    def connected():
+        uids = {f'persons.diagnostics.{name}' for name in ('_person_init', '_person_pre_save', '_person_post_save')}
+        signals = (post_init, pre_save, post_save)
+        return {lookup[0] for signal in signals for lookup, *_ in signal.receivers if lookup[0] in uids}
+
+    @override_settings(PERSONS_DIAGNOSTICS=False)
+    def test_disabled(self):
+        self.assertFalse(diagnostics.ENABLED)
+        self.assertEqual(self.connected(), set())
+        with self.assertNoLogs('persons.diagnostics'):
+            Person.objects.create(email='off@example.com')
+            diagnostics.event('test.event', id=1)
+
+    @override_settings(PERSONS_DIAGNOSTICS=True)
+    def test_enabled(self):
+        self.assertEqual(len(self.connected()), 3)
+        with self.assertLogs('persons.diagnostics', level='DEBUG') as logs:
+            Person.objects.create(email='on@example.com')
+        self.assertTrue(any('person.save.after' in line for line in logs.output))
+
+    @override_settings(PERSONS_DIAGNOSTICS=True)
+    def test_redaction(self):
+        with self.assertLogs('persons.diagnostics', level='DEBUG') as logs:
+            diagnostics.event(
+                'test.event',
+                data={'email': 'mario@example.com', 'first_name': 'Mario', 'country': 'IT'},
+                rows=[{'external_id': 'drupal-1'}],
+                token='secret',
+            )
+        output = logs.output[0]
+        self.assertIn('"email": "***@example.com"', output)
+        self.assertIn('"country": "IT"', output)
+        for value in ('mario@', 'Mario', 'drupal-1', 'secret'):
+            self.assertNotIn(value, output)
+
+    @override_settings(PERSONS_DIAGNOSTICS=True, PERSONS_DIAGNOSTICS_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        middleware = diagnostics.DiagnosticsMiddleware(lambda request: diagnostics.event('test.event'))
+        with self.assertNoLogs('persons.diagnostics'):
+            middleware(RequestFactory().get('/api/persons/'))
+
+
+class PersonLabelTests(APITestCase):
+    """PersonLabel allineata a tags/roles, filtri ?tags= e tag_counts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.anna = Person.objects.create(email='anna@example.com', tags='VIP, Newsletter', roles='Admin')
+        cls.bruno = Person.objects.create(email='bruno@example.com', tags='newsletter,,NEWSLETTER')
+        cls.carla = Person.objects.create(email='carla@example.com', tags='vip')
+
+    def emails(self, **params):
+        response = self.client.get('/api/persons/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(person['email'] for person in response.data['results'])
+
+    def test_labels_follow_save(self):
+        self.assertEqual(
+            sorted(self.anna.labels.values_list('kind', 'name')),
+            [('role', 'admin'), ('tag', 'newsletter'), ('tag', 'vip')]
+        )
+        self.assertEqual(list(self.bruno.labels.values_list('name', flat=True)), ['newsletter'])
+        self.anna.tags = 'Newsletter'
+        self.anna.save()
+        self.assertEqual(list(self.anna.labels.filter(kind='tag').values_list('name', flat=True)), ['newsletter'])
+
+    def test_filter_is_case_insensitive(self):
+        self.assertEqual(self.emails(tags='VIP'), ['anna@example.com', 'carla@example.com'])
+        self.assertEqual(self.emails(tags='vip,newsletter'), ['anna@example.com'])
+        self.assertEqual(self.emails(tags='VIP,Newsletter', tags_match='any'), [
+            'anna@example.com', 'bruno@example.com', 'carla@example.com',
+        ])
+        self.assertEqual(self.emails(roles='admin'), ['anna@example.com'])
+
+    def test_unknown_match(self):
+        response = self.client.get('/api/persons/', {'tags': 'vip', 'tags_match': 'some'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags_match', response.json())
+
+    def test_tag_counts(self):
+        response = self.client.get('/api/persons/tag_counts/', {'kind': 'tag'})
+        self.assertEqual(response.data['results'], [
+            {'name': 'newsletter', 'count': 2},
+            {'name': 'vip', 'count': 2},
+        ])
+        response = self.client.get('/api/persons/tag_counts/', {'kind': 'tag', 'tags': 'Vip', 'limit': 1})
+        self.assertEqual(response.data['results'], [{'name': 'vip', 'count': 2}])
+        self.assertEqual(self.client.get('/api/persons/tag_counts/', {'kind': 'x'}).status_code, 400)
+
+    def test_import_syncs_labels(self):
+        CSVImportService.import_persons([{'email': 'dario@example.com', 'tags': 'Vip'}])
+        self.assertEqual(self.emails(tags='vip'), ['anna@example.com', 'carla@example.com', 'dario@example.com'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CountCacheTests(APITestCase):
+    """Conteggi delle liste in cache, invalidati al commit"""
+
+    def setUp(self):
+        cache.clear()
+        Person.objects.create(email='a@example.com')
+
+    def count(self):
+        return self.client.get('/api/persons/').data['count']
+
+    def test_cached_until_commit(self):
+        self.assertEqual(self.count(), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count(), 1)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Person.objects.create(email='b@example.com')
+        # Prima del commit il conteggio resta quello vecchio
+        self.assertEqual(self.count(), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.count(), 2)
+
+    def test_bulk_import_invalidates(self):
+        self.assertEqual(self.count(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            CSVImportService.import_persons([{'email': f'user{i}@example.com'} for i in range(3)])
+        self.assertEqual(self.count(), 4)
+
+    def test_cache_errors_are_ignored(self):
+        with mock.patch('config.counts.cache') as broken, self.assertLogs('config.counts', 'WARNING'):
+            broken.get.side_effect = broken.incr.side_effect = DatabaseError('no such table: crm_cache')
+            with self.captureOnCommitCallbacks(execute=True):
+                Person.objects.create(email='b@example.com')
+            self.assertEqual(self.count(), 2)
+
+    def test_import_errors_count_is_fresh(self):
+        job = ImportJob.objects.create()
+        url = f'/api/persons/import_jobs/{job.id}/errors/'
+        self.assertEqual(self.client.get(url).data['count'], 0)
+        ImportJobService.add_progress(job.id, 1, {
+            'created': 0, 'updated': 0, 'skipped': 1,
+            'errors': [CSVImportService._error(1, CSVImportService.ERROR_MISSING_EMAIL, 'Email mancante', {})],
+        }, 1)
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+
+class SparseFieldsTests(APITestCase):
+    """?fields= e lista serializzata da values() (ValuesPlan)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.person = Person.objects.create(email='sparse@example.com', first_name='Anna', tags='a,b')
+
+    def test_values_list_matches_serializer(self):
+        row = self.client.get('/api/persons/').data['results'][0]
+        self.assertEqual(row, PersonSerializer(self.person).data)
+
+    def test_fields(self):
+        row = self.client.get('/api/persons/', {'fields': 'email, tags'}).data['results'][0]
+        self.assertEqual(row, {'email': 'sparse@example.com', 'tags': 'a,b'})
+        response = self.client.get(f'/api/persons/{self.person.id}/', {'fields': 'id,first_name'})
+        self.assertEqual(response.data, {'id': self.person.id, 'first_name': 'Anna'})
+
+    def test_unknown_field(self):
+        response = self.client.get('/api/persons/', {'fields': 'email,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class PersonExportTests(APITestCase):
+    """Export in streaming a blocchi di EXPORT_CHUNK_SIZE righe"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Person.objects.bulk_create([
+            Person(email=f'export{i}@example.com', first_name=f'Nome, {i}', source_website='https://a.example')
+            for i in range(5)
+        ] + [Person(email='other@example.com', source_website='https://b.example')])
+
+    def export(self, **params):
+        response = self.client.get('/api/persons/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        content = self.export(fields='email,first_name', source_website='https://a.example').decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0], {'email': 'export4@example.com', 'first_name': 'Nome, 4'})
+
+    def test_ndjson_gzip(self):
+        content = gzip.decompress(self.export(output='ndjson', gzip='1'))
+        rows = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len({row['id'] for row in rows}), 6)
+
+    def test_invalid_output(self):
+        self.assertEqual(self.client.get('/api/persons/export/', {'output': 'xml'}).status_code, 400)
+
+
+class PersonBulkTests(APITestCase):
+    """POST /api/persons/bulk_update/ e bulk_delete/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.persons = Person.objects.bulk_create([
+            Person(email=f'bulk{i}@example.com', tags='old') for i in range(3)
+        ])
+        PersonLabelService.sync(cls.persons)
+
+    def test_bulk_update(self):
+        response = self.client.post('/api/persons/bulk_update/', {
+            'emails': ['BULK0@example.com', 'bulk1@example.com', 'missing@example.com'],
+            'changes': {'ppg': 'EPP', 'tags': 'Vip,new'},
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'matched': 2, 'updated': 2, 'not_found': ['missing@example.com']})
+        self.assertEqual(Person.objects.filter(ppg='EPP', tags='Vip,new').count(), 2)
+        self.assertEqual(
+            sorted(PersonLabel.objects.filter(name='vip').values_list('person__email', flat=True)),
+            ['bulk0@example.com', 'bulk1@example.com']
+        )
+        self.assertFalse(PersonLabel.objects.filter(person__email='bulk0@example.com', name='old').exists())
+
+    def test_bulk_update_rejects_unique_fields(self):
+        response = self.client.post('/api/persons/bulk_update/', {
+            'ids': [self.persons[0].id], 'changes': {'email': 'x@example.com'},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_delete(self):
+        ids = [self.persons[0].id, self.persons[1].id, 999999]
+        response = self.client.post('/api/persons/bulk_delete/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['deleted'], response.data['not_found']), (2, [999999]))
+        self.assertEqual(response.data['deleted_related'], {'persons.PersonLabel': 2})
+        self.assertEqual(list(Person.objects.values_list('id', flat=True)), [self.persons[2].id])
+
+    def test_bulk_delete_requires_ids_or_emails(self):
+        response = self.client.post('/api/persons/bulk_delete/', {'ids': [1], 'emails': ['a@b.it']}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -5,11 +5,22 @@ from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import LimitOffsetPagination
+import json
 import logging
 
-from .models import Person
-from .serializers import PersonSerializer
+from config.conditional import ConditionalMixin
+from config.export import ExportMixin
+from config.pagination import OptionalKeysetPagination
+from config.sparse import SparseFieldsMixin
+from . import diagnostics
+from .filters import PersonLabelFilter, PersonSearchFilter
+from .models import ImportJob, ImportRowError, Person, PersonLabel
+from .serializers import ImportRowErrorSerializer, PersonSerializer
+from .services.bulk import PersonBulkService
 from .services.csv_import import CSVImportService
+from .services.import_jobs import ImportJobService
+from .services.labels import PersonLabelService
 
 logger = logging.getLogger(__name__)
 
@@ -25,16 +36,40 @@ def normalize_empty_strings(data):
     }
 
 
-class PersonViewSet(ModelViewSet):
+def parse_json_field(value):
+    """
+    Con multipart/form-data gli oggetti (es. mapping) arrivano come stringa JSON
+    """
+    if isinstance(value, str):
+        return json.loads(value) if value.strip() else None
+    return value
+
+
+def parse_bool(value):
+    """
+    Con multipart/form-data i booleani arrivano come stringa
+    """
+    if isinstance(value, str):
+        return value.strip().lower() not in ('false', '0', 'no', '')
+    return bool(value)
+
+
+class PersonViewSet(ConditionalMixin, ExportMixin, SparseFieldsMixin, ModelViewSet):
     queryset = Person.objects.all()
     serializer_class = PersonSerializer
     permission_classes = [AllowAny]  # Frontend pubblico può accedere a Person
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    # La ricerca precede OrderingFilter: senza ?ordering resta l'ordine per rilevanza
+    filter_backends = [DjangoFilterBackend, PersonLabelFilter, PersonSearchFilter, OrderingFilter]
     filterset_fields = ['email', 'source_website']
+    pagination_class = OptionalKeysetPagination
+    export_filename = 'persons'
+    # Solo il dettaglio: la lista ha già i conteggi in cache
+    conditional_actions = ('retrieve',)
     ordering_fields = ['created_at', 'updated_at']
 
     def create(self, request, *args, **kwargs):
-        logger.warning(f"[DEBUG] POST raw data: {request.data}")
+        if diagnostics.ENABLED:
+            diagnostics.event('person.create.request', data=request.data)
 
         data = normalize_empty_strings(request.data)
 
@@ -43,7 +78,8 @@ class PersonViewSet(ModelViewSet):
 
         self.perform_create(serializer)
 
-        logger.warning(f"[DEBUG] Created Person ID={serializer.data.get('id')}")
+        if diagnostics.ENABLED:
+            diagnostics.event('person.create.response', id=serializer.data.get('id'))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
@@ -61,18 +97,114 @@ class PersonViewSet(ModelViewSet):
 
         self.perform_update(serializer)
 
-        logger.warning(f"[DEBUG] Updated Person ID={serializer.data.get('id')}")
+        if diagnostics.ENABLED:
+            diagnostics.event('person.update.response', id=serializer.data.get('id'), partial=partial)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """
+        POST /api/persons/bulk_update/
+        Modifica gli stessi campi su molte Person con UPDATE set-based, in una transazione.
+        Payload: {"ids": [1, 2] | "emails": ["a@b.it"], "changes": {"ppg": "...", "tags": "a,b"}}
+        """
+        changes = request.data.get('changes')
+        try:
+            PersonBulkService.validate_changes(changes)
+            person_ids, not_found = PersonBulkService.resolve(
+                ids=request.data.get('ids'),
+                emails=request.data.get('emails')
+            )
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Stessa validazione dei campi di una PATCH
+        serializer = self.get_serializer(data=normalize_empty_strings(changes), partial=True)
+        serializer.is_valid(raise_exception=True)
+
+        updated = PersonBulkService.update(person_ids, serializer.validated_data)
+        if diagnostics.ENABLED:
+            diagnostics.event('person.bulk_update', fields=list(changes), updated=updated)
+        return Response({
+            "matched": len(person_ids),
+            "updated": updated,
+            "not_found": not_found,
+        })
+
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """
+        POST /api/persons/bulk_delete/
+        Elimina molte Person (e in cascata submissions e label) in una transazione.
+        Payload: {"ids": [1, 2]} oppure {"emails": ["a@b.it"]}
+        """
+        try:
+            person_ids, not_found = PersonBulkService.resolve(
+                ids=request.data.get('ids'),
+                emails=request.data.get('emails')
+            )
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        deleted, related = PersonBulkService.delete(person_ids)
+        if diagnostics.ENABLED:
+            diagnostics.event('person.bulk_delete', deleted=deleted, related=related)
+        return Response({
+            "matched": len(person_ids),
+            "deleted": deleted,
+            "deleted_related": related,
+            "not_found": not_found,
+        })
+
+    @action(detail=False, methods=['get'])
+    def tag_counts(self, request):
+        """
+        GET /api/persons/tag_counts/?kind=tag|role&limit=...
+        Numero di Person per tag (o ruolo), dal più usato.
+        Gli altri parametri della lista (es. source_website, tags) restringono il conteggio.
+        """
+        kind = request.query_params.get('kind', PersonLabel.KIND_TAG)
+        if kind not in dict(PersonLabel.KIND_CHOICES):
+            return Response(
+                {"error": f"kind '{kind}' non valido"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            return Response(
+                {"error": "limit deve essere un intero"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        persons = None
+        if set(request.query_params) - {'kind', 'limit'}:
+            persons = self.filter_queryset(self.get_queryset())
+
+        return Response({
+            "kind": kind,
+            "results": PersonLabelService.counts(kind, persons=persons, limit=limit),
+        })
+
     @action(detail=False, methods=['post'])
     def import_preview(self, request):
         """
         POST /api/persons/import_preview/
-        Preview CSV import con mapping configurato
+        Preview CSV import con mapping configurato.
+        Accetta CSV o JSON lines, anche compressi (.gz, .zip).
+        Le righe vengono salvate sul server: la risposta contiene un token
+        da passare a import_execute al posto dei records.
         """
         file = request.FILES.get('file')
-        mapping = request.data.get('mapping')
-        skip_header = request.data.get('skip_header', True)
+        mapping = parse_json_field(request.data.get('mapping'))
+        skip_header = parse_bool(request.data.get('skip_header', True))
 
         if not file:
             return Response(
@@ -81,17 +213,16 @@ class PersonViewSet(ModelViewSet):
             )
 
         try:
-            file_content = file.read()
-            records = CSVImportService.parse_csv(
-                file_content,
+            preview_rows = int(request.data.get('preview_rows', CSVImportService.PREVIEW_ROWS))
+            # Il file viene letto a blocchi: si restituiscono solo token, header,
+            # prime righe e conteggio, non l'intero dataset
+            preview = CSVImportService.stage_csv(
+                file,
                 mapping=mapping,
-                skip_header=skip_header
+                skip_header=skip_header,
+                limit=preview_rows
             )
-            return Response({
-                "count": len(records),
-                "sample": records[:5],
-                "records": records
-            })
+            return Response(preview)
         except Exception as e:
             logger.exception("Errore preview CSV")
             return Response(
@@ -103,23 +234,38 @@ class PersonViewSet(ModelViewSet):
     def import_execute(self, request):
         """
         POST /api/persons/import_execute/
-        Esegue l'import dei records CSV
+        Esegue l'import dei records CSV in background.
+        Accetta il token di import_preview (con mapping opzionale)
+        oppure, per compatibilità, la lista completa dei records.
+        Risponde 202 con il job da seguire su import_jobs/{id}/.
         """
+        token = request.data.get('token')
         records = request.data.get('records', [])
         on_conflict = request.data.get('on_conflict', 'skip')
 
-        if not records:
+        if not token and not records:
             return Response(
-                {"error": "Records richiesti"},
+                {"error": "Token o records richiesti"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            stats = CSVImportService.import_persons(
-                records,
-                on_conflict=on_conflict
-            )
-            return Response(stats, status=status.HTTP_201_CREATED)
+            # Prima di salvare le righe: un on_conflict non valido non lascia sessioni orfane
+            ImportJobService.validate_on_conflict(on_conflict)
+            mapping = None
+            if token:
+                session = CSVImportService.get_session(token)
+                mapping = parse_json_field(request.data.get('mapping'))
+                # Validiamo subito il mapping, prima di mettere il job in coda
+                CSVImportService.resolve_mapping(
+                    session.header,
+                    mapping if mapping is not None else session.mapping
+                )
+            else:
+                session = CSVImportService.stage_records(records)
+
+            job = ImportJobService.enqueue(session, on_conflict=on_conflict, mapping=mapping)
+            return Response(ImportJobService.progress(job), status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             logger.exception("Errore import CSV")
             return Response(
@@ -131,7 +277,8 @@ class PersonViewSet(ModelViewSet):
     def bulk_import(self, request):
         """
         POST /api/persons/bulk_import/
-        Import bulk da frontend
+        Import bulk da frontend, eseguito in background.
+        Risponde 202 con il job da seguire su import_jobs/{id}/.
         """
         records = request.data.get('records', [])
 
@@ -147,11 +294,9 @@ class PersonViewSet(ModelViewSet):
             )
 
         try:
-            stats = CSVImportService.import_persons(
-                records,
-                on_conflict='skip'
-            )
-            return Response(stats, status=status.HTTP_201_CREATED)
+            session = CSVImportService.stage_records(records)
+            job = ImportJobService.enqueue(session, on_conflict='skip')
+            return Response(ImportJobService.progress(job), status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             logger.exception("Errore bulk import")
             return Response(
@@ -163,3 +308,62 @@ class PersonViewSet(ModelViewSet):
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+    @action(detail=False, methods=['get'], url_path=r'import_jobs/(?P<job_id>\d+)')
+    def import_job(self, request, job_id=None):
+        """
+        GET /api/persons/import_jobs/{id}/
+        Stato di un import in background: righe elaborate, righe/s, ETA e statistiche parziali
+        """
+        job = ImportJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response(
+                {"error": "Import job non trovato"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(ImportJobService.progress(job))
+
+    @action(detail=False, methods=['post'], url_path=r'import_jobs/(?P<job_id>\d+)/resume')
+    def import_job_resume(self, request, job_id=None):
+        """
+        POST /api/persons/import_jobs/{id}/resume/
+        Riprende un import fallito o interrotto dall'ultimo blocco committato
+        """
+        job = ImportJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response(
+                {"error": "Import job non trovato"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            job = ImportJobService.resume(job)
+        except ValueError as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(ImportJobService.progress(job), status=status.HTTP_202_ACCEPTED)
+
+    # Gli errori sono scritti con bulk_create mentre il job gira: count sempre esatto, senza cache
+    @action(detail=False, methods=['get'], url_path=r'import_jobs/(?P<job_id>\d+)/errors',
+            pagination_class=LimitOffsetPagination)
+    def import_job_errors(self, request, job_id=None):
+        """
+        GET /api/persons/import_jobs/{id}/errors/?error_type=...&limit=...&offset=...
+        Elenco completo degli errori di un import, a pagine
+        """
+        if not ImportJob.objects.filter(pk=job_id).exists():
+            return Response(
+                {"error": "Import job non trovato"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        errors = ImportRowError.objects.filter(job_id=job_id).order_by('row_number')
+        error_type = request.query_params.get('error_type')
+        if error_type:
+            errors = errors.filter(error_type=error_type)
+
+        page = self.paginate_queryset(errors)
+        serializer = ImportRowErrorSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -1,11 +1,42 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-"""Test CSV import service"""
+"""
+Benchmark dell'import CSV (CSVImportService).
+
+Genera CSV sintetici (default 10k, 100k e 1M righe) con una quota
+configurabile di email duplicate e di valori "sporchi" (virgolette, spazi,
+virgole nei campi), poi misura contro il DB locale:
+
+  - parse:     CSVImportService.parse_csv sul file
+  - import:    CSVImportService.import_persons sui records letti in streaming (iter_csv)
+  - transform: micro-benchmark della trasformazione riga -> record, confronto tra
+               il transformer compilato (compile_mapping) e clean_value cella per cella
+
+Per ogni caso riporta tempo, righe/s, query SQL per riga e picco di RSS.
+Ogni caso gira in un processo separato, così il picco di memoria è quello del caso.
+I risultati vanno in un file JSON; con --baseline si confronta con un run
+precedente e si esce con codice 1 se qualche caso peggiora oltre --tolerance.
+
+    python test_csv_import.py --sizes 10000 100000 --output bench_results.json
+    python test_csv_import.py --baseline bench_results.json
+
+Le Person create hanno email @bench.invalid e vengono eliminate a fine run.
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
 import os
+import random
+import resource
+import subprocess
 import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
 import django
-import traceback
-import logging
 
 # Force UTF-8 output
 os.environ['PYTHONIOENCODING'] = 'utf-8'
@@ -15,49 +46,245 @@ if hasattr(sys.stdout, 'reconfigure'):
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-logging.basicConfig(level=logging.DEBUG)
+from django.db import connection, connections
 
-from persons.services.csv_import import CSVImportService
 from persons.models import Person
+from persons.services.csv_import import CSVImportService
+
+BENCH_DOMAIN = 'bench.invalid'
+HEADER = ['email', 'first_name', 'last_name', 'country', 'organisation', 'tags', 'roles', 'type']
+# Metriche in cui un valore più alto è un peggioramento
+REGRESSION_METRICS = ['seconds', 'queries_per_row', 'peak_rss_mb']
+
+
+def dirty(value, rnd):
+    """
+    Sporca un valore come fanno gli export reali: spazi, virgolette doppie o singole.
+    """
+    return rnd.choice([
+        f'  {value}  ',
+        f'"{value}"',
+        f"'{value}'",
+        f'" \'{value}\' "',
+    ])
+
+
+def generate_csv(path, rows, duplicate_ratio, dirty_ratio, seed=42):
+    rnd = random.Random(seed)
+    unique = max(1, int(rows * (1 - duplicate_ratio)))
+
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            n = i if i < unique else rnd.randrange(unique)
+            values = [
+                f'user{n}@{BENCH_DOMAIN}',
+                f'Nome{n}',
+                f'Cognome{n}',
+                rnd.choice(['IT', 'FR', 'DE', 'ES']),
+                f'Org {n % 1000}, S.p.A.',
+                'newsletter,evento',
+                'socio',
+                rnd.choice(['individual', 'organisation']),
+            ]
+            if rnd.random() < dirty_ratio:
+                values = [values[0]] + [dirty(value, rnd) for value in values[1:]]
+            writer.writerow(values)
+
+
+class QueryCounter:
+    """
+    Conta le query eseguite senza tenerle in memoria (a differenza di CaptureQueriesContext).
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def cleanup():
+    Person.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').delete()
+
+
+def reference_transform(row, mapping):
+    """
+    Trasformazione riga -> record con clean_value su ogni cella (implementazione di riferimento).
+    """
+    return {
+        field: CSVImportService.clean_value(row[idx]) if idx < len(row) else None
+        for field, idx in mapping.items()
+    }
 
-# Test parsing CSV
-csv_content = """email,first_name,last_name,source_website
-test_import1@example.com,Mario,Rossi,Website A
-test_import2@example.com,Luigi,Bianchi,Website B
-test_import3@example.com,Anna,Verdi,Website C"""
-
-records = CSVImportService.parse_csv(csv_content)
-print(f"Parsed {len(records)} records:")
-for r in records:
-    print(f"  {r}")
-
-# Test import - direct creation first
-print("\nTesting direct Person.objects.create()...")
-try:
-    p = Person.objects.create(
-        email='direct_test@example.com',
-        first_name='Direct',
-        last_name='Test',
-        source_website='Test'
+
+def run_transform(f):
+    rows = CSVImportService._read_rows(f)
+    mapping = CSVImportService.resolve_mapping(next(rows))
+    rows = list(rows)
+
+    start = time.perf_counter()
+    expected = [reference_transform(row, mapping) for row in rows]
+    reference_seconds = time.perf_counter() - start
+
+    transform = CSVImportService.compile_mapping(mapping)
+    start = time.perf_counter()
+    records = [transform(row) for row in rows]
+    compiled_seconds = time.perf_counter() - start
+
+    if records != expected:
+        raise AssertionError("Il transformer compilato non produce gli stessi records di clean_value")
+
+    return compiled_seconds, {
+        'reference_ns_per_row': round(reference_seconds / len(rows) * 1e9),
+        'ns_per_row': round(compiled_seconds / len(rows) * 1e9),
+        'speedup': round(reference_seconds / compiled_seconds, 2),
+    }
+
+
+def run_case(stage, path, rows, on_conflict, queue):
+    counter = QueryCounter()
+    start = time.perf_counter()
+    with connection.execute_wrapper(counter), open(path, 'rb') as f:
+        if stage == 'transform':
+            elapsed, result = run_transform(f)
+        elif stage == 'parse':
+            records = CSVImportService.parse_csv(f)
+            result = {'records': len(records)}
+        else:
+            stats = CSVImportService.import_persons(CSVImportService.iter_csv(f), on_conflict=on_conflict)
+            result = {
+                'created': stats['created'],
+                'updated': stats['updated'],
+                'skipped': stats['skipped'],
+                'errors': stats['error_count'],
+            }
+    if stage != 'transform':
+        elapsed = time.perf_counter() - start
+
+    # ru_maxrss è in KB su Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    connections.close_all()
+    queue.put({
+        'stage': stage,
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1),
+        'queries': counter.count,
+        'queries_per_row': round(counter.count / rows, 4),
+        'peak_rss_mb': round(peak_rss_mb, 1),
+        **result,
+    })
+
+
+def run_isolated(stage, path, rows, on_conflict):
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    connections.close_all()
+    process = context.Process(target=run_case, args=(stage, path, rows, on_conflict, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['stage'], r['rows']): r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['stage'], result['rows']))
+        if previous is None:
+            continue
+        for metric in REGRESSION_METRICS:
+            if previous[metric] and result[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{result['stage']} {result['rows']} righe: {metric} "
+                    f"{previous[metric]} -> {result[metric]}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument(
+        '--stages',
+        nargs='+',
+        default=['parse', 'import'],
+        choices=['parse', 'import', 'transform']
     )
-    print(f"  Direct create success: {p}")
-except Exception as e:
-    print(f"  Direct create failed: {e}")
-    traceback.print_exc()
-
-# Test import via service
-print("\nTesting CSVImportService.import_persons()...")
-try:
-    stats = CSVImportService.import_persons(records)
-    print(f"  Created: {stats['created']}")
-    print(f"  Updated: {stats['updated']}")
-    print(f"  Skipped: {stats['skipped']}")
-    print(f"  Errors: {len(stats['errors'])}")
-
-    if stats['errors']:
-        print("\nError details:")
-        for err in stats['errors']:
-            print(f"  Row {err['row']}: {err['error']}")
-except Exception as e:
-    print(f"\nException: {e}")
-    traceback.print_exc()
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1, help="Quota di righe con email già vista")
+    parser.add_argument('--dirty-ratio', type=float, default=0.3, help="Quota di righe con virgolette/spazi da ripulire")
+    parser.add_argument('--on-conflict', default='update', choices=['skip', 'update'])
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="JSON di un run precedente da confrontare")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Peggioramento ammesso rispetto al baseline")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.ERROR)
+
+    results = []
+    print(f"{'stage':>9} {'righe':>9} {'secondi':>9} {'righe/s':>10} {'query/riga':>11} {'RSS MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            path = os.path.join(tmp, f'persons_{rows}.csv')
+            generate_csv(path, rows, args.duplicate_ratio, args.dirty_ratio)
+
+            for stage in args.stages:
+                if stage == 'import':
+                    cleanup()
+                result = run_isolated(stage, path, rows, args.on_conflict)
+                results.append(result)
+                print(
+                    f"{stage:>9} {rows:>9} {result['seconds']:>9.2f} {result['rows_per_second']:>10.0f} "
+                    f"{result['queries_per_row']:>11.4f} {result['peak_rss_mb']:>8.1f}"
+                )
+                if stage == 'transform':
+                    print(
+                        f"{'':>9} clean_value {result['reference_ns_per_row']} ns/riga, "
+                        f"compilato {result['ns_per_row']} ns/riga ({result['speedup']}x)"
+                    )
+    cleanup()
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': git_revision(),
+        'database': connection.vendor,
+        'options': {
+            'duplicate_ratio': args.duplicate_ratio,
+            'dirty_ratio': args.dirty_ratio,
+            'on_conflict': args.on_conflict,
+            'chunk_size': CSVImportService.CHUNK_SIZE,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nRisultati salvati in {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\nRegressioni rispetto al baseline:")
+            for regression in regressions:
+                print(f"  ✗ {regression}")
+            sys.exit(1)
+        print("\n✓ Nessuna regressione rispetto al baseline")
+
+
+if __name__ == '__main__':
+    main()
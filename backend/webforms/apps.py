@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class WebformsConfig(AppConfig):
     name = 'webforms'
+
+    def ready(self):
+        from config.counts import CountCache
+        from . import signals  # noqa: F401
+        from .models import WebformSubmission
+        CountCache.watch(WebformSubmission)
@@ -0,0 +1,37 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .services.fields import SubmissionFieldService
+
+
+class PayloadFieldFilter(BaseFilterBackend):
+    """
+    ?payload__<chiave>=a,b su WebformSubmission: payload[chiave] uguale a uno dei
+    valori, letto dalla tabella indicizzata WebformSubmissionField.
+    Solo le chiavi in promoted_fields di almeno un webform (400 altrimenti):
+    le submission di webform che non promuovono la chiave non vengono trovate.
+    """
+
+    prefix = 'payload__'
+
+    def filter_queryset(self, request, queryset, view):
+        params = {
+            param[len(self.prefix):]: value
+            for param, value in request.query_params.items()
+            if param.startswith(self.prefix)
+        }
+        if not params:
+            return queryset
+
+        promoted = set()
+        for keys in SubmissionFieldService.promoted_fields().values():
+            promoted.update(keys)
+        unknown = [key for key in params if key not in promoted]
+        if unknown:
+            raise ValidationError({
+                f'{self.prefix}{key}': "Campo del payload non promosso in nessun webform" for key in unknown
+            })
+
+        for key, value in params.items():
+            queryset = SubmissionFieldService.filter(queryset, key, value.split(','))
+        return queryset
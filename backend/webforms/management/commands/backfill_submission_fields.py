@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from webforms.models import WebformSubmission
+from webforms.services.fields import SubmissionFieldService
+
+
+class Command(BaseCommand):
+    help = (
+        "Allinea WebformSubmissionField (campi promossi del payload) per le submission esistenti: "
+        "da eseguire dopo aver modificato promoted_fields di un webform"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--webform', type=int, action='append', help="Solo questo webform (ripetibile)")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Submission per transazione")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        webform_ids = options['webform']
+
+        promoted = SubmissionFieldService.promoted_fields(webform_ids)
+        # Senza --webform i webform con campi promossi; con --webform anche quelli
+        # senza, per eliminare le righe di chiavi non più promosse
+        webform_ids = webform_ids or list(promoted)
+        if not webform_ids:
+            self.stdout.write("Nessun webform con promoted_fields: niente da allineare")
+            return
+
+        submissions = (
+            WebformSubmission.objects
+            .filter(webform_id__in=webform_ids)
+            .only('id', 'webform_id', 'payload')
+            .order_by('pk')
+        )
+
+        processed = 0
+        last_id = 0
+        while True:
+            # Paginazione a chiave su id: memoria costante a ogni dimensione
+            batch = list(submissions.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                SubmissionFieldService.sync(batch, promoted)
+            last_id = batch[-1].pk
+            processed += len(batch)
+            self.stdout.write(f"{processed} submission allineate (id <= {last_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill completato: {processed} submission"))
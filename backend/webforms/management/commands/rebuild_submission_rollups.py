@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from webforms.services.rollups import SubmissionRollupService
+
+
+class Command(BaseCommand):
+    help = (
+        "Ricalcola da zero WebformSubmissionDaily (submission per webform e giorno) "
+        "dalle WebformSubmission, in una transazione"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--webform', type=int, action='append', help="Solo questo webform (ripetibile)")
+
+    def handle(self, *args, **options):
+        rows = SubmissionRollupService.rebuild(options['webform'])
+        self.stdout.write(self.style.SUCCESS(f"Conteggi ricalcolati: {rows} righe (webform, giorno)"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persons', '0011_keyset_pagination_indexes'),
+        ('webforms', '0002_webform_website_alter_webformsubmission_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='webformsubmission',
+            index=models.Index(fields=['created_at', 'id'], name='webforms_we_created_7ab800_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persons', '0013_list_filter_indexes'),
+        ('webforms', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='webformsubmission',
+            name='webforms_we_webform_b93fe2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='webformsubmission',
+            index=models.Index(fields=['webform', 'external_id', 'created_at'], name='webforms_we_webform_c315f1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webformsubmission',
+            index=models.Index(fields=['webform', 'created_at'], name='webforms_we_webform_4a8f9f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webformsubmission',
+            index=models.Index(fields=['person', 'webform', 'created_at'], name='webforms_we_person__53516e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webformsubmission',
+            index=models.Index(fields=['external_id', 'created_at'], name='webforms_we_externa_8d59f4_idx'),
+        ),
+    ]
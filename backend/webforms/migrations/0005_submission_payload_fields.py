@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webforms', '0004_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webform',
+            name='promoted_fields',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='WebformSubmissionField',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=255)),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fields', to='webforms.webformsubmission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'value', 'submission'], name='webforms_we_key_1b386c_idx')],
+                'unique_together': {('submission', 'key', 'value')},
+            },
+        ),
+    ]
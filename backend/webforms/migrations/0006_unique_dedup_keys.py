@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:22
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def clear_duplicate_dedup_keys(apps, schema_editor):
+    """
+    Prima del vincolo UNIQUE: per ogni dedup_key ripetuto lo mantiene la riga più
+    vecchia, le altre restano con dedup_key NULL.
+    """
+    for model_name in ('Website', 'Webform'):
+        model = apps.get_model('webforms', model_name)
+        duplicates = (
+            model.objects.exclude(dedup_key=None)
+            .values('dedup_key').annotate(rows=Count('id')).filter(rows__gt=1)
+            .values_list('dedup_key', flat=True)
+        )
+        for dedup_key in list(duplicates):
+            keep = model.objects.filter(dedup_key=dedup_key).order_by('id').values_list('id', flat=True).first()
+            model.objects.filter(dedup_key=dedup_key).exclude(id=keep).update(dedup_key=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webforms', '0005_submission_payload_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_dedup_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='webform',
+            name='dedup_key',
+            field=models.CharField(blank=True, db_index=True, max_length=500, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='website',
+            name='dedup_key',
+            field=models.CharField(blank=True, db_index=True, max_length=500, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Popola WebformSubmissionDaily dalle submission esistenti (GROUP BY webform, giorno).
+    """
+    WebformSubmission = apps.get_model('webforms', 'WebformSubmission')
+    WebformSubmissionDaily = apps.get_model('webforms', 'WebformSubmissionDaily')
+
+    counts = (
+        WebformSubmission.objects.filter(webform__isnull=False)
+        .annotate(day=TruncDate('created_at'))
+        .values('webform_id', 'webform__website_id', 'day')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    WebformSubmissionDaily.objects.bulk_create(
+        [
+            WebformSubmissionDaily(
+                webform_id=row['webform_id'], website_id=row['webform__website_id'], day=row['day'], count=row['total']
+            )
+            for row in counts.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webforms', '0006_unique_dedup_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebformSubmissionDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('webform', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counts', to='webforms.webform')),
+                ('website', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_counts', to='webforms.website')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'webform', 'count'], name='webforms_we_day_70947c_idx'), models.Index(fields=['website', 'day'], name='webforms_we_website_2cb977_idx')],
+                'unique_together': {('webform', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -7,7 +7,7 @@ class Website(models.Model):
     name = models.CharField(max_length=255)
     url = models.URLField(unique=True)
     external_id = models.CharField(max_length=255, blank=True, null=True, unique=True)
-    dedup_key = models.CharField(max_length=500, blank=True, null=True, db_index=True)
+    dedup_key = models.CharField(max_length=500, blank=True, null=True, db_index=True, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -28,7 +28,9 @@ class Webform(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     external_id = models.CharField(max_length=255)
-    dedup_key = models.CharField(max_length=500, blank=True, null=True, db_index=True)
+    dedup_key = models.CharField(max_length=500, blank=True, null=True, db_index=True, unique=True)
+    # Chiavi del payload copiate in WebformSubmissionField, filtrabili con ?payload__<chiave>=
+    promoted_fields = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -67,10 +69,56 @@ class WebformSubmission(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['webform', 'external_id']),
+            models.Index(fields=['webform', 'external_id', 'created_at']),
             models.Index(fields=['person', 'created_at']),
+            # Paginazione a cursore (config/pagination.py)
+            models.Index(fields=['created_at', 'id']),
+            # Filtri della lista con ordinamento -created_at (check_query_plans.py)
+            models.Index(fields=['webform', 'created_at']),
+            models.Index(fields=['person', 'webform', 'created_at']),
+            models.Index(fields=['external_id', 'created_at']),
         ]
 
     def __str__(self):
         webform_name = self.webform.name if self.webform else "unknown"
         return f"{webform_name} - {self.person.email} - {self.created_at.strftime('%Y-%m-%d')}"
+
+
+class WebformSubmissionField(models.Model):
+    """Campo promosso del payload di una submission: forma indicizzata di payload[key]"""
+    submission = models.ForeignKey(WebformSubmission, on_delete=models.CASCADE, related_name="fields")
+    key = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = [('submission', 'key', 'value')]
+        indexes = [
+            # "tutte le submission con country = IT" senza leggere i payload
+            models.Index(fields=['key', 'value', 'submission']),
+        ]
+
+    def __str__(self):
+        return f"{self.key}={self.value} ({self.submission_id})"
+
+
+class WebformSubmissionDaily(models.Model):
+    """
+    Numero di submission per webform e giorno (TIME_ZONE), con il website del
+    webform per raggruppare per sito. Aggiornata a ogni creazione/cancellazione
+    (webforms/services/rollups.py); rebuild_submission_rollups la ricalcola.
+    """
+    webform = models.ForeignKey(Webform, on_delete=models.CASCADE, related_name="daily_counts")
+    website = models.ForeignKey(Website, on_delete=models.CASCADE, related_name="daily_counts")
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [('webform', 'day')]
+        indexes = [
+            # Serie per sito e top-N webform in un intervallo di giorni
+            models.Index(fields=['day', 'webform', 'count']),
+            models.Index(fields=['website', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.webform_id} {self.day}: {self.count}"
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from persons.models import Person
 from .models import Webform, Website, WebformSubmission
+from .services.fields import SubmissionFieldService
 
 
 class WebsiteSerializer(serializers.ModelSerializer):
@@ -11,6 +12,8 @@ class WebsiteSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        # I doppioni li rileva il vincolo UNIQUE all'INSERT (409, config/idempotency.py)
+        extra_kwargs = {'dedup_key': {'validators': []}}
 
 
 class WebformSerializer(serializers.ModelSerializer):
@@ -21,9 +24,27 @@ class WebformSerializer(serializers.ModelSerializer):
         model = Webform
         fields = [
             'id', 'website', 'website_id', 'name', 'description',
-            'external_id', 'dedup_key', 'created_at', 'updated_at',
+            'external_id', 'dedup_key', 'promoted_fields', 'created_at', 'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        extra_kwargs = {'dedup_key': {'validators': []}}
+
+    def validate_promoted_fields(self, value):
+        if not isinstance(value, list) or not all(isinstance(key, str) and key.strip() for key in value):
+            raise serializers.ValidationError("promoted_fields deve essere una lista di chiavi del payload")
+        keys = list(dict.fromkeys(key.strip() for key in value))
+        too_long = [key for key in keys if len(key) > SubmissionFieldService.KEY_MAX_LENGTH]
+        if too_long:
+            raise serializers.ValidationError(f"Chiavi troppo lunghe: {', '.join(too_long)}")
+        return keys
+
+
+class SubmissionPersonSerializer(serializers.ModelSerializer):
+    """Dati essenziali della Person di una submission"""
+    class Meta:
+        model = Person
+        fields = ['id', 'email', 'first_name', 'last_name']
+        read_only_fields = fields
 
 
 class WebformSubmissionSerializer(serializers.ModelSerializer):
@@ -33,7 +54,7 @@ class WebformSubmissionSerializer(serializers.ModelSerializer):
     """
     person_id = serializers.IntegerField(write_only=True, required=False)
     webform_id = serializers.IntegerField(write_only=True)
-    person = serializers.SerializerMethodField(read_only=True)
+    person = SubmissionPersonSerializer(read_only=True)
     webform = WebformSerializer(read_only=True)
 
     class Meta:
@@ -44,14 +65,7 @@ class WebformSubmissionSerializer(serializers.ModelSerializer):
             'source_website', 'created_at', 'updated_at',
         ]
         read_only_fields = ['id', 'person', 'webform', 'created_at', 'updated_at']
-
-    def get_person(self, obj):
-        return {
-            'id': obj.person.id,
-            'email': obj.person.email,
-            'first_name': obj.person.first_name,
-            'last_name': obj.person.last_name,
-        }
+        extra_kwargs = {'dedup_key': {'validators': []}}
 
     def create(self, validated_data):
         webform_id = validated_data.pop('webform_id')
@@ -0,0 +1,281 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from config.counts import CountCache
+from persons.models import Person
+from webforms.models import Webform, WebformSubmission
+from webforms.services.fields import SubmissionFieldService
+from webforms.services.rollups import SubmissionRollupService
+
+
+class SubmissionBatchService:
+    """
+    Inserimento di molte WebformSubmission in una richiesta, con un numero di
+    query che non dipende dal numero di elementi:
+
+      - una lettura dei dedup_key già presenti e una dei webform
+      - una lettura delle Person (per id e per email) e una bulk_create delle mancanti
+      - una bulk_create delle submission che salta i dedup_key esistenti e una
+        rilettura degli id: un dedup_key inserito nel frattempo è un duplicate
+      - i campi promossi del payload (SubmissionFieldService), anche senza dedup_key
+      - i conteggi giornalieri delle righe inserite (SubmissionRollupService), una
+        UPDATE per webform e giorno
+
+    Ogni elemento ha il suo esito: created, duplicate (con l'id esistente) o error.
+    Gli elementi hanno lo stesso formato della POST singola; senza person_id la
+    Person è cercata o creata dall'email del payload.
+    """
+
+    MAX_ITEMS = 1000
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def _text(value, name, max_length):
+        """
+        Stringa ripulita (None se vuota) entro max_length caratteri, oppure ValueError:
+        con ignore_conflicts MySQL troncherebbe i valori lunghi senza errori.
+        """
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (str, int)):
+            raise ValueError(f"{name} deve essere una stringa")
+        value = str(value).strip() or None
+        if value and len(value) > max_length:
+            raise ValueError(f"{name} supera {max_length} caratteri")
+        return value
+
+    @staticmethod
+    def _clean(item):
+        """
+        Elemento validato (senza query) oppure ValueError con il motivo.
+        """
+        if not isinstance(item, dict):
+            raise ValueError("Elemento non valido: atteso un oggetto")
+
+        payload = item.get('payload', {})
+        if not isinstance(payload, dict):
+            raise ValueError("payload deve essere un oggetto")
+
+        try:
+            webform_id = int(item['webform_id'])
+        except KeyError:
+            raise ValueError("webform_id è richiesto")
+        except (TypeError, ValueError):
+            raise ValueError("webform_id deve essere un intero")
+
+        person_id = item.get('person_id')
+        email = first_name = None
+        if person_id not in (None, ''):
+            try:
+                person_id = int(person_id)
+            except (TypeError, ValueError):
+                raise ValueError("person_id deve essere un intero")
+        else:
+            person_id = None
+            email = str(payload.get('email') or '').strip()
+            if not email:
+                raise ValueError("person_id o email nel payload è richiesto")
+            try:
+                validate_email(email)
+            except ValidationError:
+                raise ValueError(f"Email non valida: {email}")
+            if len(email) > Person._meta.get_field('email').max_length:
+                raise ValueError(f"Email non valida: {email}")
+            # Usato solo se la Person va creata
+            first_name = SubmissionBatchService._text(
+                payload.get('first_name'), 'first_name', Person._meta.get_field('first_name').max_length
+            )
+
+        cleaned = {
+            'webform_id': webform_id,
+            'person_id': person_id,
+            'email': email,
+            'first_name': first_name,
+            'payload': payload,
+        }
+        for field in ('external_id', 'dedup_key', 'source_website'):
+            max_length = WebformSubmission._meta.get_field(field).max_length
+            cleaned[field] = SubmissionBatchService._text(item.get(field), field, max_length)
+        return cleaned
+
+    @staticmethod
+    def _resolve_persons(items):
+        """
+        (person_id esistenti, {email minuscola: id}): una query per gli id, una per le
+        email esistenti, una bulk_create e una rilettura per le email nuove.
+        """
+        ids = {item['person_id'] for item in items if item['person_id'] is not None}
+        existing_ids = set(Person.objects.filter(pk__in=ids).values_list('id', flat=True)) if ids else set()
+
+        emails = {}
+        for item in items:
+            if item['email']:
+                emails.setdefault(item['email'].lower(), item)
+        by_email = {}
+        if emails:
+            # La collation di Person.email è case-insensitive
+            lookup = Person.objects.filter(email__in=[item['email'] for item in emails.values()])
+            for person_id, email in lookup.values_list('id', 'email'):
+                by_email[email.lower()] = person_id
+
+            missing = [key for key in emails if key not in by_email]
+            if missing:
+                Person.objects.bulk_create(
+                    [
+                        Person(
+                            email=emails[key]['email'],
+                            first_name=emails[key]['first_name'] or emails[key]['email'].split('@')[0],
+                        )
+                        for key in missing
+                    ],
+                    batch_size=SubmissionBatchService.BATCH_SIZE,
+                    # Email create nel frattempo da un'altra richiesta: rilette sotto
+                    ignore_conflicts=True,
+                )
+                created = Person.objects.filter(email__in=[emails[key]['email'] for key in missing])
+                for person_id, email in created.values_list('id', 'email'):
+                    by_email[email.lower()] = person_id
+                CountCache.invalidate(Person)
+        return existing_ids, by_email
+
+    @staticmethod
+    def _read_back(to_create):
+        """
+        ({indice: id} delle righe inserite, {indice: id esistente} dei dedup_key inseriti
+        nel frattempo da un'altra richiesta). Con ignore_conflicts (e su MySQL sempre)
+        bulk_create non restituisce gli id: si rileggono per dedup_key, o senza dedup_key
+        per (webform, person, created_at). La riga è di questo batch se ha il created_at
+        che bulk_create ha assegnato all'oggetto.
+        """
+        keys = [obj.dedup_key for obj in to_create.values() if obj.dedup_key]
+        by_key = {}
+        if keys:
+            # Lettura con lock: su MySQL vede anche le righe committate da altre transazioni
+            rows = WebformSubmission.objects.select_for_update().filter(dedup_key__in=keys)
+            for pk, key, created_at in rows.values_list('id', 'dedup_key', 'created_at'):
+                by_key[key] = (pk, created_at)
+
+        plain = [obj for obj in to_create.values() if not obj.dedup_key]
+        by_row = defaultdict(list)
+        if plain:
+            rows = WebformSubmission.objects.filter(
+                dedup_key__isnull=True,
+                webform_id__in={obj.webform_id for obj in plain},
+                created_at__in={obj.created_at for obj in plain},
+            ).order_by('id')
+            for pk, webform_id, person_id, created_at in rows.values_list('id', 'webform_id', 'person_id', 'created_at'):
+                by_row[(webform_id, person_id, created_at)].append(pk)
+
+        inserted, conflicts = {}, {}
+        for index, obj in to_create.items():
+            if not obj.dedup_key:
+                # Stessa chiave per più oggetti: gli id in ordine di inserimento
+                ids = by_row.get((obj.webform_id, obj.person_id, obj.created_at))
+                if ids:
+                    inserted[index] = ids.pop(0)
+            elif obj.dedup_key in by_key:
+                pk, created_at = by_key[obj.dedup_key]
+                if created_at == obj.created_at:
+                    inserted[index] = pk
+                else:
+                    conflicts[index] = pk
+        return inserted, conflicts
+
+    @staticmethod
+    def ingest(items):
+        """
+        Inserisce gli elementi e restituisce un esito per elemento, nello stesso ordine.
+        """
+        if not isinstance(items, list) or not items:
+            raise ValueError("submissions deve essere una lista non vuota")
+        if len(items) > SubmissionBatchService.MAX_ITEMS:
+            raise ValueError(f"Massimo {SubmissionBatchService.MAX_ITEMS} submission per richiesta")
+
+        results = [None] * len(items)
+        valid = {}
+        for index, item in enumerate(items):
+            try:
+                valid[index] = SubmissionBatchService._clean(item)
+            except ValueError as e:
+                results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+
+        with transaction.atomic():
+            # dedup_key già presenti, o ripetuti nella stessa richiesta
+            keys = {item['dedup_key'] for item in valid.values() if item['dedup_key']}
+            existing = dict(
+                WebformSubmission.objects.filter(dedup_key__in=keys).values_list('dedup_key', 'id')
+            ) if keys else {}
+            first_index = {}
+            for index, item in list(valid.items()):
+                key = item['dedup_key']
+                if key in existing:
+                    results[index] = {'index': index, 'status': 'duplicate', 'id': existing[key]}
+                    del valid[index]
+                elif key:
+                    first_index.setdefault(key, index)
+
+            webform_ids = {item['webform_id'] for item in valid.values()}
+            webforms = set(Webform.objects.filter(pk__in=webform_ids).values_list('id', flat=True)) if webform_ids else set()
+            person_ids, by_email = SubmissionBatchService._resolve_persons(list(valid.values()))
+
+            to_create = {}
+            for index, item in valid.items():
+                if item['webform_id'] not in webforms:
+                    results[index] = {'index': index, 'status': 'error', 'error': f"Webform {item['webform_id']} non trovato"}
+                    continue
+                person_id = item['person_id'] if item['person_id'] is not None else by_email.get(item['email'].lower())
+                if person_id is None or (item['person_id'] is not None and person_id not in person_ids):
+                    person = item['person_id'] if item['person_id'] is not None else item['email']
+                    results[index] = {'index': index, 'status': 'error', 'error': f"Person {person} non trovata"}
+                    continue
+                if item['dedup_key'] and first_index[item['dedup_key']] != index:
+                    # Ripetuto nella richiesta: l'esito è quello del primo
+                    continue
+                to_create[index] = WebformSubmission(
+                    webform_id=item['webform_id'],
+                    person_id=person_id,
+                    external_id=item['external_id'],
+                    dedup_key=item['dedup_key'],
+                    payload=item['payload'],
+                    source_website=item['source_website'],
+                )
+
+            if to_create:
+                # ignore_conflicts: un dedup_key inserito nel frattempo non fa fallire il batch
+                WebformSubmission.objects.bulk_create(
+                    list(to_create.values()), batch_size=SubmissionBatchService.BATCH_SIZE, ignore_conflicts=True
+                )
+                inserted, conflicts = SubmissionBatchService._read_back(to_create)
+                created = []
+                for index, obj in to_create.items():
+                    if index in conflicts:
+                        # dedup_key inserito da un'altra richiesta dopo la lettura iniziale
+                        results[index] = {'index': index, 'status': 'duplicate', 'id': conflicts[index]}
+                    elif index in inserted:
+                        obj.pk = inserted[index]
+                        created.append(obj)
+                        results[index] = {'index': index, 'status': 'created', 'id': obj.pk}
+                    else:
+                        # Scartata da ignore_conflicts (es. Person eliminata nel frattempo)
+                        results[index] = {'index': index, 'status': 'error', 'error': "Submission non inserita"}
+
+                # bulk_create non invia post_save: campi promossi, conteggi giornalieri
+                # e cache solo per le righe effettivamente inserite
+                if created:
+                    promoted = SubmissionFieldService.promoted_fields(webforms)
+                    if promoted:
+                        SubmissionFieldService.sync(created, promoted)
+                    SubmissionRollupService.record(created)
+                    CountCache.invalidate(WebformSubmission)
+
+        # Duplicati nella stessa richiesta: stesso id del primo elemento con quel dedup_key
+        for index, item in valid.items():
+            if results[index] is None:
+                first = results[first_index[item['dedup_key']]]
+                if first['status'] == 'error':
+                    results[index] = dict(first, index=index)
+                else:
+                    results[index] = {'index': index, 'status': 'duplicate', 'id': first.get('id')}
+        return results
@@ -0,0 +1,101 @@
+from config.counts import CountCache
+from webforms.models import Webform, WebformSubmission, WebformSubmissionField
+
+
+class SubmissionFieldService:
+    """
+    Mantiene WebformSubmissionField allineata a payload e Webform.promoted_fields.
+    Le save() passano dal receiver in webforms/signals.py; i percorsi bulk
+    (batch) chiamano sync direttamente. Dopo una modifica di promoted_fields le
+    submission esistenti si allineano con il comando backfill_submission_fields.
+
+    Valori: stringhe senza spazi ai bordi, booleani '1'/'0', numeri come testo;
+    una lista diventa una riga per elemento. Oggetti annidati e vuoti sono ignorati.
+    """
+
+    KEY_MAX_LENGTH = 100
+    VALUE_MAX_LENGTH = 255
+
+    @staticmethod
+    def normalize(value):
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, (int, float)):
+            return str(value)
+        if isinstance(value, str):
+            return value.strip()[:SubmissionFieldService.VALUE_MAX_LENGTH] or None
+        return None
+
+    @staticmethod
+    def values(payload, key):
+        value = payload.get(key) if isinstance(payload, dict) else None
+        items = value if isinstance(value, list) else [value]
+        return list(dict.fromkeys(
+            normalized for normalized in map(SubmissionFieldService.normalize, items) if normalized is not None
+        ))
+
+    @staticmethod
+    def promoted_fields(webform_ids=None):
+        """
+        {webform_id: [chiavi]} dei webform con campi promossi.
+        """
+        webforms = Webform.objects.all()
+        if webform_ids is not None:
+            webforms = webforms.filter(pk__in=webform_ids)
+        return {
+            webform_id: keys
+            for webform_id, keys in webforms.order_by().values_list('id', 'promoted_fields')
+            if keys
+        }
+
+    @staticmethod
+    def sync(submissions, promoted=None):
+        """
+        Allinea i campi promossi delle submission date (con id, webform_id e payload)
+        con una lettura, una delete e una bulk_create.
+        promoted ({webform_id: [chiavi]}) evita di rileggere i webform.
+        """
+        submissions = [submission for submission in submissions if submission.pk]
+        if not submissions:
+            return
+        if promoted is None:
+            promoted = SubmissionFieldService.promoted_fields({s.webform_id for s in submissions})
+
+        wanted = set()
+        for submission in submissions:
+            for key in promoted.get(submission.webform_id, ()):
+                for value in SubmissionFieldService.values(submission.payload, key):
+                    wanted.add((submission.pk, key, value))
+
+        stale = []
+        existing = WebformSubmissionField.objects.filter(submission_id__in=[s.pk for s in submissions])
+        for field_id, submission_id, key, value in existing.values_list('id', 'submission_id', 'key', 'value'):
+            if (submission_id, key, value) in wanted:
+                wanted.discard((submission_id, key, value))
+            else:
+                stale.append(field_id)
+
+        if stale:
+            WebformSubmissionField.objects.filter(id__in=stale).delete()
+        if wanted:
+            WebformSubmissionField.objects.bulk_create(
+                [WebformSubmissionField(submission_id=s, key=k, value=v) for s, k, v in wanted],
+                ignore_conflicts=True
+            )
+        if stale or wanted:
+            # I conteggi in cache delle liste filtrate per payload cambiano
+            CountCache.invalidate(WebformSubmission)
+
+    @staticmethod
+    def filter(queryset, key, values):
+        """
+        Submission con payload[key] uguale ad almeno uno dei valori.
+        Legge solo l'indice (key, value, submission).
+        """
+        values = [value.strip() for value in values if value.strip()]
+        if not values:
+            return queryset
+        submission_ids = WebformSubmissionField.objects.filter(key=key, value__in=values).values('submission_id')
+        return queryset.filter(pk__in=submission_ids)
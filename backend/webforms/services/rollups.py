@@ -0,0 +1,233 @@
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+from webforms.models import Webform, WebformSubmission, WebformSubmissionDaily
+
+# (lista on_commit della transazione, {savepoint attivi: variazioni}) in attesa del commit
+_pending = ContextVar('webforms_rollup_pending', default=None)
+
+
+class SubmissionRollupService:
+    """
+    Mantiene WebformSubmissionDaily (submission per webform e giorno) con
+    UPDATE count = count + n, senza rileggere le submission.
+    Le save()/delete() passano dai receiver in webforms/signals.py (serializer,
+    admin, sync Drupal, cancellazioni in cascata); i percorsi bulk (batch)
+    chiamano record direttamente. Le submission senza webform non sono contate.
+    """
+
+    INTERVALS = {
+        'day': None,
+        'week': TruncWeek,
+        'month': TruncMonth,
+    }
+    GROUPS = ('total', 'website', 'webform')
+    MAX_DAYS = 3660
+    DEFAULT_DAYS = 30
+    DEFAULT_TOP = 10
+
+    @staticmethod
+    def day(created_at):
+        return timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+
+    @staticmethod
+    def record(submissions, sign=1):
+        """
+        Conta (sign=1) o scala (sign=-1) le submission date (con webform_id e created_at).
+        Dentro una transazione le variazioni si accumulano e si applicano al commit,
+        una UPDATE per (webform, giorno): anche le post_delete di una cancellazione
+        in cascata di molte Person. Si accumulano per savepoint, con un callback
+        on_commit ciascuno: il rollback di un atomic() annidato scarta le sue.
+        """
+        deltas = Counter()
+        for submission in submissions:
+            if submission.webform_id is not None and submission.created_at is not None:
+                deltas[(submission.webform_id, SubmissionRollupService.day(submission.created_at))] += sign
+        if not deltas:
+            return
+
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            SubmissionRollupService.apply(deltas)
+            return
+
+        pending = _pending.get()
+        # La lista on_commit cambia a ogni commit e a ogni rollback (anche di un
+        # savepoint): restano valide solo le variazioni dei callback ancora registrati
+        if pending is None or pending[0] is not connection.run_on_commit:
+            pending = (connection.run_on_commit, SubmissionRollupService._registered(connection))
+            _pending.set(pending)
+
+        savepoints = frozenset(connection.savepoint_ids)
+        counter = pending[1].get(savepoints)
+        if counter is None:
+            counter = pending[1][savepoints] = Counter()
+            transaction.on_commit(partial(SubmissionRollupService._flush, counter))
+        counter.update(deltas)
+
+    @staticmethod
+    def _registered(connection):
+        """{savepoint attivi: variazioni} dei callback _flush in attesa sulla connessione"""
+        return {
+            frozenset(savepoints): callback.args[0]
+            for savepoints, callback, _ in connection.run_on_commit
+            if getattr(callback, 'func', None) == SubmissionRollupService._flush
+        }
+
+    @staticmethod
+    def _flush(deltas):
+        SubmissionRollupService.apply(deltas)
+
+    @staticmethod
+    def apply(deltas):
+        """
+        {(webform_id, giorno): variazione}: una UPDATE per chiave; le righe nuove
+        con una INSERT (e, se un'altra richiesta l'ha appena creata, di nuovo UPDATE).
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            missing = []
+            for (webform_id, day), delta in deltas.items():
+                rows = WebformSubmissionDaily.objects.filter(webform_id=webform_id, day=day)
+                if delta < 0:
+                    # count è positivo: le righe che andrebbero a zero si eliminano
+                    rows.filter(count__lte=-delta).delete()
+                if not rows.update(count=F('count') + delta) and delta > 0:
+                    missing.append((webform_id, day, delta))
+
+            if not missing:
+                return
+            websites = dict(
+                Webform.objects.filter(pk__in={webform_id for webform_id, _, _ in missing}).values_list('id', 'website_id')
+            )
+            for webform_id, day, delta in missing:
+                if webform_id not in websites:
+                    # Webform eliminato nel frattempo
+                    continue
+                try:
+                    with transaction.atomic():
+                        WebformSubmissionDaily.objects.create(
+                            webform_id=webform_id, website_id=websites[webform_id], day=day, count=delta
+                        )
+                except IntegrityError:
+                    WebformSubmissionDaily.objects.filter(webform_id=webform_id, day=day).update(
+                        count=F('count') + delta
+                    )
+
+    @staticmethod
+    def rebuild(webform_ids=None):
+        """
+        Ricalcola i conteggi dalle submission (GROUP BY webform, giorno) in una
+        transazione. Restituisce il numero di righe scritte.
+        """
+        submissions = WebformSubmission.objects.filter(webform__isnull=False)
+        rollups = WebformSubmissionDaily.objects.all()
+        if webform_ids:
+            submissions = submissions.filter(webform_id__in=webform_ids)
+            rollups = rollups.filter(webform_id__in=webform_ids)
+
+        counts = (
+            submissions
+            .annotate(day=TruncDate('created_at'))
+            .values('webform_id', 'webform__website_id', 'day')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        with transaction.atomic():
+            rollups.delete()
+            created = WebformSubmissionDaily.objects.bulk_create(
+                [
+                    WebformSubmissionDaily(
+                        webform_id=row['webform_id'],
+                        website_id=row['webform__website_id'],
+                        day=row['day'],
+                        count=row['total'],
+                    )
+                    for row in counts.iterator()
+                ],
+                batch_size=1000
+            )
+        return len(created)
+
+    @staticmethod
+    def parse_range(date_from=None, date_to=None):
+        """
+        (date_from, date_to) inclusivi da stringhe YYYY-MM-DD; default gli ultimi
+        DEFAULT_DAYS giorni. ValueError se non validi.
+        """
+        try:
+            end = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else timezone.localdate()
+            start = (
+                datetime.strptime(date_from, '%Y-%m-%d').date() if date_from
+                else end - timedelta(days=SubmissionRollupService.DEFAULT_DAYS - 1)
+            )
+        except ValueError:
+            raise ValueError("date_from/date_to devono essere nel formato YYYY-MM-DD")
+        if start > end:
+            raise ValueError("date_from deve precedere date_to")
+        if (end - start).days > SubmissionRollupService.MAX_DAYS:
+            raise ValueError(f"Intervallo massimo {SubmissionRollupService.MAX_DAYS} giorni")
+        return start, end
+
+    @staticmethod
+    def rows(start, end, website_ids=None, webform_ids=None):
+        rows = WebformSubmissionDaily.objects.filter(day__gte=start, day__lte=end)
+        if website_ids:
+            rows = rows.filter(website_id__in=website_ids)
+        if webform_ids:
+            rows = rows.filter(webform_id__in=webform_ids)
+        return rows
+
+    @staticmethod
+    def series(rows, interval='day', group='total'):
+        """
+        [{'period': data, 'count': n, (website|webform: id)}] ordinati per periodo.
+        """
+        if interval not in SubmissionRollupService.INTERVALS:
+            raise ValueError(f"interval deve essere uno tra: {', '.join(SubmissionRollupService.INTERVALS)}")
+        if group not in SubmissionRollupService.GROUPS:
+            raise ValueError(f"group_by deve essere uno tra: {', '.join(SubmissionRollupService.GROUPS)}")
+
+        trunc = SubmissionRollupService.INTERVALS[interval]
+        rows = rows.annotate(period=trunc('day') if trunc else F('day'))
+        fields = ['period'] + ([f'{group}_id'] if group != 'total' else [])
+        series = rows.values(*fields).annotate(count=Sum('count')).order_by(*fields)
+        return [
+            {
+                'period': row['period'].isoformat(),
+                **({group: row[f'{group}_id']} if group != 'total' else {}),
+                'count': row['count'],
+            }
+            for row in series
+        ]
+
+    @staticmethod
+    def top(rows, limit=DEFAULT_TOP):
+        """
+        I limit webform con più submission nell'intervallo.
+        """
+        top = (
+            rows
+            .values('webform_id', 'webform__name', 'website_id', 'website__name')
+            .annotate(count=Sum('count'))
+            .order_by('-count', 'webform_id')[:limit]
+        )
+        return [
+            {
+                'webform': row['webform_id'],
+                'name': row['webform__name'],
+                'website': row['website_id'],
+                'website_name': row['website__name'],
+                'count': row['count'],
+            }
+            for row in top
+        ]
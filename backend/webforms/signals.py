@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Webform, WebformSubmission, WebformSubmissionDaily
+from .services.fields import SubmissionFieldService
+from .services.rollups import SubmissionRollupService
+
+
+@receiver(post_save, sender=WebformSubmission)
+def sync_submission_fields(sender, instance, update_fields=None, **kwargs):
+    """
+    Ogni save() di WebformSubmission (serializer, admin, sync Drupal) riallinea
+    i campi promossi. Con update_fields senza payload/webform non serve.
+    """
+    if update_fields is not None and not {'payload', 'webform', 'webform_id'} & set(update_fields):
+        return
+    SubmissionFieldService.sync([instance])
+
+
+@receiver(post_save, sender=WebformSubmission)
+def count_created_submission(sender, instance, created=False, **kwargs):
+    """Conteggi giornalieri (WebformSubmissionDaily): +1 a ogni creazione"""
+    if created:
+        SubmissionRollupService.record([instance])
+
+
+@receiver(post_delete, sender=WebformSubmission)
+def count_deleted_submission(sender, instance, **kwargs):
+    """-1 a ogni cancellazione, anche in cascata da Person o Webform"""
+    SubmissionRollupService.record([instance], sign=-1)
+
+
+@receiver(post_save, sender=Webform)
+def move_webform_counts(sender, instance, created=False, **kwargs):
+    """Un webform spostato su un altro sito porta con sé i suoi conteggi"""
+    if not created:
+        WebformSubmissionDaily.objects.filter(webform=instance).exclude(website_id=instance.website_id).update(
+            website_id=instance.website_id
+        )
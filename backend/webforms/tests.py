@@ -1,3 +1,585 @@
-from django.test import TestCase
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from config.testing import LOCMEM_CACHES, QueryBudgetMixin
+from persons.models import Person
+from persons.services.bulk import PersonBulkService
+
+from .models import Webform, WebformSubmission, WebformSubmissionDaily, Website
+from .services.batch import SubmissionBatchService
+from .services.rollups import SubmissionRollupService
+
+
+class ConditionalListTests(APITestCase):
+    """ETag/Last-Modified su GET /api/webforms/ e /api/websites/"""
+
+    def setUp(self):
+        self.website = Website.objects.create(name='Sito', url='https://example.com')
+        self.webform = Webform.objects.create(website=self.website, name='Contatti', external_id='contact')
+
+    def assertNotModified(self, url, **params):
+        etag = self.client.get(url, params)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        return etag
+
+    def test_webforms_not_modified(self):
+        self.assertNotModified('/api/webforms/')
+
+    def test_websites_not_modified(self):
+        self.assertNotModified('/api/websites/')
+
+    def test_webform_detail_not_modified(self):
+        self.assertNotModified(f'/api/webforms/{self.webform.id}/')
+
+    def test_filters_change_etag(self):
+        etag = self.client.get('/api/webforms/')['ETag']
+        response = self.client.get('/api/webforms/', {'external_id': 'contact'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_changes_etag(self):
+        etag = self.assertNotModified('/api/webforms/')
+        Webform.objects.create(website=self.website, name='Newsletter', external_id='newsletter')
+        response = self.client.get('/api/webforms/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_changes_etag(self):
+        Webform.objects.create(website=self.website, name='Newsletter', external_id='newsletter')
+        etag = self.assertNotModified('/api/webforms/')
+        self.webform.delete()
+        response = self.client.get('/api/webforms/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_without_last_modified(self):
+        response = self.client.get('/api/webforms/')
+        self.assertNotIn('Last-Modified', response)
+        # If-Modified-Since da solo non basta per un 304: una cancellazione non cambia MAX(updated_at)
+        Webform.objects.create(website=self.website, name='Newsletter', external_id='newsletter')
+        self.webform.delete()
+        response = self.client.get('/api/webforms/', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_nested_website_change_invalidates_webforms(self):
+        etag = self.assertNotModified('/api/webforms/')
+        self.website.name = 'Sito rinominato'
+        self.website.save()
+        response = self.client.get('/api/webforms/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['website']['name'], 'Sito rinominato')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Query per endpoint di /api/websites/, /api/webforms/ e /api/webform-submissions/:
+    ogni riga ha website, webform e person diversi, un N+1 supera il budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        websites = Website.objects.bulk_create([
+            Website(name=f'Sito {i}', url=f'https://{i}.example.com', external_id=f'site-{i}') for i in range(25)
+        ])
+        webforms = Webform.objects.bulk_create([
+            Webform(website=website, name=f'Form {i}', external_id=f'form-{i}') for i, website in enumerate(websites)
+        ])
+        persons = Person.objects.bulk_create([
+            Person(email=f'budget{i}@example.com', first_name=f'Nome{i}') for i in range(25)
+        ])
+        submissions = WebformSubmission.objects.bulk_create([
+            WebformSubmission(webform=webform, person=person, external_id=f'sub-{i}', payload={'i': i})
+            for i, (webform, person) in enumerate(zip(webforms, persons))
+        ])
+        cls.website, cls.webform, cls.submission = websites[0], webforms[0], submissions[0]
+
+    def test_websites_list(self):
+        self.assertQueryBudget(3, '/api/websites/')
+
+    def test_website_retrieve(self):
+        self.assertQueryBudget(2, f'/api/websites/{self.website.id}/')
+
+    def test_webforms_list(self):
+        self.assertQueryBudget(3, '/api/webforms/')
+
+    def test_webform_retrieve(self):
+        self.assertQueryBudget(2, f'/api/webforms/{self.webform.id}/')
+
+    def test_submissions_list(self):
+        self.assertQueryBudget(2, '/api/webform-submissions/')
+
+    def test_submissions_list_filtered(self):
+        # +1: django-filter valida l'id del webform
+        self.assertQueryBudget(3, '/api/webform-submissions/', {'webform': self.webform.id})
+
+    def test_submissions_list_cursor(self):
+        self.assertQueryBudget(1, '/api/webform-submissions/', {'pagination': 'cursor'})
+
+    def test_submission_retrieve(self):
+        response = self.assertQueryBudget(1, f'/api/webform-submissions/{self.submission.id}/')
+        self.assertEqual(response.json()['webform']['website']['id'], self.website.id)
+
+    def test_submission_retrieve_fields(self):
+        self.assertQueryBudget(1, f'/api/webform-submissions/{self.submission.id}/', {'fields': 'id,person'})
+
+    def test_submissions_export(self):
+        self.assertQueryBudget(2, '/api/webform-submissions/export/', {'output': 'ndjson'})
+
+
+class SubmissionBatchTests(APITestCase):
+    """POST /api/webform-submissions/batch/"""
+
+    url = '/api/webform-submissions/batch/'
+
+    def setUp(self):
+        website = Website.objects.create(name='Sito', url='https://example.com')
+        self.webform = Webform.objects.create(website=website, name='Contatti', external_id='contact')
+        self.person = Person.objects.create(email='esistente@example.com')
+
+    def item(self, i, **extra):
+        return dict({
+            'webform_id': self.webform.id,
+            'dedup_key': f'key-{i}',
+            'payload': {'email': f'batch{i}@example.com', 'first_name': f'Nome{i}'},
+        }, **extra)
+
+    def test_results_per_item(self):
+        existing = WebformSubmission.objects.create(
+            webform=self.webform, person=self.person, dedup_key='key-existing', payload={}
+        )
+        items = [
+            self.item(0),
+            self.item(1, person_id=self.person.id, payload={}),
+            self.item(2, dedup_key='key-existing'),
+            self.item(3, dedup_key='key-0'),
+            self.item(4, webform_id=999999),
+            self.item(5, payload={}),
+            self.item(6, person_id=999999),
+        ]
+        response = self.client.post(self.url, {'submissions': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['duplicates'], data['errors']), (2, 2, 3))
+
+        results = data['results']
+        self.assertEqual([result['status'] for result in results], [
+            'created', 'created', 'duplicate', 'duplicate', 'error', 'error', 'error',
+        ])
+        created = WebformSubmission.objects.get(dedup_key='key-0')
+        self.assertEqual(results[0]['id'], created.id)
+        self.assertEqual(created.person.email, 'batch0@example.com')
+        self.assertEqual(created.person.first_name, 'Nome0')
+        self.assertEqual(results[2]['id'], existing.id)
+        self.assertEqual(results[3]['id'], created.id)
+        self.assertEqual(WebformSubmission.objects.get(id=results[1]['id']).person, self.person)
+
+    def test_existing_person_by_email(self):
+        items = [self.item(i, payload={'email': 'esistente@example.com'}) for i in range(3)]
+        self.client.post(self.url, items, format='json')
+        self.assertEqual(Person.objects.count(), 1)
+        self.assertEqual(self.person.webform_submissions.count(), 3)
+
+    def test_lengths_and_types(self):
+        items = [
+            self.item(0, external_id='x' * 256),
+            self.item(1, source_website='x' * 256),
+            self.item(2, payload={'email': 'lungo@example.com', 'first_name': 'x' * 101}),
+            self.item(3, payload={'email': 'dict@example.com', 'first_name': {'a': 1}}),
+            self.item(4, dedup_key=['lista']),
+            self.item(5, external_id=123),
+        ]
+        response = self.client.post(self.url, {'submissions': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['error'] * 5 + ['created'])
+        self.assertEqual(results[0]['error'], 'external_id supera 255 caratteri')
+        self.assertEqual(results[2]['error'], 'first_name supera 100 caratteri')
+        self.assertEqual(results[3]['error'], 'first_name deve essere una stringa')
+        self.assertEqual(WebformSubmission.objects.get(dedup_key='key-5').external_id, '123')
+        self.assertFalse(Person.objects.filter(email__in=['lungo@example.com', 'dict@example.com']).exists())
+
+    def test_missing_person_by_email(self):
+        with mock.patch.object(SubmissionBatchService, '_resolve_persons', return_value=(set(), {})):
+            response = self.client.post(self.url, {'submissions': [self.item(0)]}, format='json')
+        self.assertEqual(response.json()['results'][0]['error'], 'Person batch0@example.com non trovata')
+
+    def test_concurrent_dedup_key(self):
+        # dedup_key inserito da un'altra richiesta tra la lettura iniziale e la bulk_create
+        racer = {}
+        resolve = SubmissionBatchService._resolve_persons
+
+        def resolve_during_race(items):
+            racer['submission'] = WebformSubmission.objects.create(
+                webform=self.webform, person=self.person, dedup_key='key-0', payload={}
+            )
+            return resolve(items)
+
+        with mock.patch.object(SubmissionBatchService, '_resolve_persons', side_effect=resolve_during_race):
+            response = self.client.post(self.url, {'submissions': [self.item(0), self.item(1)]}, format='json')
+        data = response.json()
+        self.assertEqual((data['created'], data['duplicates']), (1, 1))
+        self.assertEqual(data['results'][0], {'index': 0, 'status': 'duplicate', 'id': racer['submission'].id})
+        self.assertEqual(data['results'][1]['id'], WebformSubmission.objects.get(dedup_key='key-1').id)
+        self.assertEqual(WebformSubmission.objects.filter(dedup_key='key-0').count(), 1)
+
+    def test_rollups_count_inserted_rows(self):
+        items = [self.item(0), self.item(1, dedup_key='key-existing'), self.item(2, dedup_key='key-0'), self.item(3)]
+        resolve = SubmissionBatchService._resolve_persons
+
+        def resolve_during_race(items):
+            WebformSubmission.objects.create(webform=self.webform, person=self.person, dedup_key='key-3', payload={})
+            return resolve(items)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WebformSubmission.objects.create(
+                webform=self.webform, person=self.person, dedup_key='key-existing', payload={}
+            )
+            with mock.patch.object(SubmissionBatchService, '_resolve_persons', side_effect=resolve_during_race):
+                response = self.client.post(self.url, {'submissions': items}, format='json')
+        self.assertEqual(response.json()['created'], 1)
+        # Solo key-0 è inserita dal batch: il doppione, il ripetuto e il conflitto non contano
+        daily = WebformSubmissionDaily.objects.get(webform=self.webform)
+        self.assertEqual(daily.count, WebformSubmission.objects.filter(webform=self.webform).count())
+        self.assertEqual(daily.count, 3)
+
+    def test_fields_without_returned_ids(self):
+        # Come su MySQL: bulk_create non restituisce gli id, gli elementi non hanno dedup_key
+        self.webform.promoted_fields = ['country']
+        self.webform.save()
+        items = [
+            self.item(i, dedup_key=None, person_id=self.person.id, payload={'country': country})
+            for i, country in enumerate(['IT', 'FR', 'IT'])
+        ]
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            response = self.client.post(self.url, {'submissions': items}, format='json')
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created'] * 3)
+        ids = [result['id'] for result in results]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual(
+            [WebformSubmission.objects.get(id=pk).fields.get(key='country').value for pk in ids],
+            ['IT', 'FR', 'IT'],
+        )
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_queries_per_batch(self):
+        # Le INSERT sono divise in blocchi (BATCH_SIZE, limite di parametri di sqlite),
+        # le letture sono una per tipo e i conteggi giornalieri una per (webform, giorno):
+        # nessuna query per elemento
+        items = [self.item(i) for i in range(200)]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {'submissions': items}, format='json')
+        self.assertEqual(response.json()['created'], 200)
+        self.assertLessEqual(len(context), 25)
+
+    def test_invalid_body(self):
+        response = self.client.post(self.url, {'submissions': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+
+class PayloadFieldTests(APITestCase):
+    """?payload__<chiave>= su /api/webform-submissions/ e backfill_submission_fields"""
+
+    url = '/api/webform-submissions/'
+
+    def setUp(self):
+        website = Website.objects.create(name='Sito', url='https://example.com')
+        self.webform = Webform.objects.create(
+            website=website, name='Contatti', external_id='contact', promoted_fields=['country', 'consent', 'topics']
+        )
+        self.other = Webform.objects.create(website=website, name='Newsletter', external_id='newsletter')
+        self.person = Person.objects.create(email='payload@example.com')
+
+    def submit(self, webform, **payload):
+        return WebformSubmission.objects.create(webform=webform, person=self.person, payload=payload)
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.json()['results']}
+
+    def test_filters(self):
+        italy = self.submit(self.webform, country=' IT ', consent=True, topics=['a', 'b'])
+        france = self.submit(self.webform, country='FR', consent=0, topics='b')
+        self.submit(self.other, country='IT')
+
+        self.assertEqual(self.ids(payload__country='IT'), {italy.id})
+        self.assertEqual(self.ids(payload__country='IT,FR'), {italy.id, france.id})
+        self.assertEqual(self.ids(payload__consent='1'), {italy.id})
+        self.assertEqual(self.ids(payload__topics='b', payload__consent='0'), {france.id})
+
+    def test_update_resyncs(self):
+        submission = self.submit(self.webform, country='IT')
+        submission.payload = {'country': 'ES'}
+        submission.save()
+        self.assertEqual(self.ids(payload__country='IT'), set())
+        self.assertEqual(self.ids(payload__country='ES'), {submission.id})
+
+    def test_unknown_key(self):
+        response = self.client.get(self.url, {'payload__email': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('payload__email', response.json())
+
+    def test_batch(self):
+        items = [
+            {'webform_id': self.webform.id, 'dedup_key': f'k{i}', 'payload': {'email': f'b{i}@example.com', 'country': 'IT'}}
+            for i in range(3)
+        ]
+        self.client.post('/api/webform-submissions/batch/', items, format='json')
+        self.assertEqual(len(self.ids(payload__country='IT')), 3)
+
+    def test_backfill(self):
+        submission = self.submit(self.other, country='IT')
+        self.other.promoted_fields = ['country']
+        self.other.save()
+        self.assertEqual(self.ids(payload__country='IT'), set())
+
+        # I conteggi in cache sono invalidati al commit
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('backfill_submission_fields', stdout=io.StringIO())
+        self.assertEqual(self.ids(payload__country='IT'), {submission.id})
+
+        self.other.promoted_fields = []
+        self.other.save()
+        call_command('backfill_submission_fields', webform=[self.other.id], stdout=io.StringIO())
+        self.assertFalse(submission.fields.exists())
+
+
+class IdempotentCreateTests(APITestCase):
+    """POST con dedup_key o Idempotency-Key già usati: 409 con l'id esistente"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('drupal')
+        self.client.force_authenticate(self.user)
+        self.website = Website.objects.create(name='Sito', url='https://example.com', dedup_key='site')
+        self.webform = Webform.objects.create(website=self.website, name='Contatti', external_id='contact')
+        self.person = Person.objects.create(email='idem@example.com')
+
+    def test_website_conflict(self):
+        response = self.client.post(
+            '/api/websites/', {'name': 'Altro', 'url': 'https://altro.example.com', 'dedup_key': 'site'}, format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'id': self.website.id, 'name': 'Sito'})
+
+    def test_identical_repost(self):
+        data = {'name': 'Nuovo', 'url': 'https://nuovo.example.com', 'external_id': 'nuovo', 'dedup_key': 'nuovo'}
+        first = self.client.post('/api/websites/', data, format='json')
+        self.assertEqual(first.status_code, 201)
+
+        # Stessi url ed external_id: la chiave già usata prevale sui validatori univoci
+        again = self.client.post('/api/websites/', data, format='json')
+        self.assertEqual(again.status_code, 409)
+        self.assertEqual(again.json(), {'id': first.json()['id'], 'name': 'Nuovo'})
+        self.assertEqual(Website.objects.filter(dedup_key='nuovo').count(), 1)
+
+    def test_unique_url_without_key(self):
+        response = self.client.post('/api/websites/', {'name': 'Altro', 'url': 'https://example.com'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('url', response.json())
+
+    def test_no_select_before_insert(self):
+        data = {'name': 'Nuovo', 'url': 'https://nuovo.example.com', 'external_id': 'nuovo'}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/websites/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        statements = [query['sql'].split()[0].upper() for query in context]
+        self.assertEqual(statements[:statements.index('INSERT')].count('SELECT'), 0)
+
+    def test_unique_conflict_not_visible(self):
+        # Riga in conflitto non ancora visibile alla lettura (es. snapshot di MySQL)
+        with mock.patch.object(Website, 'validate_unique'):
+            response = self.client.post('/api/websites/', {'name': 'Altro', 'url': 'https://example.com'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('error', response.json())
+
+    def test_list_body(self):
+        response = self.client.post('/api/websites/', [{'name': 'Sito', 'url': 'https://example.com'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_webform_idempotency_key(self):
+        data = {'website_id': self.website.id, 'name': 'Newsletter', 'external_id': 'newsletter'}
+        first = self.client.post('/api/webforms/', data, format='json', HTTP_IDEMPOTENCY_KEY='nl-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.json()['dedup_key'], 'nl-1')
+
+        again = self.client.post('/api/webforms/', data, format='json', HTTP_IDEMPOTENCY_KEY='nl-1')
+        self.assertEqual(again.status_code, 409)
+        self.assertEqual(again.json()['id'], first.json()['id'])
+
+    def test_submission_conflict_without_lookup(self):
+        data = {'webform_id': self.webform.id, 'person_id': self.person.id, 'payload': {}, 'dedup_key': 'sub-1'}
+        self.assertEqual(self.client.post('/api/webform-submissions/', data, format='json').status_code, 201)
+        response = self.client.post('/api/webform-submissions/', data, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'id': WebformSubmission.objects.get(dedup_key='sub-1').id})
+
+    def test_mismatched_keys(self):
+        data = {'webform_id': self.webform.id, 'person_id': self.person.id, 'payload': {}, 'dedup_key': 'a'}
+        response = self.client.post('/api/webform-submissions/', data, format='json', HTTP_IDEMPOTENCY_KEY='b')
+        self.assertEqual(response.status_code, 400)
+
+
+@skipIf(connection.vendor == 'sqlite', "sqlite blocca le scritture concorrenti (database is locked)")
+class ConcurrentCreateTests(TransactionTestCase):
+    """
+    POST concorrenti con lo stesso dedup_key: una sola riga, le altre 409, nessun 500.
+    Richiede un DB con scritture concorrenti (MySQL): su sqlite si salta.
+    """
+
+    THREADS = 8
+
+    def setUp(self):
+        website = Website.objects.create(name='Sito', url='https://example.com')
+        self.webform = Webform.objects.create(website=website, name='Contatti', external_id='contact')
+        self.person = Person.objects.create(email='race@example.com')
+
+    def post_concurrently(self, data):
+        barrier = threading.Barrier(self.THREADS)
+
+        def post(_):
+            try:
+                client = APIClient()
+                barrier.wait()
+                return client.post('/api/webform-submissions/', data, format='json').status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.THREADS) as executor:
+            return sorted(executor.map(post, range(self.THREADS)))
+
+    def test_parallel_duplicates(self):
+        data = {'webform_id': self.webform.id, 'person_id': self.person.id, 'payload': {}, 'dedup_key': 'race'}
+        statuses = self.post_concurrently(data)
+        self.assertEqual(statuses, [201] + [409] * (self.THREADS - 1))
+        self.assertEqual(WebformSubmission.objects.filter(dedup_key='race').count(), 1)
+
+
+class SubmissionRollupTests(APITestCase):
+    """WebformSubmissionDaily e GET /api/webforms/analytics/"""
+
+    url = '/api/webforms/analytics/'
+
+    def setUp(self):
+        self.website = Website.objects.create(name='Sito', url='https://example.com')
+        self.other_site = Website.objects.create(name='Altro', url='https://altro.example.com')
+        self.contact = Webform.objects.create(website=self.website, name='Contatti', external_id='contact')
+        self.newsletter = Webform.objects.create(website=self.other_site, name='Newsletter', external_id='nl')
+        self.person = Person.objects.create(email='rollup@example.com')
+
+    def submit(self, webform, day, count=1):
+        for _ in range(count):
+            submission = WebformSubmission.objects.create(webform=webform, person=self.person, payload={})
+            WebformSubmission.objects.filter(pk=submission.pk).update(created_at=f'{day}T12:00:00Z')
+        # created_at retrodatato con update(): i conteggi si ricalcolano
+        call_command('rebuild_submission_rollups', stdout=io.StringIO())
+
+    def counts(self):
+        return {
+            (row.webform_id, row.day.isoformat()): row.count
+            for row in WebformSubmissionDaily.objects.all()
+        }
+
+    def test_incremental_create_and_delete(self):
+        today = timezone.localdate().isoformat()
+        # Nel test tutto è in una transazione: le variazioni si applicano a fine blocco
+        with self.captureOnCommitCallbacks(execute=True):
+            first = WebformSubmission.objects.create(webform=self.contact, person=self.person, payload={})
+            WebformSubmission.objects.create(webform=self.contact, person=self.person, payload={})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/webform-submissions/batch/', [
+                {'webform_id': self.newsletter.id, 'person_id': self.person.id, 'dedup_key': f'k{i}'} for i in range(3)
+            ], format='json')
+        self.assertEqual(self.counts(), {(self.contact.id, today): 2, (self.newsletter.id, today): 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.counts(), {(self.contact.id, today): 1, (self.newsletter.id, today): 3})
+
+        # Cancellazione in cascata dalla Person: una UPDATE per (webform, giorno)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            PersonBulkService.delete([self.person.id])
+            self.assertEqual(len(self.counts()), 2)
+        self.assertEqual(self.counts(), {})
+        self.assertEqual(sum(getattr(callback, 'func', None) == SubmissionRollupService._flush for callback in callbacks), 1)
+
+    def test_rollback_discards_counts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    WebformSubmission.objects.create(webform=self.contact, person=self.person, payload={})
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            WebformSubmission.objects.create(webform=self.newsletter, person=self.person, payload={})
+        self.assertEqual(self.counts(), {(self.newsletter.id, timezone.localdate().isoformat()): 1})
+
+    def test_nested_rollback_discards_counts(self):
+        # Variazioni già in attesa nella transazione esterna, poi un savepoint annullato
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                WebformSubmission.objects.create(webform=self.contact, person=self.person, payload={})
+                try:
+                    with transaction.atomic():
+                        WebformSubmission.objects.create(webform=self.contact, person=self.person, payload={})
+                        raise IntegrityError
+                except IntegrityError:
+                    pass
+                with transaction.atomic():
+                    WebformSubmission.objects.create(webform=self.newsletter, person=self.person, payload={})
+                WebformSubmission.objects.create(webform=self.contact, person=self.person, payload={})
+        today = timezone.localdate().isoformat()
+        self.assertEqual(self.counts(), {(self.contact.id, today): 2, (self.newsletter.id, today): 1})
+
+    def test_rebuild_matches_incremental(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(2):
+                WebformSubmission.objects.create(webform=self.contact, person=self.person, payload={})
+        incremental = self.counts()
+        WebformSubmissionDaily.objects.update(count=99)
+        call_command('rebuild_submission_rollups', stdout=io.StringIO())
+        self.assertEqual(self.counts(), incremental)
+
+    def test_series_and_top(self):
+        self.submit(self.contact, '2026-03-01', 2)
+        self.submit(self.contact, '2026-03-02', 1)
+        self.submit(self.newsletter, '2026-03-02', 4)
+        params = {'date_from': '2026-03-01', 'date_to': '2026-03-31'}
+
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url, params).json()
+        self.assertEqual(data['total'], 7)
+        self.assertEqual(data['series'], [
+            {'period': '2026-03-01', 'count': 2},
+            {'period': '2026-03-02', 'count': 5},
+        ])
+        self.assertEqual([(row['webform'], row['count']) for row in data['top']], [
+            (self.newsletter.id, 4), (self.contact.id, 3),
+        ])
+
+        data = self.client.get(self.url, dict(params, interval='month', group_by='website')).json()
+        self.assertEqual(data['series'], [
+            {'period': '2026-03-01', 'website': self.website.id, 'count': 3},
+            {'period': '2026-03-01', 'website': self.other_site.id, 'count': 4},
+        ])
+
+        data = self.client.get(self.url, dict(params, webform=self.contact.id, top=0)).json()
+        self.assertEqual((data['total'], data['top']), (3, []))
+
+    def test_invalid_params(self):
+        for params in ({'date_from': '03/01/2026'}, {'interval': 'year'}, {'webform': 'x'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
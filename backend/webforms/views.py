@@ -3,15 +3,25 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
 import subprocess
 import json
 
+from config.conditional import ConditionalMixin
+from config.export import ExportMixin
+from config.idempotency import IdempotentCreateMixin
+from config.pagination import OptionalKeysetPagination
+from config.sparse import SparseFieldsMixin
 from persons.models import Person
+from .filters import PayloadFieldFilter
 from .models import Webform, Website, WebformSubmission
 from .serializers import WebformSerializer, WebsiteSerializer, WebformSubmissionSerializer
+from .services.batch import SubmissionBatchService
+from .services.rollups import SubmissionRollupService
 
 
-class WebsiteViewSet(ModelViewSet):
+class WebsiteViewSet(ConditionalMixin, IdempotentCreateMixin, ModelViewSet):
     queryset = Website.objects.all()
     serializer_class = WebsiteSerializer
     filterset_fields = ['url', 'external_id']
@@ -23,27 +33,17 @@ class WebsiteViewSet(ModelViewSet):
             return [AllowAny()]
         return [IsAuthenticated()]
 
-    def create(self, request, *args, **kwargs):
-        dedup_key = request.data.get('dedup_key')
-        if dedup_key:
-            existing = Website.objects.filter(dedup_key=dedup_key).first()
-            if existing:
-                return Response(
-                    {'id': existing.id, 'name': existing.name},
-                    status=status.HTTP_409_CONFLICT
-                )
-
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    def get_conflict_data(self, instance):
+        return {'id': instance.id, 'name': instance.name}
 
 
-class WebformViewSet(ModelViewSet):
-    queryset = Webform.objects.all()
+class WebformViewSet(ConditionalMixin, IdempotentCreateMixin, ModelViewSet):
+    # Il serializer annida il website: una JOIN invece di una query per riga
+    queryset = Webform.objects.select_related('website')
     serializer_class = WebformSerializer
     filterset_fields = ['website', 'external_id']
     ordering = ['-created_at']
+    conditional_related = ('website',)
     
     def get_permissions(self):
         """Allow public READ, but protect WRITE operations for Drupal (Token auth)"""
@@ -51,28 +51,61 @@ class WebformViewSet(ModelViewSet):
             return [AllowAny()]
         return [IsAuthenticated()]
 
-    def create(self, request, *args, **kwargs):
-        dedup_key = request.data.get('dedup_key')
-        if dedup_key:
-            existing = Webform.objects.filter(dedup_key=dedup_key).first()
-            if existing:
-                return Response(
-                    {'id': existing.id, 'name': existing.name},
-                    status=status.HTTP_409_CONFLICT
-                )
+    def get_conflict_data(self, instance):
+        return {'id': instance.id, 'name': instance.name}
+
+    @staticmethod
+    def parse_ids(value, name):
+        try:
+            return [int(item) for item in value.split(',') if item.strip()]
+        except ValueError:
+            raise ValueError(f"{name} deve essere una lista di id separati da virgola")
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """
+        GET /api/webforms/analytics/?date_from=2026-01-01&date_to=2026-01-31
+            &interval=day|week|month&group_by=total|website|webform&website=1,2&webform=3&top=10
+        Serie temporale e webform con più submission, dai conteggi giornalieri
+        (WebformSubmissionDaily): non legge le submission.
+        """
+        params = request.query_params
+        try:
+            start, end = SubmissionRollupService.parse_range(params.get('date_from'), params.get('date_to'))
+            rows = SubmissionRollupService.rows(
+                start, end,
+                website_ids=self.parse_ids(params.get('website', ''), 'website'),
+                webform_ids=self.parse_ids(params.get('webform', ''), 'webform'),
+            )
+            interval = params.get('interval', 'day')
+            series = SubmissionRollupService.series(rows, interval, params.get('group_by', 'total'))
+            try:
+                top = min(max(int(params.get('top', SubmissionRollupService.DEFAULT_TOP)), 0), 100)
+            except ValueError:
+                raise ValueError("top deve essere un intero")
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response({
+            'date_from': start.isoformat(),
+            'date_to': end.isoformat(),
+            'interval': interval,
+            'total': sum(point['count'] for point in series),
+            'series': series,
+            'top': SubmissionRollupService.top(rows, top) if top else [],
+        })
 
 
-class WebformSubmissionViewSet(ModelViewSet):
-    queryset = WebformSubmission.objects.all()
+class WebformSubmissionViewSet(IdempotentCreateMixin, ExportMixin, SparseFieldsMixin, ModelViewSet):
+    # person e webform (con il suo website) sono annidati nel serializer
+    queryset = WebformSubmission.objects.select_related('person', 'webform__website')
     serializer_class = WebformSubmissionSerializer
     permission_classes = [AllowAny]  # Frontend pubblico può leggere submissions
+    filter_backends = [DjangoFilterBackend, PayloadFieldFilter, OrderingFilter]
     filterset_fields = ['webform', 'person', 'external_id']
     ordering = ['-created_at']
+    pagination_class = OptionalKeysetPagination
+    export_filename = 'webform-submissions'
 
     def create(self, request, *args, **kwargs):
         """
@@ -85,21 +118,34 @@ class WebformSubmissionViewSet(ModelViewSet):
             "payload": {...},
             "dedup_key": "..."
         }
+        Un dedup_key (o Idempotency-Key) già presente restituisce 409 con l'id esistente.
         """
-        dedup_key = request.data.get('dedup_key')
-        if dedup_key:
-            existing = WebformSubmission.objects.filter(dedup_key=dedup_key).first()
-            if existing:
-                return Response(
-                    {'id': existing.id},
-                    status=status.HTTP_409_CONFLICT
-                )
-
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return super().create(request, *args, **kwargs)
     
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        POST /api/webform-submissions/batch/
+        Crea molte submission in una richiesta (stesso formato della POST singola).
+        Payload: {"submissions": [{"webform_id": 1, "payload": {"email": "..."}, "dedup_key": "..."}, ...]}
+        Risposta: conteggi ed esito per elemento (created/duplicate con id, error con motivo)
+        """
+        items = request.data if isinstance(request.data, list) else request.data.get('submissions')
+        try:
+            results = SubmissionBatchService.ingest(items)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        totals = {'created': 0, 'duplicate': 0, 'error': 0}
+        for result in results:
+            totals[result['status']] += 1
+        return Response({
+            'created': totals['created'],
+            'duplicates': totals['duplicate'],
+            'errors': totals['error'],
+            'results': results,
+        })
+
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def sync_from_drupal(self, request):
         """
@@ -102,14 +102,25 @@ function CSVImportModal({ onClose, onSuccess }) {
         return
       }
 
-      // Call import endpoint
+      // Call import endpoint: the import runs in background, poll the job until it ends
       const response = await personAPI.importCSV(records)
-      setImportStats(response.data)
+      let job = response.data
+      setImportStats(job)
       setStep('importing')
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000))
+        job = (await personAPI.getImportJob(job.id)).data
+        setImportStats(job)
+      }
       setLoading(false)
-      
+
+      if (job.status === 'failed') {
+        setError('Errore durante l\'importazione: ' + job.failure)
+        return
+      }
+
       // Auto-close after 2 seconds on success
-      if (response.data.created > 0 || response.data.updated > 0) {
+      if (job.created > 0 || job.updated > 0) {
         setTimeout(() => {
           if (onSuccess) onSuccess()
           onClose()
@@ -233,7 +244,11 @@ function CSVImportModal({ onClose, onSuccess }) {
 
           {step === 'importing' && (
             <div className="importing-step">
-              <h3>Importazione Completata</h3>
+              <h3>
+                {importStats?.status === 'pending' || importStats?.status === 'running'
+                  ? `Importazione in corso (${importStats?.processed_rows || 0}/${importStats?.total_rows || 0})`
+                  : 'Importazione Completata'}
+              </h3>
               <div className="stats">
                 <div className="stat-item success">
                   <div className="stat-number">{importStats?.created || 0}</div>
@@ -250,10 +265,10 @@ function CSVImportModal({ onClose, onSuccess }) {
               </div>
               {importStats?.errors && importStats.errors.length > 0 && (
                 <div className="errors-list">
-                  <h4>Errori:</h4>
+                  <h4>Errori ({importStats.error_count || importStats.errors.length}):</h4>
                   <ul>
                     {importStats.errors.slice(0, 5).map((err, idx) => (
-                      <li key={idx}>{err}</li>
+                      <li key={idx}>{typeof err === 'string' ? err : `Riga ${err.row}: ${err.error}`}</li>
                     ))}
                   </ul>
                 </div>
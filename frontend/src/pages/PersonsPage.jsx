@@ -8,7 +8,7 @@ import '../styles/persons.css'
 
 function PersonsPage() {
   const [persons, setPersons] = useState([])
-  const [allPersons, setAllPersons] = useState([]) // Tutti i contatti per filtraggio locale
+  const [totalCount, setTotalCount] = useState(0)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [showForm, setShowForm] = useState(false)
@@ -16,35 +16,20 @@ function PersonsPage() {
   const [editingId, setEditingId] = useState(null)
   const [searchTerm, setSearchTerm] = useState('')
 
+  // Ricerca lato server (?search=), con attesa di 300ms tra un tasto e l'altro
   useEffect(() => {
-    fetchPersons()
-  }, [])
-
-  // Filtraggio locale con logica "contiene"
-  useEffect(() => {
-    if (searchTerm.trim() === '') {
-      setPersons(allPersons)
-    } else {
-      const filtered = allPersons.filter(person => {
-        const searchLower = searchTerm.toLowerCase()
-        return (
-          (person.email && person.email.toLowerCase().includes(searchLower)) ||
-          (person.first_name && person.first_name.toLowerCase().includes(searchLower)) ||
-          (person.last_name && person.last_name.toLowerCase().includes(searchLower)) ||
-          (person.organisation && person.organisation.toLowerCase().includes(searchLower))
-        )
-      })
-      setPersons(filtered)
-    }
-  }, [searchTerm, allPersons])
+    const timer = setTimeout(() => fetchPersons(), 300)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
 
   const fetchPersons = async () => {
     try {
       setLoading(true)
-      const response = await personAPI.getAll()
+      const search = searchTerm.trim()
+      const response = await personAPI.getAll(search ? { search } : {})
       const data = response.data.results || response.data
-      setAllPersons(data)
       setPersons(data)
+      setTotalCount(response.data.count ?? data.length)
     } catch (err) {
       setError(err.message)
     } finally {
@@ -147,7 +132,7 @@ function PersonsPage() {
         <>
           {persons.length > 0 && (
             <div style={{ marginTop: '1rem', color: '#718096', fontSize: '0.9rem' }}>
-              Risultati: {persons.length} di {allPersons.length} contatti
+              Risultati: {persons.length} di {totalCount} contatti
             </div>
           )}
           <PersonsList
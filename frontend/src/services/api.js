@@ -18,7 +18,8 @@ export const personAPI = {
   create: (data) => apiClient.post('/persons/', data),
   update: (id, data) => apiClient.put(`/persons/${id}/`, data),
   delete: (id) => apiClient.delete(`/persons/${id}/`),
-  importCSV: (records) => apiClient.post('/persons/bulk_import/', { records })
+  importCSV: (records) => apiClient.post('/persons/bulk_import/', { records }),
+  getImportJob: (jobId) => apiClient.get(`/persons/import_jobs/${jobId}/`)
 }
 
 // WebForm Submissions API